@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from api.v1.deps import get_current_user, get_db
@@ -113,6 +113,26 @@ def get_usage(
     
     return usage_service.get_usage_summary(org_id)
 
+@router.get("/orgs/{org_id}/usage/history")
+def get_usage_history(
+    org_id: str,
+    range_key: str = Query("24h", alias="range", description="1h, 6h, 24h, 7d, 30d, 90d or 365d"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    member = db.query(OrgMember).filter(
+        OrgMember.org_id == org_id,
+        OrgMember.user_id == current_user.id
+    ).first()
+    
+    if not member:
+        raise HTTPException(status_code=403, detail="Not authorized")
+        
+    from services.usage_service import UsageService
+    usage_service = UsageService(db)
+    
+    return usage_service.get_usage_history(org_id, range_key)
+
 @router.post("/webhook")
 async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
     payload = await request.body()
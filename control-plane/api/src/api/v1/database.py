@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import List, Optional
-from services.database_service import DatabaseService
+from services.database_service import DatabaseService, SQL_EXPLAIN_TIMEOUT_MS
+from services.slow_query_service import SlowQueryService
+from services.query_insights_service import QueryInsightsService
+from services.index_advisor_service import IndexAdvisorService
 from api.v1.utils import verify_project_access
 from api.v1.deps import get_db, get_current_user
 from sqlalchemy.orm import Session
@@ -11,6 +15,9 @@ router = APIRouter()
 
 class SQLQuery(BaseModel):
     sql: str
+    # Return the analysed plan of EXPLAIN (ANALYZE, BUFFERS) instead of rows; changes are rolled back
+    explain: bool = False
+    timeout_ms: Optional[int] = None
 
 class PolicyCreate(BaseModel):
     policy_name: str
@@ -49,15 +56,84 @@ def execute_sql(
 ):
     """Execute SQL query on project database"""
     verify_project_access(project_id, db, current_user)
+    if query.timeout_ms is not None and query.timeout_ms <= 0:
+        raise HTTPException(status_code=400, detail="timeout_ms must be positive")
     try:
         db_service = DatabaseService(project_id)
-        result = db_service.execute_query(query.sql)
+        if query.explain:
+            timeout_ms = min(query.timeout_ms or SQL_EXPLAIN_TIMEOUT_MS, SQL_EXPLAIN_TIMEOUT_MS)
+            result = db_service.explain_query(query.sql, timeout_ms)
+        else:
+            result = db_service.execute_query(query.sql)
         if result.get("error"):
             return {"success": False, **result}
         return {"success": True, **result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{project_id}/database/slow-queries")
+def list_slow_queries(
+    project_id: str,
+    since: Optional[datetime] = Query(None, description="Only queries finished at or after this time (UTC)"),
+    until: Optional[datetime] = Query(None, description="Only queries finished at or before this time (UTC)"),
+    min_duration_ms: Optional[float] = Query(None, ge=0),
+    order: str = Query("recent", description="recent (newest first) or slowest"),
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Statements that exceeded the cluster's log_min_duration_statement"""
+    verify_project_access(project_id, db, current_user)
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    if until is not None and until.tzinfo is not None:
+        until = until.astimezone(timezone.utc).replace(tzinfo=None)
+    try:
+        return SlowQueryService.list_queries(
+            db, project_id,
+            since=since,
+            until=until,
+            min_duration_ms=min_duration_ms,
+            order=order,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{project_id}/database/query-insights")
+def get_query_insights(
+    project_id: str,
+    range_key: str = Query("24h", alias="range", description="1h, 6h, 24h or 7d"),
+    order_by: str = Query("total_time", description="total_time, mean_time, calls or rows"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Top statements of the project by total time, mean time, calls or rows (from pg_stat_statements)"""
+    verify_project_access(project_id, db, current_user)
+    try:
+        return QueryInsightsService.top_queries(db, project_id, range_key=range_key, order_by=order_by, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{project_id}/database/index-advisor")
+def get_index_advice(
+    project_id: str,
+    refresh: bool = Query(False, description="Rebuild the report now instead of serving the cached one"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Indexes to create or drop, from table/index statistics and the plans of captured slow queries"""
+    verify_project_access(project_id, db, current_user)
+    try:
+        return IndexAdvisorService.get_report(db, project_id, refresh=refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{project_id}/tables/{table_name}/schema")
 def get_table_schema(
     project_id: str,
@@ -16,6 +16,14 @@ def get_db():
         db.close()
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    return user_from_token(token, db)
+
+def user_from_token(token: str, db: Session) -> User:
+    """
+    The user a bearer token belongs to. Streaming endpoints call it with a
+    session of their own: the request's get_db session would stay checked out
+    until the stream ends.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -1,7 +1,41 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from core.database import SessionLocal
+from services.reconciliation_service import progress as reconciliation_progress
+from services.container_registry import container_registry
 
 router = APIRouter()
 
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@router.get("/health/live")
+def liveness():
+    """The process is up and serving requests."""
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+def readiness():
+    """
+    Ready to take traffic once the control-plane DB is reachable.
+    Startup reconciliation of project stacks and the container registry run in
+    the background and are reported here, but do not gate readiness.
+    """
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        database_ok = True
+    except Exception:
+        database_ok = False
+    finally:
+        db.close()
+
+    body = {
+        "status": "ok" if database_ok else "unavailable",
+        "database": "ok" if database_ok else "unreachable",
+        "reconciliation": reconciliation_progress.snapshot(),
+        "containers": container_registry.snapshot(),
+    }
+    return JSONResponse(status_code=200 if database_ok else 503, content=body)
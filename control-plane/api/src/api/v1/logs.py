@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from services.logs_service import get_project_logs
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import StreamingResponse
+from services.logs_service import query_project_logs, normalize_filters, format_entry
+from services.log_pipeline import log_pipeline, LogViewer
 from api.v1.utils import verify_project_access
-from api.v1.deps import get_db, get_current_user
+from api.v1.deps import get_db, get_current_user, oauth2_scheme, user_from_token
+from core.database import SessionLocal
 from sqlalchemy.orm import Session
 from models.user import User
 
@@ -10,16 +18,117 @@ router = APIRouter(
     tags=["logs"]
 )
 
+# SSE stream settings
+LOG_STREAM_HEARTBEAT_SECONDS = 15.0
+LOG_STREAM_MAX_SECONDS = 3600.0  # Clients reconnect with Last-Event-ID
+LOG_STREAM_REPLAY_LIMIT = 1000
+
 @router.get("")
 def fetch_logs(
     project_id: str, 
-    service: str = Query(..., description="Service name (database, auth, api, storage, realtime)"),
-    lines: int = Query(100, ge=1, le=2000),
+    service: Optional[str] = Query(None, description="Service name (database, auth, api, storage, realtime, functions); all if omitted"),
+    since: Optional[datetime] = Query(None, description="Only entries at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only entries at or before this time"),
+    level: Optional[str] = Query(None, description="Minimum level (debug, info, warning, error, fatal)"),
+    search: Optional[str] = Query(None, description="Case-insensitive substring"),
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=2000),
+    lines: int = Query(100, ge=1, le=2000, description="Deprecated alias of limit"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    project = verify_project_access(project_id, db, current_user)
-    from models.project import ProjectPlan
-    is_shared = project.plan == ProjectPlan.shared
-    logs = get_project_logs(project_id, service, lines, is_shared=is_shared)
-    return {"logs": logs}
+    verify_project_access(project_id, db, current_user)
+    try:
+        return query_project_logs(
+            project_id,
+            service=service,
+            since=since,
+            until=until,
+            level=level,
+            search=search,
+            cursor=cursor,
+            limit=limit or lines,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _verify_stream_access(project_id: str, token: str):
+    # Own session, closed before streaming starts; see user_from_token
+    db = SessionLocal()
+    try:
+        verify_project_access(project_id, db, user_from_token(token, db))
+    finally:
+        db.close()
+
+@router.get("/stream")
+async def stream_logs(
+    project_id: str,
+    request: Request,
+    service: Optional[str] = Query(None, description="Service name; all if omitted"),
+    level: Optional[str] = Query(None, description="Minimum level (debug, info, warning, error, fatal)"),
+    search: Optional[str] = Query(None, description="Case-insensitive substring"),
+    token: str = Depends(oauth2_scheme)
+):
+    """
+    Server-Sent Events: a `log` event per new entry (its `id` is the entry ID
+    prefixed with the log store's epoch) and a `dropped` event for entries
+    skipped because the client fell behind. Reconnecting with Last-Event-ID
+    replays what was missed while the entries are still held; an ID from
+    another process or boot is ignored and the stream starts from new entries.
+    """
+    await asyncio.to_thread(_verify_stream_access, project_id, token)
+    try:
+        pipeline_service = normalize_filters(service, level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    last_sent = log_pipeline.store.resume_after(request.headers.get("last-event-id"))
+
+    # Subscribe before replaying so nothing falls between the two
+    viewer = log_pipeline.subscriptions.subscribe(LogViewer(
+        project_id, asyncio.get_running_loop(), pipeline_service, level, search
+    ))
+
+    def log_event(entry: dict) -> str:
+        return f"id: {log_pipeline.store.event_id(entry)}\nevent: log\ndata: {json.dumps(format_entry(entry))}\n\n"
+
+    def dropped_event(gap: dict) -> str:
+        return f"event: dropped\ndata: {json.dumps(gap)}\n\n"
+
+    async def events():
+        nonlocal last_sent
+        try:
+            if last_sent is not None:
+                missed, more = log_pipeline.store.query(
+                    project_id, service=pipeline_service, min_level=level, search=search,
+                    after=last_sent, limit=LOG_STREAM_REPLAY_LIMIT
+                )
+                if more is not None:
+                    yield dropped_event({"from_id": last_sent + 1, "to_id": missed[-1]["id"] - 1, "count": None})
+                for entry in reversed(missed):
+                    last_sent = entry["id"]
+                    yield log_event(entry)
+
+            deadline = time.monotonic() + LOG_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                if await request.is_disconnected():
+                    return
+                try:
+                    entry = await asyncio.wait_for(viewer.queue.get(), LOG_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                for gap in viewer.gaps_before(entry["id"]):
+                    yield dropped_event(gap)
+                if last_sent is not None and entry["id"] <= last_sent:
+                    continue  # Already replayed
+                last_sent = entry["id"]
+                yield log_event(entry)
+        finally:
+            log_pipeline.subscriptions.unsubscribe(viewer)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
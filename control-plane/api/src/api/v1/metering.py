@@ -0,0 +1,58 @@
+import hmac
+from fastapi import APIRouter, Depends, HTTPException, Header
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from api.v1.deps import get_db
+from services.metering_service import MeteringService, METERING_TOKEN
+
+router = APIRouter()
+
+def verify_metering_token(x_metering_token: Optional[str]):
+    if not METERING_TOKEN:
+        raise HTTPException(status_code=503, detail="Metering is not configured")
+    # Compared as bytes: compare_digest rejects non-ASCII str, and headers can carry any latin-1 character
+    if not x_metering_token or not hmac.compare_digest(x_metering_token.encode(), METERING_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metering token")
+
+class ProjectUsageDelta(BaseModel):
+    project_id: str
+    requests: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    latency_ms_total: int = 0
+
+class MeteringBatch(BaseModel):
+    projects: List[ProjectUsageDelta]
+
+@router.post("/usage")
+def ingest_usage(
+    batch: MeteringBatch,
+    x_metering_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Internal: receives batched per-project request deltas from the routing proxy."""
+    verify_metering_token(x_metering_token)
+
+    updated = MeteringService.record_batch(db, [d.model_dump() for d in batch.projects])
+    return {"status": "ok", "orgs_updated": updated}
+
+
+@router.get("/projects/{project_id}/api-keys")
+def accepted_api_keys(
+    project_id: str,
+    x_metering_token: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Internal: SHA-256 hashes of the API keys the routing proxy should accept for a
+    project. During a JWT secret rotation this includes the previous keys, until
+    `valid_until` (unix time), after which the proxy must fetch the list again.
+    """
+    verify_metering_token(x_metering_token)
+
+    from services.api_key_service import ApiKeyService
+    accepted = ApiKeyService.accepted_keys(db, project_id)
+    if accepted is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return accepted
@@ -13,6 +13,7 @@ from api.v1.deps import get_db, get_current_user
 from api.v1.utils import verify_project_access
 from models.user import User
 from models.project_secret import ProjectSecret
+from services.secrets_cache import secrets_changed
 import logging
 
 router = APIRouter()
@@ -214,6 +215,7 @@ def get_admin_temp_password(
         # Get password and delete (one-time use)
         password = secret.value
         db.delete(secret)
+        secrets_changed(db, project_id)
         db.commit()
         
         logger.info(f"Admin password retrieved for project {project_id}")
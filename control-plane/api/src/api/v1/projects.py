@@ -8,6 +8,7 @@ from services.project_service import (
     start_project,
     delete_project,
     restore_project,
+    migrate_project_cluster,
 )
 from api.v1.deps import get_current_user, get_db
 from models.user import User
@@ -60,7 +61,7 @@ def get_project(
         raise HTTPException(status_code=404, detail="Project not found")
     return project
 
-@router.post("")
+@router.post("", status_code=202)
 def create(
     project: ProjectCreate = None,
     current_user: User = Depends(get_current_user),
@@ -94,7 +95,8 @@ def create(
     name = project.name if project else None
     plan = project.plan if project else "shared"
 
-    # Pass org_id and plan to service
+    # Pass org_id and plan to service. Provisioning runs in a background job;
+    # poll /projects/{id}/jobs/{job_id} or stream its /events.
     return create_project(db, custom_domain=custom_domain, name=name, org_id=target_org_id, plan=plan)
 
 @router.post("/{project_id}/stop")
@@ -325,6 +327,28 @@ def restore(
     except FileExistsError:
         raise HTTPException(status_code=400, detail="Project is already active")
 
+@router.post("/{project_id}/migrate", status_code=202)
+def migrate(
+    project_id: str,
+    target_cluster: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Move a shared project's database to another cluster (platform admins only).
+    Runs as a background job; follow it via /projects/{id}/jobs/{job_id}/events.
+    """
+    verify_project_access(project_id, db, current_user)
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Only platform admins can move projects between clusters")
+    try:
+        result = migrate_project_cluster(db, project_id, target_cluster)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return result
+
 @router.delete("/{project_id}")
 def delete(
     project_id: str,
@@ -347,35 +371,20 @@ def get_project_config(
     verify_project_access(project_id, db, current_user)
     
     # Fetch secrets
-    from models.project_secret import ProjectSecret
-    secrets = db.query(ProjectSecret).filter(ProjectSecret.project_id == project_id).all()
-    secrets_map = {s.key: s.value for s in secrets}
-    print(f"DEBUG: Project {project_id} secrets: {list(secrets_map.keys())}")
+    from services.secrets_service import get_project_secrets
+    from services.api_key_service import ApiKeyService
+    secrets_map = get_project_secrets(db, project_id)
     
     if not secrets_map:
          raise HTTPException(status_code=404, detail="Project configuration not found")
 
-    # Construct keys
-    # We need to generate JWTs on the fly using the project's JWT_SECRET
-    jwt_secret = secrets_map.get("JWT_SECRET")
-    if not jwt_secret:
+    # Keys are issued once per JWT secret and cached with the secrets version
+    keys = ApiKeyService.get_keys(db, project_id)
+    if not keys:
          raise HTTPException(status_code=500, detail="Project JWT secret is missing")
-    
-    from jose import jwt
-    import datetime
-    
-    # Helper to generate permanent tokens (or long lived)
-    def generate_token(role: str, secret: str):
-        payload = {
-            "role": role,
-            "iss": "supalove",
-            "iat": datetime.datetime.utcnow(),
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(days=365*10) # 10 years
-        }
-        return jwt.encode(payload, secret, algorithm="HS256")
-
-    anon_key = generate_token("anon", jwt_secret)
-    service_role_key = generate_token("service_role", jwt_secret)
+    jwt_secret = keys["jwt_secret"]
+    anon_key = keys["anon_key"]
+    service_role_key = keys["service_role_key"]
     
     # Construct URLs
     # Assuming localhost for now as per plan, but respecting ports
@@ -452,18 +461,15 @@ def get_deployment_config(
     environment = "coolify" if coolify_connected else "local"
     
     # Get custom domain from secrets
-    from models.project_secret import ProjectSecret
-    domain_secret = db.query(ProjectSecret).filter(
-        ProjectSecret.project_id == project_id,
-        ProjectSecret.key == "CUSTOM_DOMAIN"
-    ).first()
+    from services.secrets_service import get_secret
+    custom_domain = get_secret(db, project_id, "CUSTOM_DOMAIN")
     
     return {
         "environment": environment,
         "coolify_connected": coolify_connected,
-        "custom_domain": domain_secret.value if domain_secret else None,
-        "ssl_enabled": coolify_connected and domain_secret is not None,
-        "deployment_url": f"https://{domain_secret.value}" if domain_secret else None
+        "custom_domain": custom_domain,
+        "ssl_enabled": coolify_connected and custom_domain is not None,
+        "deployment_url": f"https://{custom_domain}" if custom_domain else None
     }
 
 
@@ -482,6 +488,7 @@ def set_custom_domain(
     verify_project_access(project_id, db, current_user)
     
     from models.project_secret import ProjectSecret
+    from services.secrets_cache import secrets_changed
     
     # Upsert the custom domain
     existing = db.query(ProjectSecret).filter(
@@ -498,6 +505,7 @@ def set_custom_domain(
             value=config.domain
         ))
     
+    secrets_changed(db, project_id)
     db.commit()
     
     return {"status": "saved", "domain": config.domain}
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from api.v1.deps import get_current_user, get_db, oauth2_scheme, user_from_token
+from api.v1.utils import verify_project_access
+from core.database import SessionLocal
+from models.user import User
+from services.provisioning_job_service import ProvisioningJobService, TERMINAL_STATUSES
+
+router = APIRouter()
+
+# SSE stream settings
+JOB_EVENTS_POLL_SECONDS = 1.0
+JOB_EVENTS_HEARTBEAT_SECONDS = 15.0
+JOB_EVENTS_MAX_SECONDS = 900.0
+
+@router.get("/{project_id}/jobs")
+def list_jobs(
+    project_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    verify_project_access(project_id, db, current_user)
+    return [ProvisioningJobService.to_dict(job) for job in ProvisioningJobService.list_jobs(db, project_id)]
+
+@router.get("/{project_id}/jobs/{job_id}")
+def get_job(
+    project_id: str,
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    verify_project_access(project_id, db, current_user)
+    job = ProvisioningJobService.get_job(db, project_id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ProvisioningJobService.to_dict(job)
+
+def _load_job_snapshot(project_id: str, job_id: str):
+    db = SessionLocal()
+    try:
+        job = ProvisioningJobService.get_job(db, project_id, job_id)
+        return ProvisioningJobService.to_dict(job) if job else None
+    finally:
+        db.close()
+
+def _verify_job_access(project_id: str, job_id: str, token: str):
+    # Own session, closed before streaming starts; see user_from_token
+    db = SessionLocal()
+    try:
+        verify_project_access(project_id, db, user_from_token(token, db))
+        if not ProvisioningJobService.get_job(db, project_id, job_id):
+            raise HTTPException(status_code=404, detail="Job not found")
+    finally:
+        db.close()
+
+@router.get("/{project_id}/jobs/{job_id}/events")
+async def stream_job_events(
+    project_id: str,
+    job_id: str,
+    request: Request,
+    token: str = Depends(oauth2_scheme)
+):
+    """Server-Sent Events: emits the job whenever it changes, closes once it finishes."""
+    await asyncio.to_thread(_verify_job_access, project_id, job_id, token)
+
+    terminal = {status.value for status in TERMINAL_STATUSES}
+
+    async def events():
+        last_sent = None
+        last_write = time.monotonic()
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        while time.monotonic() < deadline:
+            if await request.is_disconnected():
+                return
+
+            snapshot = await asyncio.to_thread(_load_job_snapshot, project_id, job_id)
+            if snapshot is None:
+                yield "event: error\ndata: {\"detail\": \"Job not found\"}\n\n"
+                return
+
+            marker = (snapshot["status"], snapshot["attempts"], snapshot["updated_at"])
+            if marker != last_sent:
+                last_sent = marker
+                last_write = time.monotonic()
+                yield f"event: job\ndata: {json.dumps(snapshot)}\n\n"
+                if snapshot["status"] in terminal:
+                    return
+            elif time.monotonic() - last_write >= JOB_EVENTS_HEARTBEAT_SECONDS:
+                last_write = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Body, Depends
-from typing import Dict, Any
-from services.secrets_service import get_secrets, set_secret, delete_secret
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Optional
+from services.secrets_service import get_secrets, set_secret, delete_secret, apply_secret_changes
 from api.v1.utils import verify_project_access
 from api.v1.deps import get_db, get_current_user
 from sqlalchemy.orm import Session
@@ -38,7 +39,43 @@ def update_secret(
     if not key:
         raise HTTPException(status_code=400, detail="Key is required")
         
-    return set_secret(db, project_id, key, value)
+    try:
+        return set_secret(db, project_id, key, value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("")
+def update_secrets(
+    project_id: str,
+    changes: Dict[str, Optional[str]] = Body(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Applies { "KEY": "value", "OLD_KEY": null, ... } in one transaction; null deletes."""
+    verify_project_access(project_id, db, current_user)
+    try:
+        return apply_secret_changes(db, project_id, changes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class JwtRotation(BaseModel):
+    # Seconds the previous secret and keys stay valid; defaults to JWT_ROTATION_OVERLAP_SECONDS
+    overlap_seconds: Optional[int] = Field(default=None, ge=0)
+
+@router.post("/jwt/rotate")
+def rotate_jwt_secret(
+    project_id: str,
+    rotation: Optional[JwtRotation] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Issue a new JWT secret and API keys; the previous ones are accepted until the overlap ends."""
+    verify_project_access(project_id, db, current_user)
+    from services.api_key_service import ApiKeyService
+    try:
+        return ApiKeyService.rotate_jwt_secret(db, project_id, rotation.overlap_seconds if rotation else None)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 @router.delete("/{key}")
 def remove_secret(
@@ -21,6 +21,7 @@ from jose import jwt
 
 from api.v1.deps import get_db
 from models.project import Project
+from services.api_key_service import decode_project_token
 
 router = APIRouter(prefix="/projects/{project_id}/auth/v1", tags=["Shared Auth"])
 
@@ -84,7 +85,8 @@ def get_project_db_connection(project_id: str, db: Session):
     Returns connection info and JWT secret.
     """
     from models.cluster import Cluster
-    from models.project_secret import ProjectSecret
+    from services.secrets_service import get_project_secrets
+    from services.api_key_service import ApiKeyService
     
     # Verify project exists
     project = db.query(Project).filter(Project.id == project_id).first()
@@ -92,10 +94,7 @@ def get_project_db_connection(project_id: str, db: Session):
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Get project secrets
-    secrets = db.query(ProjectSecret).filter(
-        ProjectSecret.project_id == project_id
-    ).all()
-    secrets_dict = {s.key: s.value for s in secrets}
+    secrets_dict = get_project_secrets(db, project_id)
     
     if not secrets_dict.get("JWT_SECRET"):
         raise HTTPException(status_code=500, detail="Project JWT secret not found")
@@ -122,6 +121,8 @@ def get_project_db_connection(project_id: str, db: Session):
         "user": secrets_dict.get("POSTGRES_USER", f"{project.db_name}_user"),
         "password": secrets_dict.get("DB_PASSWORD", "postgres"),
         "jwt_secret": secrets_dict.get("JWT_SECRET", ""),
+        # Includes the previous secret while a rotation's overlap window lasts
+        "jwt_secrets": ApiKeyService.verification_secrets(db, project_id),
         "project": project
     }
 
@@ -394,10 +395,9 @@ async def get_user(
     
     try:
         # Decode and verify JWT
-        payload = jwt.decode(
-            token, 
-            config["jwt_secret"], 
-            algorithms=[ALGORITHM],
+        payload = decode_project_token(
+            token,
+            config.get("jwt_secrets") or [config["jwt_secret"]],
             audience="authenticated"
         )
         user_id = payload.get("sub")
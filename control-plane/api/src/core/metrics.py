@@ -0,0 +1,183 @@
+"""
+Prometheus HTTP metrics for the control plane.
+
+Requests are labelled by the matched FastAPI route template
+(e.g. /api/v1/projects/{project_id}/tables) rather than the raw path,
+so project IDs, table names and backup paths don't create new series.
+"""
+import time
+from fastapi import Request
+from prometheus_client import Counter, Gauge, Histogram
+
+# Tuned for fast lookups (sub-10 ms) through slow provisioning/backup calls (30 s)
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# Label used for requests that matched no route (404s, scanners)
+UNMATCHED_ROUTE = "<unmatched>"
+
+http_requests_total = Counter(
+    'http_requests_total',
+    'Total HTTP requests',
+    ['method', 'endpoint', 'status']
+)
+
+http_request_duration_seconds = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request duration in seconds',
+    ['method', 'endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+
+http_requests_in_progress = Gauge(
+    'http_requests_in_progress',
+    'HTTP requests currently being served',
+    ['method']
+)
+
+http_request_size_bytes = Histogram(
+    'http_request_size_bytes',
+    'HTTP request body size in bytes',
+    ['method', 'endpoint'],
+    buckets=SIZE_BUCKETS
+)
+
+http_response_size_bytes = Histogram(
+    'http_response_size_bytes',
+    'HTTP response body size in bytes',
+    ['method', 'endpoint'],
+    buckets=SIZE_BUCKETS
+)
+
+
+def route_template(request: Request) -> str:
+    """Return the matched route's path template, or a fixed label if nothing matched."""
+    # Newer FastAPI keeps the router-relative route in scope["route"] and the
+    # prefixed template on the effective route context
+    context = (request.scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path_format", None)
+    if path:
+        return path
+    route = request.scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+async def track_requests(request: Request, call_next):
+    """HTTP middleware recording request count, latency, sizes and in-flight requests."""
+    method = request.method
+    in_progress = http_requests_in_progress.labels(method=method)
+    in_progress.inc()
+    start_time = time.perf_counter()
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - start_time
+        in_progress.dec()
+
+        # The router stores the matched route in the scope, so this is only known after call_next
+        endpoint = route_template(request)
+        http_requests_total.labels(method=method, endpoint=endpoint, status=status).inc()
+        http_request_duration_seconds.labels(method=method, endpoint=endpoint).observe(duration)
+
+        request_size = request.headers.get("content-length")
+        if request_size and request_size.isdigit():
+            http_request_size_bytes.labels(method=method, endpoint=endpoint).observe(int(request_size))
+
+        response_size = response.headers.get("content-length") if response is not None else None
+        if response_size and response_size.isdigit():
+            http_response_size_bytes.labels(method=method, endpoint=endpoint).observe(int(response_size))
+
+
+# --------------------------------------------
+# Business gauges
+# Set by services/metrics_service.py on a scheduler interval; /metrics only serialises them.
+# --------------------------------------------
+
+supalove_projects_total = Gauge(
+    'supalove_projects_total',
+    'Total number of projects'
+)
+
+supalove_projects = Gauge(
+    'supalove_projects',
+    'Projects by status, plan and cluster',
+    ['status', 'plan', 'cluster']
+)
+
+supalove_users_total = Gauge(
+    'supalove_users_total',
+    'Total number of platform users'
+)
+
+supalove_orgs_total = Gauge(
+    'supalove_orgs_total',
+    'Total number of organizations'
+)
+
+supalove_clusters = Gauge(
+    'supalove_clusters',
+    'Clusters by status',
+    ['status']
+)
+
+supalove_containers = Gauge(
+    'supalove_containers',
+    'Docker containers by compose project kind and state, from the container registry',
+    ['kind', 'state', 'health']
+)
+
+supalove_backup_last_run_projects = Gauge(
+    'supalove_backup_last_run_projects',
+    'Projects processed by the most recent backup run',
+    ['result']
+)
+
+supalove_backup_last_run_timestamp_seconds = Gauge(
+    'supalove_backup_last_run_timestamp_seconds',
+    'Unix time the most recent backup run finished'
+)
+
+supalove_backup_oldest_age_seconds = Gauge(
+    'supalove_backup_oldest_age_seconds',
+    'Age of the oldest latest-successful backup across running projects'
+)
+
+supalove_backup_missing_projects = Gauge(
+    'supalove_backup_missing_projects',
+    'Running projects with no known successful backup'
+)
+
+supalove_business_metrics_refreshed_timestamp_seconds = Gauge(
+    'supalove_business_metrics_refreshed_timestamp_seconds',
+    'Unix time the business gauges were last refreshed'
+)
+
+supalove_warm_pool_ready = Gauge(
+    'supalove_warm_pool_ready',
+    'Pre-migrated databases ready to be claimed, per cluster',
+    ['cluster']
+)
+
+# --------------------------------------------
+# Secrets cache
+# Updated by services/secrets_cache.py on every lookup/invalidation.
+# --------------------------------------------
+
+supalove_secrets_cache_requests_total = Counter(
+    'supalove_secrets_cache_requests_total',
+    'Project secrets lookups, served from the cache (hit) or the database (miss)',
+    ['result']
+)
+
+supalove_secrets_cache_invalidations_total = Counter(
+    'supalove_secrets_cache_invalidations_total',
+    'Project secrets cache invalidations, by where they came from',
+    ['source']
+)
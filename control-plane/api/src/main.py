@@ -46,6 +46,12 @@ from models.invoice import Invoice
 from models.organization_entitlement import OrganizationEntitlement
 from models.usage_record import UsageRecord
 from models.edge_function import EdgeFunction
+from models.provisioning_job import ProvisioningJob
+from models.warm_pool_database import WarmPoolDatabase
+from models.placement_decision import PlacementDecision
+from models.port_reservation import PortReservation
+from models.slow_query import SlowQuery
+from models.query_stat import QueryStat
 
 Base.metadata.create_all(bind=engine)
 
@@ -55,52 +61,40 @@ Base.metadata.create_all(bind=engine)
 
 from contextlib import asynccontextmanager
 from services.scheduler_service import SchedulerService
-from services.provisioning_service import start_project as provision_start
-from models.project import ProjectStatus
+from services.reconciliation_service import start_reconciliation_in_background
+from services.provisioning_job_service import worker_pool as provisioning_workers
+from services.log_pipeline import log_pipeline
+from services.container_registry import container_registry
+from services.secrets_cache import secrets_cache
+from services.env_projection import env_projector
 import logging
 
 logger = logging.getLogger(__name__)
 
-def startup_projects():
-    """Start all projects that were in RUNNING state on backend boot."""
-    db = SessionLocal()
-    try:
-        running_projects = db.query(Project).filter(
-            Project.status == ProjectStatus.RUNNING
-        ).all()
-        
-        if not running_projects:
-            logger.info("No running projects found to start")
-            return
-        
-        logger.info(f"🚀 Starting {len(running_projects)} project(s)...")
-        for project in running_projects:
-            try:
-                logger.info(f"  ▶️  Starting project: {project.name} ({project.id})")
-                provision_start(project.id)
-            except Exception as e:
-                logger.error(f"  ❌ Failed to start project {project.id}: {e}")
-        
-        logger.info("✅ Project startup complete")
-    except Exception as e:
-        logger.error(f"Error during project startup: {e}")
-    finally:
-        db.close()
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🏁 Backend starting up...")
     scheduler = SchedulerService()
     scheduler.start()
+    provisioning_workers.start()
+    container_registry.start()
+    log_pipeline.start()
+    secrets_cache.start()
     
-    # Auto-start running projects
-    startup_projects()
+    # Bring RUNNING projects back up in the background; the API is ready immediately
+    # and progress is reported on /api/v1/health/ready
+    start_reconciliation_in_background()
     
     logger.info("✨ Backend ready!")
     yield
     # Shutdown
     logger.info("🛑 Backend shutting down...")
+    env_projector.stop()
+    secrets_cache.stop()
+    log_pipeline.stop()
+    container_registry.stop()
+    provisioning_workers.stop()
     scheduler.stop()
 
 app = FastAPI(title="Supabase Cloud Clone", lifespan=lifespan)
@@ -181,6 +175,8 @@ app.include_router(health_router, prefix=f"{api_v1_prefix}", tags=["Health"])
 app.include_router(functions_router, prefix=f"{api_v1_prefix}/projects", tags=["Functions"])
 app.include_router(secrets_router, prefix=f"{api_v1_prefix}/projects", tags=["Secrets"])
 app.include_router(logs_router, prefix=f"{api_v1_prefix}/projects", tags=["Logs"])
+from api.v1.provisioning_jobs import router as provisioning_jobs_router
+app.include_router(provisioning_jobs_router, prefix=f"{api_v1_prefix}/projects", tags=["Provisioning Jobs"])
 from api.v1.users import router as users_router
 
 app.include_router(users_router, prefix=f"{api_v1_prefix}/users", tags=["Users"])
@@ -188,6 +184,10 @@ app.include_router(orgs_router, prefix=f"{api_v1_prefix}/orgs", tags=["Organizat
 app.include_router(billing_router, prefix=f"{api_v1_prefix}/billing", tags=["Billing"])
 app.include_router(project_users_router, prefix=f"{api_v1_prefix}/projects", tags=["Project Users"])
 
+# Internal request metering ingest (called by the shared routing proxy)
+from api.v1.metering import router as metering_router
+app.include_router(metering_router, prefix=f"{api_v1_prefix}/metering", tags=["Metering"])
+
 # Shared Auth Service - GoTrue-compatible endpoints for shared projects
 from api.v1.shared_auth import router as shared_auth_router
 app.include_router(shared_auth_router, prefix=f"{api_v1_prefix}", tags=["Shared Auth"])
@@ -195,73 +195,17 @@ app.include_router(shared_auth_router, prefix=f"{api_v1_prefix}", tags=["Shared
 # ============================================
 # PROMETHEUS METRICS
 # ============================================
-from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from fastapi import Response
-from core.database import SessionLocal
-
-# Custom metrics
-http_requests_total = Counter(
-    'http_requests_total', 
-    'Total HTTP requests',
-    ['method', 'endpoint', 'status']
-)
-
-http_request_duration_seconds = Histogram(
-    'http_request_duration_seconds',
-    'HTTP request duration in seconds',
-    ['method', 'endpoint']
-)
-
-supalove_projects_total = Gauge(
-    'supalove_projects_total',
-    'Total number of projects'
-)
-
-supalove_users_total = Gauge(
-    'supalove_users_total', 
-    'Total number of platform users'
-)
+from core.metrics import track_requests
 
 @app.get("/metrics")
 def metrics():
-    """Prometheus metrics endpoint."""
-    # Update gauges with current counts
-    try:
-        from sqlalchemy.orm import Session
-        from core.database import SessionLocal
-        db = SessionLocal()
-        
-        project_count = db.query(Project).count()
-        user_count = db.query(User).count()
-        
-        supalove_projects_total.set(project_count)
-        supalove_users_total.set(user_count)
-        
-        db.close()
-    except Exception as e:
-        print(f"Metrics update error: {e}")
-    
+    """Prometheus metrics endpoint. Business gauges are refreshed by the scheduler."""
     return Response(
         content=generate_latest(),
         media_type=CONTENT_TYPE_LATEST
     )
 
-# Middleware to track requests
-import time
-
-@app.middleware("http")
-async def track_requests(request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    duration = time.time() - start_time
-    
-    # Track metrics
-    endpoint = request.url.path
-    method = request.method
-    status = response.status_code
-    
-    http_requests_total.labels(method=method, endpoint=endpoint, status=status).inc()
-    http_request_duration_seconds.labels(method=method, endpoint=endpoint).observe(duration)
-    
-    return response
-
+# Middleware to track requests (labelled by route template, see core/metrics.py)
+app.middleware("http")(track_requests)
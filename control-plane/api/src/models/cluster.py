@@ -25,5 +25,8 @@ class Cluster(Base):
     postgres_host = Column(String, nullable=True)
     postgres_port = Column(Integer, nullable=True)
     api_url = Column(String, nullable=True)
+
+    # Placement cap; falls back to PLACEMENT_MAX_DATABASES when unset
+    max_databases = Column(Integer, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, BigInteger, Float, ForeignKey, DateTime
 from datetime import datetime
 from core.database import Base
 
@@ -10,4 +10,6 @@ class ClusterUsage(Base):
     memory_mb = Column(Integer, default=0)
     active_connections = Column(Integer, default=0)
     db_count = Column(Integer, default=0)
+    db_bytes = Column(BigInteger, default=0)  # Sum of pg_database_size over project DBs
+    max_connections = Column(Integer, nullable=True)  # Server's max_connections, once known
     updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,21 @@
+import uuid
+from sqlalchemy import Column, String, DateTime, JSON, Index
+from datetime import datetime
+from core.database import Base
+
+class PlacementDecision(Base):
+    """Audit record of where a new project was placed and why."""
+    __tablename__ = "placement_decisions"
+    __table_args__ = (
+        Index("ix_placement_decisions_project", "project_id"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+    project_id = Column(String, nullable=True)
+    org_id = Column(String, nullable=True)
+    cluster_id = Column(String, nullable=True)  # None when no cluster had capacity
+    strategy = Column(String, nullable=False)   # "scored" or "private_per_org"
+    # Per candidate: load figures, score components and score, or why it was excluded
+    candidates = Column(JSON, default=list)
+    weights = Column(JSON, default=dict)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,20 @@
+import uuid
+from sqlalchemy import Column, String, Integer, DateTime, UniqueConstraint, Index
+from datetime import datetime
+from core.database import Base
+
+class PortReservation(Base):
+    """A host port handed out to a project stack or cluster stack."""
+    __tablename__ = "port_reservations"
+    __table_args__ = (
+        # One owner never holds two ports under the same name
+        UniqueConstraint("owner_type", "owner_id", "name", name="uq_port_reservations_owner_name"),
+        Index("ix_port_reservations_owner", "owner_type", "owner_id"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+    port = Column(Integer, nullable=False, unique=True)  # Unique: two owners can never get the same port
+    owner_type = Column(String, nullable=False)  # "project" or "cluster"
+    owner_id = Column(String, nullable=False)
+    name = Column(String, nullable=False)  # e.g. DB_PORT, GATEWAY_PORT
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,43 @@
+import enum
+import uuid
+from sqlalchemy import Column, String, Integer, Text, DateTime, Enum, ForeignKey, JSON, Index
+from datetime import datetime
+from core.database import Base
+
+class ProvisioningJobStatus(str, enum.Enum):
+    queued = "queued"          # Waiting for a worker (or for run_after on retry)
+    running = "running"        # Claimed by a worker
+    succeeded = "succeeded"
+    failed = "failed"          # Out of attempts
+
+class ProvisioningJobKind(str, enum.Enum):
+    provision_shared = "provision_shared"  # Create DB + schema + admin user in a shared cluster
+    migrate_cluster = "migrate_cluster"    # Move a shared project's DB to another cluster
+
+class ProvisioningJob(Base):
+    __tablename__ = "provisioning_jobs"
+    __table_args__ = (
+        # Claim query: next queued job whose run_after has passed
+        Index("ix_provisioning_jobs_claim", "status", "run_after"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+    project_id = Column(String, ForeignKey("projects.id"), nullable=False, index=True)
+    kind = Column(Enum(ProvisioningJobKind), nullable=False)
+    status = Column(Enum(ProvisioningJobStatus), default=ProvisioningJobStatus.queued, nullable=False)
+    payload = Column(JSON, default=dict)
+    result = Column(JSON, nullable=True)
+
+    # Retry bookkeeping
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    # Lease held by the worker that claimed the job
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Text, DateTime, Index
+from core.database import Base
+
+class QueryStat(Base):
+    """
+    What one normalized statement of a project did between two pg_stat_statements
+    snapshots of its cluster (only intervals in which it ran are stored).
+    """
+    __tablename__ = "query_stats"
+    __table_args__ = (
+        Index("ix_query_stats_project_bucket", "project_id", "bucket_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(String, nullable=False)
+    cluster_id = Column(String, nullable=False)
+    bucket_at = Column(DateTime, nullable=False, index=True)  # Time of the snapshot closing the interval (UTC)
+    queryid = Column(BigInteger, nullable=False)
+    user_name = Column(String, nullable=True)
+    query = Column(Text, nullable=False)
+
+    # Deltas over the interval
+    calls = Column(BigInteger, nullable=False)
+    total_time_ms = Column(Float, nullable=False)
+    rows = Column(BigInteger, nullable=False)
+    shared_blks_hit = Column(BigInteger, default=0)
+    shared_blks_read = Column(BigInteger, default=0)
@@ -0,0 +1,26 @@
+import hashlib
+from sqlalchemy import Column, String, Integer, Float, Text, DateTime, Index
+from core.database import Base
+
+def _statement_md5(context) -> str:
+    return hashlib.md5(context.get_current_parameters()["statement"].encode()).hexdigest()
+
+class SlowQuery(Base):
+    """A statement that ran longer than the cluster's log_min_duration_statement."""
+    __tablename__ = "slow_queries"
+    __table_args__ = (
+        Index("ix_slow_queries_project_occurred", "project_id", "occurred_at"),
+        # One row per log record, however many API processes read the log
+        Index("uq_slow_queries_record", "project_id", "occurred_at", "pid", "statement_md5", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # Increasing, used as page cursor
+    project_id = Column(String, nullable=False)
+    occurred_at = Column(DateTime, nullable=False, index=True)  # When the statement finished (UTC)
+    pid = Column(Integer, nullable=False, default=0)  # Backend that logged it
+    duration_ms = Column(Float, nullable=False)
+    database = Column(String, nullable=True)
+    user_name = Column(String, nullable=True)
+    application = Column(String, nullable=True)
+    statement = Column(Text, nullable=False)
+    statement_md5 = Column(String(32), nullable=False, default=_statement_md5)
@@ -1,19 +1,40 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
+import enum
 from datetime import datetime
 from core.database import Base
 
+class UsageResolution(str, enum.Enum):
+    minute = "1m"  # Raw scheduler samples, short retention
+    hour = "1h"    # Rolled up from 1m buckets
+    day = "1d"     # Rolled up from 1h buckets, long retention
+
 class UsageRecord(Base):
     __tablename__ = "usage_records"
+    __table_args__ = (
+        # One row per org per bucket, so samples and rollups can be upserted
+        UniqueConstraint("org_id", "resolution", "recorded_at", name="uq_usage_records_bucket"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     org_id = Column(String, ForeignKey("organizations.id"), nullable=False)
-    
+
     # Snapshot Data
     projects_count = Column(Integer, default=0)
     database_size_mb = Column(Integer, default=0)
     storage_size_mb = Column(Integer, default=0)
     api_requests_count = Column(Integer, default=0)
-    
+
+    # Time-series bucket (recorded_at is the bucket start)
+    resolution = Column(String, default=UsageResolution.minute.value, nullable=False, index=True)
+    database_size_bytes = Column(BigInteger, default=0)
+    storage_bytes = Column(BigInteger, default=0)
+    sample_count = Column(Integer, default=0)
+
+    # Request metering (deltas flushed by the routing proxy)
+    bytes_in = Column(BigInteger, default=0)
+    bytes_out = Column(BigInteger, default=0)
+    api_latency_ms_total = Column(BigInteger, default=0)  # avg = total / api_requests_count
+
     recorded_at = Column(DateTime, default=datetime.utcnow)
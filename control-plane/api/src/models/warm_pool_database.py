@@ -0,0 +1,27 @@
+import enum
+import uuid
+from sqlalchemy import Column, String, DateTime, Enum, ForeignKey, Text, Index
+from datetime import datetime
+from core.database import Base
+
+class WarmPoolStatus(str, enum.Enum):
+    creating = "creating"  # Filler is creating/migrating the database
+    ready = "ready"        # Migrated and waiting to be claimed
+    claimed = "claimed"    # Renamed into a project database
+    failed = "failed"      # Creation failed; filler drops it
+
+class WarmPoolDatabase(Base):
+    __tablename__ = "warm_pool_databases"
+    __table_args__ = (
+        Index("ix_warm_pool_databases_claim", "cluster_id", "status"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+    cluster_id = Column(String, ForeignKey("clusters.id"), nullable=False)
+    db_name = Column(String, unique=True, nullable=False)  # supalove_pool_<hex>; role is <db_name>_user
+    status = Column(Enum(WarmPoolStatus), default=WarmPoolStatus.creating, nullable=False)
+    project_id = Column(String, nullable=True)  # Set once claimed
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    ready_at = Column(DateTime, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,123 @@
+-- Supabase-compatible baseline for shared project databases.
+-- Statements are idempotent so this can also be recorded on databases
+-- provisioned before migrations were tracked.
+-- The cluster-wide authenticator role and per-project grants are applied
+-- by shared_provisioning_service, not here.
+
+-- Create required schemas
+CREATE SCHEMA IF NOT EXISTS auth;
+CREATE SCHEMA IF NOT EXISTS storage;
+CREATE SCHEMA IF NOT EXISTS _realtime;
+CREATE SCHEMA IF NOT EXISTS graphql_public;
+
+-- Create required roles for Supabase services
+DO $$ BEGIN
+    CREATE ROLE anon NOLOGIN NOINHERIT;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$ BEGIN
+    CREATE ROLE authenticated NOLOGIN NOINHERIT;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$ BEGIN
+    CREATE ROLE service_role NOLOGIN NOINHERIT BYPASSRLS;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+-- Grant schema access to project roles
+GRANT USAGE ON SCHEMA public TO anon, authenticated, service_role;
+GRANT USAGE ON SCHEMA auth TO anon, authenticated, service_role;
+GRANT USAGE ON SCHEMA storage TO anon, authenticated, service_role;
+
+-- Enable Row Level Security functionality
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON TABLES TO anon, authenticated, service_role;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON SEQUENCES TO anon, authenticated, service_role;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON FUNCTIONS TO anon, authenticated, service_role;
+
+-- ============================================
+-- AUTH.USERS TABLE (Supabase Compatible)
+-- ============================================
+CREATE TABLE IF NOT EXISTS auth.users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    email TEXT UNIQUE NOT NULL,
+    encrypted_password TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    email_confirmed_at TIMESTAMPTZ,
+    last_sign_in_at TIMESTAMPTZ,
+    role TEXT DEFAULT 'authenticated',
+    aud TEXT DEFAULT 'authenticated',
+    user_metadata JSONB DEFAULT '{}',
+    app_metadata JSONB DEFAULT '{}'
+);
+
+-- Create auth.uid() function for RLS policies
+CREATE OR REPLACE FUNCTION auth.uid() 
+RETURNS UUID 
+LANGUAGE sql STABLE
+AS $$
+    SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::uuid
+$$;
+
+-- Create auth.role() function for RLS policies
+CREATE OR REPLACE FUNCTION auth.role() 
+RETURNS TEXT 
+LANGUAGE sql STABLE
+AS $$
+    SELECT NULLIF(current_setting('request.jwt.claim.role', true), '')::text
+$$;
+
+-- Create auth.jwt() function for RLS policies
+CREATE OR REPLACE FUNCTION auth.jwt() 
+RETURNS JSONB 
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(
+        current_setting('request.jwt.claims', true),
+        '{}'
+    )::jsonb
+$$;
+
+GRANT EXECUTE ON FUNCTION auth.uid() TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION auth.role() TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION auth.jwt() TO anon, authenticated, service_role;
+
+-- ============================================
+-- STORAGE TABLES
+-- ============================================
+CREATE TABLE IF NOT EXISTS storage.buckets (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    owner UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    public BOOLEAN DEFAULT FALSE,
+    avif_autoprovision BOOLEAN DEFAULT FALSE,
+    file_size_limit BIGINT,
+    allowed_mime_types TEXT[]
+);
+
+CREATE TABLE IF NOT EXISTS storage.objects (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    bucket_id TEXT REFERENCES storage.buckets(id),
+    name TEXT,
+    owner UUID,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    last_accessed_at TIMESTAMPTZ DEFAULT NOW(),
+    metadata JSONB,
+    path_tokens TEXT[] GENERATED ALWAYS AS (string_to_array(name, '/')) STORED
+);
+
+-- ============================================
+-- REALTIME PUBLICATION
+-- ============================================
+DO $$ BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+        CREATE PUBLICATION supabase_realtime;
+    END IF;
+EXCEPTION WHEN OTHERS THEN 
+    RAISE NOTICE 'Could not create publication';
+END $$;
@@ -0,0 +1,254 @@
+"""
+API Keys
+
+A project's anon and service_role keys are long-lived JWTs signed with its
+JWT_SECRET. They are issued once and stored as the ANON_KEY and
+SERVICE_ROLE_KEY secrets. What the dashboard and the gateways are served is
+cached per project and secrets version (see secrets_cache), so nothing is
+signed or verified again until the project's secrets change.
+
+Rotating the JWT secret issues new keys and keeps the previous secret and keys
+(the *_PREVIOUS secrets) until JWT_SECRET_PREVIOUS_EXPIRES_AT. Until then,
+tokens signed with either secret and either pair of keys are accepted. The
+current secret is always tried first, so verification only costs more for
+tokens signed with the old one. Expired previous secrets are removed by the
+scheduler, but they stop being accepted at the expiry either way.
+"""
+import datetime
+import hashlib
+import os
+import secrets as py_secrets
+import threading
+from typing import Dict, List, Optional
+
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+from sqlalchemy.orm import Session
+
+from models.project_secret import ProjectSecret
+from services.secrets_cache import secrets_cache
+from services.secrets_service import apply_secret_changes
+
+JWT_ROTATION_OVERLAP_SECONDS = int(os.getenv("JWT_ROTATION_OVERLAP_SECONDS", "86400"))
+API_KEY_LIFETIME_DAYS = 365 * 10
+ALGORITHM = "HS256"
+
+# Secret name of each issued key, by role
+KEY_SECRETS = {"anon": "ANON_KEY", "service_role": "SERVICE_ROLE_KEY"}
+PREVIOUS_SECRETS = ["JWT_SECRET_PREVIOUS", "ANON_KEY_PREVIOUS", "SERVICE_ROLE_KEY_PREVIOUS", "JWT_SECRET_PREVIOUS_EXPIRES_AT"]
+
+# project_id -> keys and secrets as of a secrets version
+_issued: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def issue_api_key(role: str, jwt_secret: str, now: Optional[datetime.datetime] = None) -> str:
+    now = now or datetime.datetime.utcnow()
+    payload = {
+        "role": role,
+        "iss": "supabase",
+        "iat": int(now.timestamp()),
+        "exp": int((now + datetime.timedelta(days=API_KEY_LIFETIME_DAYS)).timestamp()),
+    }
+    return jwt.encode(payload, jwt_secret, algorithm=ALGORITHM)
+
+
+def key_hash(key: str) -> str:
+    """What gateways compare API keys by, so they never hold the keys themselves."""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def decode_project_token(token: str, jwt_secrets: List[str], **options) -> dict:
+    """
+    jwt.decode against each of a project's accepted secrets in turn. A token
+    whose signature matched but whose claims didn't (expired, wrong audience)
+    is rejected without trying the others.
+    """
+    error = JWTError("Project has no JWT secret")
+    for jwt_secret in jwt_secrets:
+        try:
+            return jwt.decode(token, jwt_secret, algorithms=[ALGORITHM], **options)
+        except (ExpiredSignatureError, JWTClaimsError):
+            raise
+        except JWTError as e:
+            error = e
+    raise error
+
+
+def _signed_with(key: str, jwt_secret: str, role: str) -> bool:
+    try:
+        claims = jwt.decode(key, jwt_secret, algorithms=[ALGORITHM], options={"verify_aud": False})
+    except JWTError:
+        return False
+    return claims.get("role") == role
+
+
+class ApiKeyService:
+
+    @staticmethod
+    def _state(db: Session, project_id: str) -> Optional[dict]:
+        """Keys and secrets of a project as of its current secrets version; None without a JWT secret."""
+        version, secrets = secrets_cache.get(db, project_id)
+        with _lock:
+            state = _issued.get(project_id)
+        if state and version is not None and state["version"] == version:
+            return state
+
+        jwt_secret = secrets.get("JWT_SECRET")
+        if not jwt_secret:
+            return None
+
+        # Keys missing, or not signed with the current secret (e.g. JWT_SECRET set by hand), are reissued
+        reissue = {
+            name: issue_api_key(role, jwt_secret)
+            for role, name in KEY_SECRETS.items()
+            if not secrets.get(name) or not _signed_with(secrets[name], jwt_secret, role)
+        }
+        if reissue:
+            print(f"[ApiKeys] Reissuing {', '.join(reissue)} of project {project_id}")
+            apply_secret_changes(db, project_id, reissue)
+            version, secrets = secrets_cache.get(db, project_id)
+
+        previous = None
+        if secrets.get("JWT_SECRET_PREVIOUS") and secrets.get("JWT_SECRET_PREVIOUS_EXPIRES_AT"):
+            previous = {
+                "jwt_secret": secrets["JWT_SECRET_PREVIOUS"],
+                "keys": [k for k in (secrets.get("ANON_KEY_PREVIOUS"), secrets.get("SERVICE_ROLE_KEY_PREVIOUS")) if k],
+                "expires_at": float(secrets["JWT_SECRET_PREVIOUS_EXPIRES_AT"]),
+            }
+
+        state = {
+            "version": version,
+            "jwt_secret": jwt_secret,
+            "anon_key": secrets["ANON_KEY"],
+            "service_role_key": secrets["SERVICE_ROLE_KEY"],
+            "previous": previous,
+        }
+        state["key_hashes"] = [key_hash(state["anon_key"]), key_hash(state["service_role_key"])]
+        if previous:
+            previous["key_hashes"] = [key_hash(k) for k in previous["keys"]]
+        if version is not None:
+            with _lock:
+                _issued[project_id] = state
+        return state
+
+    @staticmethod
+    def _active_previous(state: dict, now: Optional[datetime.datetime]) -> Optional[dict]:
+        previous = state["previous"]
+        timestamp = (now or datetime.datetime.utcnow()).replace(tzinfo=datetime.timezone.utc).timestamp()
+        if previous and previous["expires_at"] > timestamp:
+            return previous
+        return None
+
+    @staticmethod
+    def get_keys(db: Session, project_id: str) -> Optional[dict]:
+        """The project's current JWT secret and API keys; None if it has no JWT secret."""
+        state = ApiKeyService._state(db, project_id)
+        if state is None:
+            return None
+        return {
+            "jwt_secret": state["jwt_secret"],
+            "anon_key": state["anon_key"],
+            "service_role_key": state["service_role_key"],
+        }
+
+    @staticmethod
+    def verification_secrets(db: Session, project_id: str, now: Optional[datetime.datetime] = None) -> List[str]:
+        """Secrets tokens of the project may be signed with, current first."""
+        state = ApiKeyService._state(db, project_id)
+        if state is None:
+            return []
+        previous = ApiKeyService._active_previous(state, now)
+        return [state["jwt_secret"]] + ([previous["jwt_secret"]] if previous else [])
+
+    @staticmethod
+    def accepted_keys(db: Session, project_id: str, now: Optional[datetime.datetime] = None) -> Optional[dict]:
+        """SHA-256 hashes of the API keys gateways should accept, and until when the list holds."""
+        state = ApiKeyService._state(db, project_id)
+        if state is None:
+            return None
+        previous = ApiKeyService._active_previous(state, now)
+        return {
+            "key_hashes": state["key_hashes"] + (previous["key_hashes"] if previous else []),
+            "valid_until": previous["expires_at"] if previous else None,
+        }
+
+    @staticmethod
+    def rotate_jwt_secret(db: Session, project_id: str, overlap_seconds: Optional[int] = None,
+                          now: Optional[datetime.datetime] = None) -> dict:
+        """
+        Replace the JWT secret and API keys. The previous ones stay accepted for
+        overlap_seconds (JWT_ROTATION_OVERLAP_SECONDS by default; 0 drops them now).
+        Raises ValueError if a previous rotation's overlap hasn't ended.
+        """
+        overlap_seconds = JWT_ROTATION_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+        if overlap_seconds < 0:
+            raise ValueError("overlap_seconds can't be negative")
+        now = now or datetime.datetime.utcnow()
+
+        state = ApiKeyService._state(db, project_id)
+        if state is None:
+            raise ValueError(f"Project {project_id} has no JWT secret")
+        if ApiKeyService._active_previous(state, now):
+            raise ValueError("The previous rotation's overlap window hasn't ended yet")
+
+        jwt_secret = py_secrets.token_urlsafe(32)
+        changes = {
+            "JWT_SECRET": jwt_secret,
+            "ANON_KEY": issue_api_key("anon", jwt_secret, now),
+            "SERVICE_ROLE_KEY": issue_api_key("service_role", jwt_secret, now),
+        }
+        expires_at = now + datetime.timedelta(seconds=overlap_seconds)
+        if overlap_seconds:
+            changes.update({
+                "JWT_SECRET_PREVIOUS": state["jwt_secret"],
+                "ANON_KEY_PREVIOUS": state["anon_key"],
+                "SERVICE_ROLE_KEY_PREVIOUS": state["service_role_key"],
+                "JWT_SECRET_PREVIOUS_EXPIRES_AT": str(int(expires_at.replace(tzinfo=datetime.timezone.utc).timestamp())),
+            })
+        else:
+            changes.update({name: None for name in PREVIOUS_SECRETS})
+        apply_secret_changes(db, project_id, changes)
+        ApiKeyService._invalidate_gateway(db, project_id)
+
+        return {
+            "anon_key": changes["ANON_KEY"],
+            "service_role_key": changes["SERVICE_ROLE_KEY"],
+            "previous_valid_until": expires_at.isoformat() if overlap_seconds else None,
+        }
+
+    @staticmethod
+    def _invalidate_gateway(db: Session, project_id: str):
+        """Make the project's gateway fetch its accepted keys again instead of waiting for its cache to expire."""
+        import httpx
+        from models.cluster import Cluster
+        from models.project import Project
+        from services.metering_service import METERING_TOKEN
+        from services.shared_provisioning_service import SHARED_GATEWAY_URL
+
+        if not METERING_TOKEN:
+            return
+        cluster = db.query(Cluster).join(Project, Project.cluster_id == Cluster.id).filter(Project.id == project_id).first()
+        gateway = (cluster.api_url if cluster else None) or SHARED_GATEWAY_URL
+        try:
+            httpx.post(
+                f"{gateway.rstrip('/')}/internal/projects/{project_id}/invalidate",
+                headers={"X-Metering-Token": METERING_TOKEN},
+                timeout=5.0,
+            ).raise_for_status()
+        except Exception as e:
+            print(f"[ApiKeys] Could not invalidate gateway cache at {gateway}: {e}")
+
+    @staticmethod
+    def expire_previous(db: Session, now: Optional[datetime.datetime] = None) -> int:
+        """Drop previous JWT secrets whose overlap window ended. Returns projects cleaned up."""
+        timestamp = (now or datetime.datetime.utcnow()).replace(tzinfo=datetime.timezone.utc).timestamp()
+        expired = [
+            project_id for project_id, value in db.query(ProjectSecret.project_id, ProjectSecret.value).filter(
+                ProjectSecret.key == "JWT_SECRET_PREVIOUS_EXPIRES_AT"
+            ).all()
+            if float(value) <= timestamp
+        ]
+        for project_id in expired:
+            apply_secret_changes(db, project_id, {name: None for name in PREVIOUS_SECRETS})
+        return len(expired)
@@ -7,7 +7,7 @@ from typing import List, Dict, Any
 
 from services.storage_service import StorageService
 from services.project_service import get_project_by_id
-from models.project_secret import ProjectSecret
+from services.secrets_service import get_project_secrets
 from core.database import SessionLocal
 
 class BackupService:
@@ -25,8 +25,7 @@ class BackupService:
         """
         db = SessionLocal()
         try:
-            secrets = db.query(ProjectSecret).filter(ProjectSecret.project_id == project_id).all()
-            secret_map = {s.key: s.value for s in secrets}
+            secret_map = get_project_secrets(db, project_id)
             
             # Get database connection details from secrets
             db_host = secret_map.get("DB_HOST", "localhost")
@@ -0,0 +1,22 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any
+
+class ClusterDriver(ABC):
+    """Abstract base class for backends that run a shared Postgres stack (a cluster)."""
+
+    @abstractmethod
+    def provision(self, cluster_id: str, timeout_seconds: int) -> Dict[str, Any]:
+        """
+        Bring up the cluster's stack and wait until it is healthy.
+        Returns postgres_host, postgres_port and api_url as seen from the control plane.
+        """
+        pass
+
+    @abstractmethod
+    def destroy(self, cluster_id: str) -> None:
+        """Tear the stack down and delete its data."""
+        pass
+
+    def is_healthy(self, cluster_id: str) -> bool:
+        """Whether the cluster's stack is up. Drivers that can't tell return False."""
+        return False
@@ -0,0 +1,199 @@
+"""
+Local Docker cluster driver.
+
+Each private cluster is a copy of the shared stack (data-plane/shared/docker-compose.yml)
+run as its own Compose project. The shared file pins container names, host ports
+and the network name, so a generated override clears container names, publishes
+only Postgres and the routing gateway on host ports reserved through the port
+allocator (PORT_RANGE_CLUSTER), and names the network after the cluster.
+Cluster files live in data-plane/clusters/<cluster_id>.
+"""
+import os
+import re
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+import httpx
+
+from core.database import SessionLocal
+from services.cluster_driver_interface import ClusterDriver
+from services.port_allocator import PortAllocator
+from services.provisioning_local import PROJECT_ROOT
+
+SHARED_STACK_DIR = PROJECT_ROOT / "data-plane" / "shared"
+SHARED_STACK_COMPOSE = SHARED_STACK_DIR / "docker-compose.yml"
+
+env_clusters_dir = os.getenv("DATA_PLANE_CLUSTERS_DIR")
+BASE_CLUSTERS_DIR = Path(env_clusters_dir) if env_clusters_dir else PROJECT_ROOT / "data-plane" / "clusters"
+
+# Host the published cluster ports are reachable on from the control plane
+CLUSTER_DOCKER_HOST = os.getenv("CLUSTER_DOCKER_HOST", "localhost")
+
+POSTGRES_SERVICE = "shared-postgres"
+GATEWAY_SERVICE = "shared-gateway-v3"
+
+# Passed through from the control plane's environment to every cluster stack
+_PASSTHROUGH_ENV = ("SHARED_POSTGRES_PASSWORD", "SHARED_JWT_SECRET", "METERING_TOKEN", "CONTROL_PLANE_URL", "SECRET_KEY_BASE")
+
+
+def _service_names(compose_text: str) -> List[str]:
+    """Top-level service keys of the compose file (two-space indented under `services:`)."""
+    names = []
+    in_services = False
+    for line in compose_text.splitlines():
+        if re.match(r"^\S", line):
+            in_services = line.startswith("services:")
+            continue
+        match = re.match(r"^  ([A-Za-z0-9_.-]+):\s*$", line)
+        if in_services and match:
+            names.append(match.group(1))
+    return names
+
+
+def _compose_project(cluster_id: str) -> str:
+    return "supalove-" + re.sub(r"[^a-z0-9_-]", "-", cluster_id.lower())
+
+
+class LocalDockerClusterDriver(ClusterDriver):
+    """Runs each cluster as a separate Docker Compose project on the local daemon."""
+
+    def _cluster_dir(self, cluster_id: str) -> Path:
+        return BASE_CLUSTERS_DIR / cluster_id
+
+    def _compose(self, cluster_id: str, *args: str, timeout: float) -> subprocess.CompletedProcess:
+        cluster_dir = self._cluster_dir(cluster_id)
+        cmd = [
+            "docker", "compose",
+            "-p", _compose_project(cluster_id),
+            "-f", str(SHARED_STACK_COMPOSE),
+            "-f", str(cluster_dir / "docker-compose.override.yml"),
+            "--env-file", str(cluster_dir / ".env"),
+            *args,
+        ]
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=max(timeout, 1))
+
+    def _write_files(self, cluster_id: str, postgres_port: int, gateway_port: int):
+        cluster_dir = self._cluster_dir(cluster_id)
+        cluster_dir.mkdir(parents=True, exist_ok=True)
+
+        override = ["services:"]
+        for service in _service_names(SHARED_STACK_COMPOSE.read_text()):
+            override += [f"  {service}:", "    container_name: !reset null"]
+            if service == POSTGRES_SERVICE:
+                override += ["    ports: !override", f'      - "{postgres_port}:5432"']
+            elif service == GATEWAY_SERVICE:
+                override += ["    ports: !override", f'      - "{gateway_port}:8000"']
+            else:
+                override.append("    ports: !reset []")
+        override += ["networks:", "  default:", f"    name: {_compose_project(cluster_id)}_net", ""]
+        (cluster_dir / "docker-compose.override.yml").write_text("\n".join(override))
+
+        env_content = f"# Cluster: {cluster_id}\n# Managed by Control Plane\n"
+        env_content += f"POSTGRES_PORT={postgres_port}\nGATEWAY_PORT={gateway_port}\n"
+        for key in _PASSTHROUGH_ENV:
+            if os.getenv(key):
+                env_content += f"{key}={os.getenv(key)}\n"
+        (cluster_dir / ".env").write_text(env_content)
+
+    def _read_ports(self, cluster_id: str):
+        env_file = self._cluster_dir(cluster_id) / ".env"
+        if not env_file.exists():
+            return None
+        values = dict(
+            line.split("=", 1) for line in env_file.read_text().splitlines()
+            if "=" in line and not line.startswith("#")
+        )
+        return int(values["POSTGRES_PORT"]), int(values["GATEWAY_PORT"])
+
+    def _wait_for_postgres(self, port: int, deadline: float):
+        from services.shared_provisioning_service import get_custom_connection
+
+        last_error = None
+        while time.monotonic() < deadline:
+            try:
+                conn = get_custom_connection(CLUSTER_DOCKER_HOST, port)
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT 1")
+                    cursor.close()
+                    return
+                finally:
+                    conn.close()
+            except Exception as e:
+                last_error = e
+                time.sleep(2)
+        raise TimeoutError(f"Postgres on port {port} not healthy in time: {last_error}")
+
+    def _wait_for_gateway(self, api_url: str, deadline: float):
+        last_error = None
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{api_url}/health", timeout=5.0).status_code == 200:
+                    return
+            except Exception as e:
+                last_error = e
+            time.sleep(2)
+        raise TimeoutError(f"Gateway at {api_url} not healthy in time: {last_error}")
+
+    def provision(self, cluster_id: str, timeout_seconds: int) -> Dict[str, Any]:
+        deadline = time.monotonic() + timeout_seconds
+        if not SHARED_STACK_COMPOSE.exists():
+            raise FileNotFoundError(f"Shared stack compose file not found at {SHARED_STACK_COMPOSE}")
+
+        # Reservations are per cluster, so a retried provisioning gets the same ports back
+        db = SessionLocal()
+        try:
+            ports = PortAllocator.allocate(db, "cluster", cluster_id, ["POSTGRES_PORT", "GATEWAY_PORT"])
+        finally:
+            db.close()
+        postgres_port, gateway_port = ports["POSTGRES_PORT"], ports["GATEWAY_PORT"]
+        self._write_files(cluster_id, postgres_port, gateway_port)
+
+        print(f"[ClusterDriver] Starting stack for cluster {cluster_id} (postgres :{postgres_port}, gateway :{gateway_port})")
+        try:
+            result = self._compose(cluster_id, "up", "-d", "--build", timeout=deadline - time.monotonic())
+        except subprocess.TimeoutExpired:
+            raise TimeoutError(f"docker compose up for cluster {cluster_id} timed out")
+        if result.returncode != 0:
+            raise RuntimeError(f"docker compose up failed for cluster {cluster_id}: {result.stderr[-2000:]}")
+
+        api_url = f"http://{CLUSTER_DOCKER_HOST}:{gateway_port}"
+        self._wait_for_postgres(postgres_port, deadline)
+        self._wait_for_gateway(api_url, deadline)
+
+        return {
+            "postgres_host": CLUSTER_DOCKER_HOST,
+            "postgres_port": postgres_port,
+            "api_url": api_url,
+        }
+
+    def destroy(self, cluster_id: str) -> None:
+        cluster_dir = self._cluster_dir(cluster_id)
+        if cluster_dir.exists():
+            try:
+                result = self._compose(cluster_id, "down", "-v", "--remove-orphans", timeout=300)
+                if result.returncode != 0:
+                    raise RuntimeError(f"docker compose down failed for cluster {cluster_id}: {result.stderr[-2000:]}")
+            except subprocess.TimeoutExpired:
+                raise TimeoutError(f"docker compose down for cluster {cluster_id} timed out")
+            shutil.rmtree(cluster_dir)
+            print(f"[ClusterDriver] Removed stack for cluster {cluster_id}")
+
+        db = SessionLocal()
+        try:
+            PortAllocator.release(db, "cluster", cluster_id)
+        finally:
+            db.close()
+
+    def is_healthy(self, cluster_id: str) -> bool:
+        ports = self._read_ports(cluster_id)
+        if not ports:
+            return False
+        try:
+            self._wait_for_postgres(ports[0], time.monotonic() + 5)
+            return True
+        except TimeoutError:
+            return False
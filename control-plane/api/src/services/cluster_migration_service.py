@@ -0,0 +1,632 @@
+"""
+Cluster Migration Service
+
+Moves a shared project's database to another cluster, keeping the write freeze
+to a short cutover. Runs as a `migrate_cluster` provisioning job.
+
+1. Prepare: the project role (same password) and an empty database on the target.
+2. Copy: pg_dump streamed straight into pg_restore on the target (no dump file).
+   When the source runs with wal_level=logical, the dump is taken from the
+   snapshot exported by a new replication slot while writes carry on, and a
+   subscription on the target then replays everything written since.
+   Otherwise writes are frozen for the whole copy.
+3. Cutover: the source database is made read-only and its sessions are
+   terminated. Once the target has caught up, sequences are synced, row counts
+   are compared, and cluster_id and the connection secrets are switched in one
+   control-plane transaction.
+4. Placement and the gateways of both clusters drop what they cached for the
+   project; the source database is dropped.
+
+Tables without a primary key get REPLICA IDENTITY FULL for the replication and
+their default identity back once the attempt ends, whichever way it ends.
+Every attempt first removes leftovers of a previous one, so the job can be retried.
+DDL run on the project during the copy is not replicated; the subscription
+then stalls, catch-up times out and the attempt is rolled back.
+"""
+import json
+import os
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import make_dsn
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.cluster import Cluster, ClusterStatus, ClusterType
+from models.project import Project, ProjectPlan, ProjectStatus
+from models.project_secret import ProjectSecret
+from services.provisioning_job_service import JobDeferred
+from services.secrets_cache import secrets_changed
+from services.secrets_service import get_secret
+from services.shared_provisioning_service import (
+    create_project_database,
+    get_custom_connection,
+    SHARED_GATEWAY_URL,
+    SHARED_POSTGRES_HOST,
+    SHARED_POSTGRES_PORT,
+    SHARED_POSTGRES_USER,
+    SHARED_POSTGRES_PASSWORD,
+)
+
+# auto: logical replication when the source allows it, else a frozen dump/restore
+MIGRATION_MODE = os.getenv("MIGRATION_MODE", "auto")
+# Host the target cluster's Postgres uses to reach the source for replication
+MIGRATION_REPLICATION_HOST = os.getenv("MIGRATION_REPLICATION_HOST", "")
+MIGRATION_COPY_TIMEOUT_SECONDS = int(os.getenv("MIGRATION_COPY_TIMEOUT_SECONDS", "3600"))
+# Replication lag under which the freeze starts, and how long to wait for it
+MIGRATION_CATCHUP_LAG_BYTES = int(os.getenv("MIGRATION_CATCHUP_LAG_BYTES", str(16 * 1024 * 1024)))
+MIGRATION_CATCHUP_TIMEOUT_SECONDS = int(os.getenv("MIGRATION_CATCHUP_TIMEOUT_SECONDS", "1800"))
+# Longest the source may stay frozen waiting for the last changes
+MIGRATION_CUTOVER_TIMEOUT_SECONDS = int(os.getenv("MIGRATION_CUTOVER_TIMEOUT_SECONDS", "60"))
+MIGRATION_VERIFY_COUNTS = os.getenv("MIGRATION_VERIFY_COUNTS", "true").lower() == "true"
+MIGRATION_MAX_ATTEMPTS = int(os.getenv("MIGRATION_MAX_ATTEMPTS", "3"))
+
+# Secrets describing where the database lives
+_ENDPOINT_SECRETS = ("DB_PORT", "SHARED_POSTGRES_HOST")
+# Cluster-wide roles project databases grant to; pg_restore skips grants to missing ones
+_API_ROLES = ("anon", "authenticated", "service_role")
+
+
+class MigrationAborted(Exception):
+    pass
+
+
+def _endpoint(cluster: Cluster):
+    return cluster.postgres_host or SHARED_POSTGRES_HOST, cluster.postgres_port or SHARED_POSTGRES_PORT
+
+
+def _replication_name(project_id: str) -> str:
+    return f"supalove_migrate_{project_id}"
+
+
+def _admin(cluster: Cluster, dbname: Optional[str] = None):
+    host, port = _endpoint(cluster)
+    conn = get_custom_connection(host, port, dbname=dbname)
+    conn.autocommit = True
+    return conn
+
+
+def _database_exists(cursor, db_name: str) -> bool:
+    cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", [db_name])
+    return cursor.fetchone() is not None
+
+
+def _terminate(cursor, db_name: str, keep_walsenders: bool = False):
+    query = "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = %s AND pid <> pg_backend_pid()"
+    if keep_walsenders:
+        query += " AND backend_type <> 'walsender'"
+    cursor.execute(query, [db_name])
+
+
+def _set_frozen(cluster: Cluster, db_name: str, frozen: bool):
+    """Make new sessions on the database read-only (and drop current ones), or undo it."""
+    conn = _admin(cluster)
+    cursor = conn.cursor()
+    try:
+        if not _database_exists(cursor, db_name):
+            return
+        if frozen:
+            cursor.execute(sql.SQL("ALTER DATABASE {} SET default_transaction_read_only = on").format(
+                sql.Identifier(db_name)
+            ))
+            # Open sessions keep their settings; make clients reconnect into read-only ones.
+            # The walsender feeding the target must stay up to deliver the last changes.
+            _terminate(cursor, db_name, keep_walsenders=True)
+        else:
+            cursor.execute(sql.SQL("ALTER DATABASE {} RESET default_transaction_read_only").format(
+                sql.Identifier(db_name)
+            ))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _drop_subscription(cluster: Cluster, db_name: str, name: str):
+    conn = _admin(cluster)
+    cursor = conn.cursor()
+    try:
+        if not _database_exists(cursor, db_name):
+            return
+    finally:
+        cursor.close()
+        conn.close()
+
+    conn = _admin(cluster, db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM pg_subscription WHERE subname = %s", [name])
+        if cursor.fetchone():
+            # Detach from the slot first; the slot lives on the source and is dropped there
+            cursor.execute(sql.SQL("ALTER SUBSCRIPTION {} DISABLE").format(sql.Identifier(name)))
+            cursor.execute(sql.SQL("ALTER SUBSCRIPTION {} SET (slot_name = NONE)").format(sql.Identifier(name)))
+            cursor.execute(sql.SQL("DROP SUBSCRIPTION {}").format(sql.Identifier(name)))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _drop_replication(cluster: Cluster, db_name: str, name: str):
+    """Drop the slot and publication used for a migration off `cluster`."""
+    conn = _admin(cluster)
+    cursor = conn.cursor()
+    try:
+        # A slot can't be dropped while a walsender still streams from it
+        for _ in range(20):
+            cursor.execute(
+                "SELECT active_pid, pg_terminate_backend(active_pid) FROM pg_replication_slots "
+                "WHERE slot_name = %s AND active_pid IS NOT NULL", [name]
+            )
+            if cursor.fetchone() is None:
+                break
+            time.sleep(0.5)
+        cursor.execute(
+            "SELECT pg_drop_replication_slot(slot_name) FROM pg_replication_slots WHERE slot_name = %s", [name]
+        )
+        exists = _database_exists(cursor, db_name)
+    finally:
+        cursor.close()
+        conn.close()
+
+    if exists:
+        conn = _admin(cluster, db_name)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql.SQL("DROP PUBLICATION IF EXISTS {}").format(sql.Identifier(name)))
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def _drop_database(cluster: Cluster, db_name: str, drop_role: bool):
+    conn = _admin(cluster)
+    cursor = conn.cursor()
+    try:
+        _terminate(cursor, db_name)
+        cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(db_name)))
+        if drop_role:
+            cursor.execute(sql.SQL("DROP ROLE IF EXISTS {}").format(sql.Identifier(f"{db_name}_user")))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _wal_level(cluster: Cluster) -> str:
+    conn = _admin(cluster)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW wal_level")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _stream_copy(source: Cluster, target: Cluster, db_name: str, snapshot: Optional[str] = None) -> Optional[str]:
+    """pg_dump from the source piped into pg_restore on the target. Returns restore warnings."""
+    source_host, source_port = _endpoint(source)
+    target_host, target_port = _endpoint(target)
+    env = os.environ.copy()
+    env["PGPASSWORD"] = SHARED_POSTGRES_PASSWORD
+
+    dump_cmd = [
+        "pg_dump", "-h", source_host, "-p", str(source_port), "-U", SHARED_POSTGRES_USER,
+        "-d", db_name, "-F", "c", "--no-publications", "--no-subscriptions",
+    ]
+    if snapshot:
+        dump_cmd += ["--snapshot", snapshot]
+    restore_cmd = [
+        "pg_restore", "-h", target_host, "-p", str(target_port), "-U", SHARED_POSTGRES_USER,
+        "-d", db_name, "--no-publications", "--no-subscriptions",
+    ]
+
+    # stderr to files so a chatty tool can't block on a full pipe
+    with tempfile.TemporaryFile() as dump_err, tempfile.TemporaryFile() as restore_err:
+        dump = subprocess.Popen(dump_cmd, stdout=subprocess.PIPE, stderr=dump_err, env=env)
+        restore = subprocess.Popen(restore_cmd, stdin=dump.stdout, stderr=restore_err, env=env)
+        dump.stdout.close()  # pg_restore owns the read end now
+        try:
+            restore.wait(timeout=MIGRATION_COPY_TIMEOUT_SECONDS)
+            dump.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            dump.kill()
+            restore.kill()
+            raise MigrationAborted(f"Copy did not finish within {MIGRATION_COPY_TIMEOUT_SECONDS}s")
+
+        dump_err.seek(0)
+        restore_err.seek(0)
+        if dump.returncode != 0:
+            raise MigrationAborted(f"pg_dump failed with code {dump.returncode}: {dump_err.read().decode()[-2000:]}")
+        warnings = restore_err.read().decode()
+        # Like backups, exit code 1 means pg_restore skipped some statements; counts are checked later
+        if restore.returncode > 1:
+            raise MigrationAborted(f"pg_restore failed with code {restore.returncode}: {warnings[-2000:]}")
+        return warnings[-2000:] if restore.returncode == 1 else None
+
+
+def _missing_roles(cluster: Cluster) -> List[str]:
+    conn = _admin(cluster)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT rolname FROM pg_roles WHERE rolname = ANY(%s)", [list(_API_ROLES)])
+        present = {row[0] for row in cursor.fetchall()}
+        return [role for role in _API_ROLES if role not in present]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _prepare_publication(source: Cluster, db_name: str, name: str):
+    conn = _admin(source, db_name)
+    conn.autocommit = False
+    cursor = conn.cursor()
+    try:
+        # UPDATE/DELETE on published tables need a replica identity; use the full row where there is no key
+        cursor.execute("""
+            SELECT n.nspname, c.relname FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind = 'r' AND c.relreplident = 'd'
+              AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+              AND NOT EXISTS (SELECT 1 FROM pg_index i WHERE i.indrelid = c.oid AND i.indisprimary)
+        """)
+        altered = cursor.fetchall()
+        for schema, table in altered:
+            cursor.execute(sql.SQL("ALTER TABLE {}.{} REPLICA IDENTITY FULL").format(
+                sql.Identifier(schema), sql.Identifier(table)
+            ))
+        cursor.execute(sql.SQL("CREATE PUBLICATION {} FOR ALL TABLES").format(sql.Identifier(name)))
+        # Recorded with the publication, in the same transaction, so whichever attempt
+        # drops it can put the tables back (see _reset_replica_identity)
+        cursor.execute(sql.SQL("COMMENT ON PUBLICATION {} IS {}").format(
+            sql.Identifier(name), sql.Literal(json.dumps(altered))
+        ))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _reset_replica_identity(source: Cluster, target: Cluster, db_name: str, name: str):
+    """
+    Give the tables _prepare_publication set to REPLICA IDENTITY FULL their
+    default identity back, on the source and (the dump copied the setting) the
+    target. Must run before the publication is dropped.
+    """
+    altered: List[Tuple[str, str]] = []
+    for cluster in (source, target):
+        conn = _admin(cluster)
+        cursor = conn.cursor()
+        try:
+            exists = _database_exists(cursor, db_name)
+        finally:
+            cursor.close()
+            conn.close()
+        if not exists:
+            continue
+
+        conn = _admin(cluster, db_name)
+        cursor = conn.cursor()
+        try:
+            if cluster is source:
+                cursor.execute(
+                    "SELECT obj_description(oid, 'pg_publication') FROM pg_publication WHERE pubname = %s", [name]
+                )
+                row = cursor.fetchone()
+                altered = json.loads(row[0]) if row and row[0] else []
+            for schema, table in altered:
+                cursor.execute(sql.SQL("ALTER TABLE IF EXISTS {}.{} REPLICA IDENTITY DEFAULT").format(
+                    sql.Identifier(schema), sql.Identifier(table)
+                ))
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def _copy_from_slot(source: Cluster, target: Cluster, db_name: str, name: str) -> Optional[str]:
+    """Create the slot, dump at its exported snapshot, then subscribe the target to it."""
+    from psycopg2.extras import LogicalReplicationConnection
+
+    host, port = _endpoint(source)
+    repl = psycopg2.connect(
+        host=host, port=port, user=SHARED_POSTGRES_USER, password=SHARED_POSTGRES_PASSWORD,
+        dbname=db_name, connection_factory=LogicalReplicationConnection,
+    )
+    try:
+        cursor = repl.cursor()
+        cursor.execute(f'CREATE_REPLICATION_SLOT "{name}" LOGICAL pgoutput EXPORT_SNAPSHOT')
+        snapshot = cursor.fetchone()[2]
+        # The snapshot stays importable only while this connection is idle and open
+        warnings = _stream_copy(source, target, db_name, snapshot=snapshot)
+    finally:
+        repl.close()
+
+    conninfo = make_dsn(
+        host=MIGRATION_REPLICATION_HOST or host, port=port, dbname=db_name,
+        user=SHARED_POSTGRES_USER, password=SHARED_POSTGRES_PASSWORD,
+    )
+    conn = _admin(target, db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            sql.SQL("CREATE SUBSCRIPTION {} CONNECTION {} PUBLICATION {} "
+                    "WITH (create_slot = false, slot_name = {}, copy_data = false)").format(
+                sql.Identifier(name), sql.Literal(conninfo), sql.Identifier(name), sql.Literal(name)
+            )
+        )
+    finally:
+        cursor.close()
+        conn.close()
+    return warnings
+
+
+def _replication_lag(source: Cluster, name: str, target_lsn: Optional[str] = None) -> int:
+    """Bytes of WAL the subscriber has not confirmed yet (up to now, or up to target_lsn)."""
+    conn = _admin(source)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT pg_wal_lsn_diff(COALESCE(%s::pg_lsn, pg_current_wal_lsn()), confirmed_flush_lsn) "
+            "FROM pg_replication_slots WHERE slot_name = %s",
+            [target_lsn, name]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise MigrationAborted(f"Replication slot {name} disappeared")
+        return max(int(row[0] or 0), 0)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _wait_for_lag(source: Cluster, name: str, limit: int, timeout: int, target_lsn: Optional[str] = None):
+    deadline = time.monotonic() + timeout
+    while True:
+        lag = _replication_lag(source, name, target_lsn)
+        if lag <= limit:
+            return
+        if time.monotonic() >= deadline:
+            raise MigrationAborted(f"Replication still {lag} bytes behind after {timeout}s")
+        time.sleep(1)
+
+
+def _current_wal_lsn(cluster: Cluster) -> str:
+    conn = _admin(cluster)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_current_wal_lsn()::text")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _sync_sequences(source: Cluster, target: Cluster, db_name: str) -> int:
+    """Logical replication doesn't carry sequence positions; copy them over."""
+    conn = _admin(source, db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT schemaname, sequencename, last_value FROM pg_sequences WHERE last_value IS NOT NULL")
+        sequences = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    conn = _admin(target, db_name)
+    cursor = conn.cursor()
+    try:
+        for schema, name, last_value in sequences:
+            cursor.execute("SELECT setval(format('%%I.%%I', %s, %s)::regclass, %s, true)", [schema, name, last_value])
+    finally:
+        cursor.close()
+        conn.close()
+    return len(sequences)
+
+
+def _table_counts(cluster: Cluster, db_name: str) -> Dict[str, int]:
+    conn = _admin(cluster, db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT n.nspname, c.relname FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition
+              AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        """)
+        counts = {}
+        for schema, table in cursor.fetchall():
+            cursor.execute(sql.SQL("SELECT count(*) FROM {}.{}").format(sql.Identifier(schema), sql.Identifier(table)))
+            counts[f"{schema}.{table}"] = cursor.fetchone()[0]
+        return counts
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _verify_counts(source: Cluster, target: Cluster, db_name: str) -> int:
+    source_counts = _table_counts(source, db_name)
+    target_counts = _table_counts(target, db_name)
+    mismatched = [
+        f"{table} ({count} vs {target_counts.get(table)})"
+        for table, count in source_counts.items() if target_counts.get(table) != count
+    ]
+    if mismatched:
+        raise MigrationAborted("Row counts differ after copy: " + ", ".join(mismatched[:10]))
+    return sum(source_counts.values())
+
+
+def _switch_cluster(db: Session, project: Project, target: Cluster):
+    """cluster_id and connection secrets change in one control-plane transaction."""
+    host, port = _endpoint(target)
+    values = {"DB_PORT": str(port), "SHARED_POSTGRES_HOST": host}
+    secrets = db.query(ProjectSecret).filter(
+        ProjectSecret.project_id == project.id,
+        ProjectSecret.key.in_(_ENDPOINT_SECRETS)
+    ).all()
+    for secret in secrets:
+        secret.value = values[secret.key]
+    project.cluster_id = target.id
+    secrets_changed(db, project.id)
+    db.commit()
+
+
+def _invalidate_caches(project_id: str, clusters: List[Cluster]):
+    """Placement snapshot, plus the project config cached by each cluster's gateway."""
+    from services.metering_service import METERING_TOKEN
+    from services.placement_service import PlacementService
+
+    PlacementService.invalidate()
+    if not METERING_TOKEN:
+        print("[ClusterMigration] METERING_TOKEN not set; gateways keep cached config until it expires")
+        return
+
+    gateways = {cluster.api_url or SHARED_GATEWAY_URL for cluster in clusters}
+    for gateway in gateways:
+        try:
+            response = httpx.post(
+                f"{gateway.rstrip('/')}/internal/projects/{project_id}/invalidate",
+                headers={"X-Metering-Token": METERING_TOKEN},
+                timeout=5.0,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            print(f"[ClusterMigration] Could not invalidate gateway cache at {gateway}: {e}")
+
+
+def _cleanup_attempt(source: Cluster, target: Cluster, db_name: str, name: str):
+    """Undo whatever a previous attempt left behind; the project still lives on the source."""
+    _drop_subscription(target, db_name, name)
+    _reset_replica_identity(source, target, db_name, name)
+    _drop_replication(source, db_name, name)
+    _drop_database(target, db_name, drop_role=False)
+    _set_frozen(source, db_name, False)
+
+
+def validate_target(db: Session, project: Project, target_cluster_id: str) -> Cluster:
+    """Checks run before a migration is queued. Raises ValueError with a user-facing reason."""
+    if project.plan != ProjectPlan.shared or not project.db_name:
+        raise ValueError("Only shared projects can move between clusters")
+    if project.status not in (ProjectStatus.RUNNING, ProjectStatus.STOPPED):
+        raise ValueError(f"Project is {project.status.value}; only running or stopped projects can be moved")
+    if project.cluster_id == target_cluster_id:
+        raise ValueError("Project is already on this cluster")
+
+    target = db.query(Cluster).filter(Cluster.id == target_cluster_id).first()
+    if not target:
+        raise ValueError(f"Cluster {target_cluster_id} not found")
+    if target.status != ClusterStatus.running:
+        raise ValueError(f"Cluster {target.id} is {target.status.value}")
+    if target.type == ClusterType.private_shared and target.owner_org_id != project.org_id:
+        raise ValueError("Target is another organization's private cluster")
+
+    source = db.query(Cluster).filter(Cluster.id == project.cluster_id).first() if project.cluster_id else None
+    if source is None:
+        from services.cluster_service import ClusterService
+        source = ClusterService.get_or_create_global_cluster(db)
+    if _endpoint(source) == _endpoint(target):
+        # Same Postgres behind both records: "moving" would drop the only copy
+        raise ValueError("Source and target clusters share the same Postgres server")
+    try:
+        missing = _missing_roles(target)
+    except psycopg2.Error as e:
+        raise ValueError(f"Cluster {target.id} is unreachable: {e}")
+    if missing:
+        raise ValueError(f"Cluster {target.id} lacks the {', '.join(missing)} role(s) the project's grants need")
+    return target
+
+
+def run_cluster_migration(db: Session, project_id: str, payload: dict) -> dict:
+    """Provisioning job handler for `migrate_cluster`."""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise ValueError(f"Project {project_id} not found")
+    source = db.query(Cluster).filter(Cluster.id == payload["source_cluster_id"]).first()
+    target = db.query(Cluster).filter(Cluster.id == payload["target_cluster_id"]).first()
+    if not source or not target:
+        raise ValueError("Source or target cluster no longer exists")
+
+    # The job lease can run out during a long copy; never let two attempts overlap
+    lock_conn = db.get_bind().connect()
+    lock_key = f"migrate:{project_id}"
+    if not lock_conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": lock_key}).scalar():
+        lock_conn.close()
+        raise JobDeferred(f"Migration of {project_id} is already running")
+    try:
+        if project.cluster_id == target.id:
+            # Cutover committed by an earlier attempt; only the cleanup is left
+            result = {"mode": "resumed"}
+        else:
+            result = _migrate(db, project, source, target)
+
+        _invalidate_caches(project_id, [source, target])
+        _reset_replica_identity(source, target, project.db_name, _replication_name(project_id))
+        _drop_replication(source, project.db_name, _replication_name(project_id))
+        _drop_database(source, project.db_name, drop_role=True)
+        print(f"[ClusterMigration] Project {project_id} moved from {source.id} to {target.id}")
+        return dict(result, source_cluster_id=source.id, target_cluster_id=target.id)
+    finally:
+        lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": lock_key})
+        lock_conn.close()
+
+
+def _migrate(db: Session, project: Project, source: Cluster, target: Cluster) -> dict:
+    db_name = project.db_name
+    name = _replication_name(project.id)
+    db_password = get_secret(db, project.id, "DB_PASSWORD")
+    if not db_password:
+        raise ValueError(f"Project {project.id} has no DB_PASSWORD secret")
+
+    mode = MIGRATION_MODE
+    if mode == "auto":
+        mode = "logical" if _wal_level(source) == "logical" else "dump"
+    print(f"[ClusterMigration] Moving {project.id} ({db_name}) {source.id} -> {target.id} [{mode}]")
+
+    # Checked again here: the roles may have gone since the job was queued, and
+    # pg_restore would skip the grants to them with only a warning
+    missing = _missing_roles(target)
+    if missing:
+        raise MigrationAborted(f"Cluster {target.id} lacks the {', '.join(missing)} role(s)")
+
+    _cleanup_attempt(source, target, db_name, name)
+    target_host, target_port = _endpoint(target)
+    create_project_database(db_name, db_password, host=target_host, port=target_port)
+
+    result = {"mode": mode, "restore_warnings": None}
+    start = time.perf_counter()
+    frozen_at = None
+    try:
+        if mode == "logical":
+            _prepare_publication(source, db_name, name)
+            result["restore_warnings"] = _copy_from_slot(source, target, db_name, name)
+            result["copy_ms"] = int((time.perf_counter() - start) * 1000)
+            _wait_for_lag(source, name, MIGRATION_CATCHUP_LAG_BYTES, MIGRATION_CATCHUP_TIMEOUT_SECONDS)
+
+            frozen_at = time.perf_counter()
+            _set_frozen(source, db_name, True)
+            _wait_for_lag(source, name, 0, MIGRATION_CUTOVER_TIMEOUT_SECONDS, target_lsn=_current_wal_lsn(source))
+            _drop_subscription(target, db_name, name)
+            result["sequences_synced"] = _sync_sequences(source, target, db_name)
+        else:
+            frozen_at = time.perf_counter()
+            _set_frozen(source, db_name, True)
+            result["restore_warnings"] = _stream_copy(source, target, db_name)
+            result["copy_ms"] = int((time.perf_counter() - start) * 1000)
+
+        if MIGRATION_VERIFY_COUNTS:
+            result["rows_verified"] = _verify_counts(source, target, db_name)
+        _switch_cluster(db, project, target)
+    except Exception:
+        db.rollback()
+        try:
+            _cleanup_attempt(source, target, db_name, name)
+        except Exception as cleanup_error:
+            print(f"[ClusterMigration] Cleanup after failed attempt for {project.id} failed: {cleanup_error}")
+        raise
+
+    result["freeze_ms"] = int((time.perf_counter() - frozen_at) * 1000)
+    result["completed_at"] = datetime.utcnow().isoformat()
+    return result
@@ -4,12 +4,42 @@ from models.plan import Plan, ClusterStrategy
 from models.organization_entitlement import OrganizationEntitlement
 from models.cluster_usage import ClusterUsage
 from services.entitlement_service import EntitlementService
+from services.cluster_driver_interface import ClusterDriver
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
 import os
+import threading
 import uuid
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Private clusters provisioned at once by this process, and how long each may take
+CLUSTER_PROVISION_CONCURRENCY = int(os.getenv("CLUSTER_PROVISION_CONCURRENCY", "2"))
+CLUSTER_PROVISION_TIMEOUT_SECONDS = int(os.getenv("CLUSTER_PROVISION_TIMEOUT_SECONDS", "600"))
+
+
+def _get_cluster_driver() -> ClusterDriver:
+    """Driver for private cluster stacks, chosen by CLUSTER_DRIVER."""
+    driver = os.getenv("CLUSTER_DRIVER", "local_docker")
+    if driver == "local_docker":
+        from services.cluster_driver_local import LocalDockerClusterDriver
+        return LocalDockerClusterDriver()
+    raise ValueError(f"Unknown CLUSTER_DRIVER {driver!r}")
+
+
+_driver = None
+_provision_executor = ThreadPoolExecutor(max_workers=CLUSTER_PROVISION_CONCURRENCY, thread_name_prefix="cluster-provision")
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def get_cluster_driver() -> ClusterDriver:
+    global _driver
+    if _driver is None:
+        _driver = _get_cluster_driver()
+    return _driver
+
 class ClusterService:
     @staticmethod
     def get_or_create_global_cluster(db: Session) -> Cluster:
@@ -67,11 +97,44 @@ class ClusterService:
         return cluster
 
     @staticmethod
-    def resolve_cluster_for_project(db: Session, org_id: str) -> Cluster:
+    def read_load(cluster: Cluster) -> dict:
+        """
+        Connections, max_connections and project database bytes straight from the
+        cluster's Postgres. Returns None if it can't be reached.
+        """
+        from services.shared_provisioning_service import get_custom_connection
+
+        try:
+            conn = get_custom_connection(cluster.postgres_host, cluster.postgres_port)
+        except Exception as e:
+            logger.warning(f"Could not read load of cluster {cluster.id}: {e}")
+            return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT (SELECT count(*) FROM pg_stat_activity), "
+                "current_setting('max_connections')::int, "
+                "(SELECT COALESCE(SUM(pg_database_size(datname)), 0) FROM pg_database "
+                " WHERE NOT datistemplate AND datname LIKE 'project_%')"
+            )
+            active, max_connections, db_bytes = cursor.fetchone()
+            cursor.close()
+            return {"active_connections": active, "max_connections": max_connections, "db_bytes": int(db_bytes)}
+        except Exception as e:
+            logger.warning(f"Could not read load of cluster {cluster.id}: {e}")
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def resolve_cluster_for_project(db: Session, org_id: str, project_id: str = None) -> Cluster:
         """
         Resolve which cluster an org should use based on entitlements and strategy.
         Returns a Cluster object (which might be in 'creating' state).
+        Shared projects go to the least loaded global cluster (see PlacementService).
         """
+        from services.placement_service import PlacementService
+
         ent = EntitlementService.get_entitlements(db, org_id)
         plan = EntitlementService.get_plan(db, ent.plan_id)
         
@@ -96,10 +159,11 @@ class ClusterService:
                 # If we returned global here, the Project would be permanently bound to Global.
                 pass 
                 
+            PlacementService.record(db, project_id, org_id, cluster.id, "private_per_org")
             return cluster
         else:
             # global_only
-            return ClusterService.get_or_create_global_cluster(db)
+            return PlacementService.place(db, org_id, project_id)
 
     @staticmethod
     def provision_cluster(db: Session, cluster_id: str):
@@ -112,28 +176,101 @@ class ClusterService:
             return
 
         logger.info(f"Provisioning cluster {cluster_id}...")
-        
+        driver = get_cluster_driver()
         try:
-            # TODO: Integrate with actual Provisioner (Local/Coolify)
-            # For now, we simulate success for Private clusters by pointing to localhost 
-            # but on different ports if we were doing real isolation.
-            # Since this is "Private Shared" logic simulation:
-            
-            from services.provisioning_local import LocalProvisioner
-            # We assume we might spin up a new docker compose stack here.
-            # For the MVP, let's simulate it becoming ready.
-            
-            # In a real impl, this would run `docker compose up`
-            
-            cluster.postgres_host = "localhost" # In real life, specific IP
-            cluster.postgres_port = 5435 # Mocking: Point to Shared Cluster for dev simulation
-            cluster.api_url = "http://localhost:8000"
-            cluster.status = ClusterStatus.running
-            
-            db.commit()
-            logger.info(f"Cluster {cluster_id} provisioned successfully.")
-            
+            endpoint = driver.provision(cluster_id, timeout_seconds=CLUSTER_PROVISION_TIMEOUT_SECONDS)
         except Exception as e:
             logger.error(f"Failed to provision cluster {cluster_id}: {e}")
+            try:
+                driver.destroy(cluster_id)
+            except Exception as cleanup_error:
+                logger.error(f"Cleanup of cluster {cluster_id} failed: {cleanup_error}")
             cluster.status = ClusterStatus.failed
             db.commit()
+            return
+
+        from services.shared_provisioning_service import forget_cluster_templates
+
+        # Ports get reused; nothing cached for an earlier stack on them applies
+        forget_cluster_templates(endpoint["postgres_host"], endpoint["postgres_port"])
+        cluster.postgres_host = endpoint["postgres_host"]
+        cluster.postgres_port = endpoint["postgres_port"]
+        cluster.api_url = endpoint["api_url"]
+        cluster.status = ClusterStatus.running
+        db.commit()
+        logger.info(f"Cluster {cluster_id} provisioned at {cluster.postgres_host}:{cluster.postgres_port}")
+
+    @staticmethod
+    def _provision_in_background(cluster_id: str):
+        from core.database import SessionLocal
+
+        db = SessionLocal()
+        # Other API replicas run the same scheduler; one of them provisions each cluster
+        lock_conn = db.get_bind().connect()
+        lock_key = f"cluster:{cluster_id}"
+        try:
+            if not lock_conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": lock_key}).scalar():
+                return
+            try:
+                ClusterService.provision_cluster(db, cluster_id)
+            finally:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": lock_key})
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Provisioning of cluster {cluster_id} crashed: {e}")
+        finally:
+            lock_conn.close()
+            db.close()
+            with _in_flight_lock:
+                _in_flight.discard(cluster_id)
+
+    @staticmethod
+    def provision_pending(db: Session) -> int:
+        """Hand clusters in `creating` to the provisioning pool. Returns how many were queued."""
+        pending = db.query(Cluster.id).filter(Cluster.status == ClusterStatus.creating).all()
+        queued = 0
+        for (cluster_id,) in pending:
+            with _in_flight_lock:
+                if cluster_id in _in_flight:
+                    continue
+                _in_flight.add(cluster_id)
+            _provision_executor.submit(ClusterService._provision_in_background, cluster_id)
+            queued += 1
+        return queued
+
+    @staticmethod
+    def teardown_cluster(db: Session, cluster_id: str, force: bool = False):
+        """
+        Destroy a private cluster's stack and delete its records.
+        Refuses while projects still live there unless `force` is set, in which
+        case the cluster record is kept as `stopped` for the remaining projects.
+        """
+        from models.project import Project, ProjectStatus
+        from models.warm_pool_database import WarmPoolDatabase
+        from services.shared_provisioning_service import forget_cluster_templates
+
+        cluster = db.query(Cluster).filter(Cluster.id == cluster_id).first()
+        if not cluster:
+            raise ValueError(f"Cluster {cluster_id} not found")
+        if cluster.type != ClusterType.private_shared:
+            raise ValueError("Only private clusters can be torn down")
+
+        remaining = db.query(Project).filter(
+            Project.cluster_id == cluster_id,
+            Project.status.notin_([ProjectStatus.DELETING, ProjectStatus.DELETED])
+        ).count()
+        if remaining and not force:
+            raise ValueError(f"Cluster {cluster_id} still hosts {remaining} project(s)")
+
+        get_cluster_driver().destroy(cluster_id)
+        if cluster.postgres_host and cluster.postgres_port:
+            forget_cluster_templates(cluster.postgres_host, cluster.postgres_port)
+
+        db.query(WarmPoolDatabase).filter(WarmPoolDatabase.cluster_id == cluster_id).delete(synchronize_session=False)
+        db.query(ClusterUsage).filter(ClusterUsage.cluster_id == cluster_id).delete(synchronize_session=False)
+        if remaining:
+            cluster.status = ClusterStatus.stopped
+        else:
+            db.delete(cluster)
+        db.commit()
+        logger.info(f"Cluster {cluster_id} torn down")
@@ -0,0 +1,230 @@
+"""
+Container Registry
+
+In-memory view of the Docker daemon's containers, so log, metrics and health
+code can resolve a container by name, compose project or compose service
+without calling Docker.
+
+A background thread lists all containers once, then follows the daemon's
+container events and re-inspects a container whenever its state changes.
+Every CONTAINER_REGISTRY_TTL_SECONDS it relists anyway, so an event missed
+while the stream was reconnecting can't leave the map stale for longer than
+that. Until the first listing succeeds `ready` is False and callers fall back
+to asking Docker themselves.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+from services.docker_engine import DockerEngine, DockerEngineError
+
+CONTAINER_REGISTRY_ENABLED = os.getenv("CONTAINER_REGISTRY_ENABLED", "true").lower() == "true"
+CONTAINER_REGISTRY_TTL_SECONDS = float(os.getenv("CONTAINER_REGISTRY_TTL_SECONDS", "60"))
+CONTAINER_REGISTRY_RETRY_SECONDS = 5.0
+
+# Events that can change a container's state; anything else (exec, attach, ...) is ignored
+_STATE_EVENTS = {"create", "start", "restart", "die", "stop", "kill", "pause", "unpause", "rename", "oom"}
+
+
+def _from_list(item: dict) -> dict:
+    """Normalize an entry of GET /containers/json."""
+    labels = item.get("Labels") or {}
+    status = item.get("Status") or ""
+    health = None
+    for value in ("healthy", "unhealthy", "starting"):
+        if f"({value})" in status or f"(health: {value})" in status:
+            health = value
+    return {
+        "id": item["Id"],
+        "name": (item.get("Names") or ["/"])[0].lstrip("/"),
+        "state": item.get("State"),
+        "health": health,
+        "compose_project": labels.get("com.docker.compose.project"),
+        "compose_service": labels.get("com.docker.compose.service"),
+        "labels": labels,
+    }
+
+
+def _from_inspect(info: dict) -> dict:
+    """Normalize GET /containers/{id}/json."""
+    labels = (info.get("Config") or {}).get("Labels") or {}
+    state = info.get("State") or {}
+    return {
+        "id": info["Id"],
+        "name": (info.get("Name") or "/").lstrip("/"),
+        "state": state.get("Status"),
+        "health": (state.get("Health") or {}).get("Status"),
+        "compose_project": labels.get("com.docker.compose.project"),
+        "compose_service": labels.get("com.docker.compose.service"),
+        "labels": labels,
+    }
+
+
+class ContainerRegistry:
+    def __init__(self):
+        self._containers: Dict[str, dict] = {}
+        self._by_project: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+        self._stopping = threading.Event()
+        self._thread = None
+        self.synced_at: Optional[float] = None
+        self.events_connected = False
+
+    @property
+    def ready(self) -> bool:
+        return self.synced_at is not None
+
+    # Lookups
+
+    def get(self, container_id: str) -> Optional[dict]:
+        with self._lock:
+            container = self._containers.get(container_id)
+            return dict(container) if container else None
+
+    def all(self) -> List[dict]:
+        with self._lock:
+            return [dict(c) for c in self._containers.values()]
+
+    def project_containers(self, compose_project: str) -> List[dict]:
+        """All containers of a compose project, whatever their state."""
+        with self._lock:
+            ids = self._by_project.get(compose_project, ())
+            return [dict(self._containers[i]) for i in ids]
+
+    def find(self, name: Optional[str] = None, compose_project: Optional[str] = None,
+             compose_service: Optional[str] = None, running_only: bool = True) -> List[dict]:
+        """Containers matching all given criteria; `name` matches a substring like `docker ps --filter name=`."""
+        candidates = self.project_containers(compose_project) if compose_project else self.all()
+        return [
+            c for c in candidates
+            if (name is None or name in c["name"])
+            and (compose_service is None or c["compose_service"] == compose_service)
+            and (not running_only or c["state"] == "running")
+        ]
+
+    def on_change(self, callback: Callable[[], None]):
+        """Call `callback` (on the registry thread) whenever a container appears, changes or goes away."""
+        self._listeners.append(callback)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count = len(self._containers)
+        return {
+            "ready": self.ready,
+            "containers": count,
+            "events_connected": self.events_connected,
+            "synced_at": datetime.utcfromtimestamp(self.synced_at).isoformat() if self.synced_at else None,
+        }
+
+    # Updates
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[Containers] Change listener failed: {e}")
+
+    def _upsert(self, container: dict):
+        with self._lock:
+            previous = self._containers.get(container["id"])
+            if previous and previous["compose_project"]:
+                self._by_project.get(previous["compose_project"], set()).discard(container["id"])
+            self._containers[container["id"]] = container
+            if container["compose_project"]:
+                self._by_project.setdefault(container["compose_project"], set()).add(container["id"])
+
+    def _remove(self, container_id: str):
+        with self._lock:
+            previous = self._containers.pop(container_id, None)
+            if previous and previous["compose_project"]:
+                ids = self._by_project.get(previous["compose_project"], set())
+                ids.discard(container_id)
+                if not ids:
+                    self._by_project.pop(previous["compose_project"], None)
+
+    def _replace_all(self, containers: List[dict]):
+        by_project: Dict[str, Set[str]] = {}
+        for container in containers:
+            if container["compose_project"]:
+                by_project.setdefault(container["compose_project"], set()).add(container["id"])
+        with self._lock:
+            self._containers = {c["id"]: c for c in containers}
+            self._by_project = by_project
+        self.synced_at = time.time()
+
+    async def _relist(self, engine: DockerEngine):
+        self._replace_all([_from_list(item) for item in await engine.list_containers([])])
+        self._notify()
+
+    async def _apply_event(self, engine: DockerEngine, event: dict):
+        container_id = event.get("id") or (event.get("Actor") or {}).get("ID")
+        action = event.get("Action") or event.get("status") or ""
+        if not container_id:
+            return
+        if action == "destroy":
+            self._remove(container_id)
+        elif action.startswith("health_status"):
+            container = self.get(container_id)
+            if container is None:
+                return await self._apply_event(engine, {"id": container_id, "Action": "create"})
+            container["health"] = action.split(":", 1)[1].strip()
+            self._upsert(container)
+        elif action in _STATE_EVENTS:
+            try:
+                self._upsert(_from_inspect(await engine.inspect(container_id)))
+            except DockerEngineError:
+                self._remove(container_id)  # Already gone again
+        else:
+            return
+        self._notify()
+
+    async def _follow_events(self, engine: DockerEngine):
+        while not self._stopping.is_set():
+            try:
+                async with engine.events({"type": ["container"]}) as events:
+                    self.events_connected = True
+                    # Listed after subscribing, so no change falls in between
+                    await self._relist(engine)
+                    async for event in events:
+                        await self._apply_event(engine, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Containers] Docker events stream lost: {e}")
+            self.events_connected = False
+            await asyncio.sleep(CONTAINER_REGISTRY_RETRY_SECONDS)
+
+    async def _relist_periodically(self, engine: DockerEngine):
+        while not self._stopping.is_set():
+            await asyncio.sleep(CONTAINER_REGISTRY_TTL_SECONDS)
+            try:
+                await self._relist(engine)
+            except Exception as e:
+                print(f"[Containers] Relisting containers failed: {e}")
+
+    async def _run(self):
+        engine = DockerEngine()
+        try:
+            await asyncio.gather(self._follow_events(engine), self._relist_periodically(engine))
+        finally:
+            await engine.close()
+
+    def start(self):
+        if not CONTAINER_REGISTRY_ENABLED or self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="container-registry", daemon=True)
+        self._thread.start()
+        print("[Containers] Container registry started")
+
+    def stop(self):
+        self._stopping.set()
+        self._thread = None
+
+
+container_registry = ContainerRegistry()
@@ -1,9 +1,16 @@
+import json
+import os
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
 from typing import List, Dict, Any
 from core.database import SessionLocal
 from models.project import Project
-from models.project_secret import ProjectSecret
+from services.secrets_service import get_project_secrets
+from services.query_plan import analyze_plan, split_single_statement
+
+# Upper bound for the statement run by explain mode; requests can only lower it
+SQL_EXPLAIN_TIMEOUT_MS = int(os.getenv("SQL_EXPLAIN_TIMEOUT_MS", "15000"))
 
 class DatabaseService:
     """
@@ -18,16 +25,13 @@ class DatabaseService:
         """Fetch database connection details from project secrets"""
         db = SessionLocal()
         try:
-            # V2: Database Existence Check
-            project = db.query(Project).filter(Project.id == self.project_id).first()
-            if not project:
-                raise ValueError(f"Project {self.project_id} does not exist in control plane.")
+            # Get secrets (cached; a cache hit doesn't touch the control-plane DB)
+            secrets_map = get_project_secrets(db, self.project_id)
 
-            # Get secrets
-            secrets = db.query(ProjectSecret).filter(
-                ProjectSecret.project_id == self.project_id
-            ).all()
-            secrets_map = {s.key: s.value for s in secrets}
+            # V2: Database Existence Check. Projects get their secrets when created,
+            # so only look the project up when there are none.
+            if not secrets_map and not db.query(Project.id).filter(Project.id == self.project_id).first():
+                raise ValueError(f"Project {self.project_id} does not exist in control plane.")
             
             db_password = secrets_map.get("DB_PASSWORD")
             if not db_password:
@@ -105,6 +109,38 @@ class DatabaseService:
                 "error": str(e)
             }
     
+    def explain_query(self, sql: str, timeout_ms: int = SQL_EXPLAIN_TIMEOUT_MS) -> Dict[str, Any]:
+        """
+        Run EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) on a single statement and return
+        the analysed plan (see query_plan.analyze_plan). The statement really runs,
+        so it does so in a transaction that is always rolled back, under a
+        statement timeout.
+        """
+        try:
+            statement = split_single_statement(sql)
+        except ValueError as e:
+            return {"plan": None, "error": str(e)}
+
+        conn = None
+        try:
+            conn = psycopg2.connect(self._get_connection_string())
+            cursor = conn.cursor()
+            cursor.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement)
+            output = cursor.fetchone()[0]
+            cursor.close()
+            if isinstance(output, str):
+                output = json.loads(output)
+            return {**analyze_plan(output), "rolled_back": True, "error": None}
+        except psycopg2.errors.QueryCanceled:
+            return {"plan": None, "error": f"Statement exceeded the {int(timeout_ms)} ms explain timeout"}
+        except Exception as e:
+            return {"plan": None, "error": str(e)}
+        finally:
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+
     def get_tables(self) -> List[Dict[str, Any]]:
         """Get list of all tables in the database with property status"""
         sql = """
@@ -0,0 +1,131 @@
+"""
+Async client for the parts of the Docker Engine API the local provisioner uses.
+
+Talks to the daemon named by DOCKER_HOST (unix:// socket or tcp://), defaulting
+to /var/run/docker.sock, the same daemon the docker CLI would use.
+"""
+import io
+import json
+import os
+import tarfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List
+
+import httpx
+
+DOCKER_API_VERSION = os.getenv("DOCKER_API_VERSION", "v1.41")
+
+
+class DockerEngineError(Exception):
+    pass
+
+
+def _client() -> httpx.AsyncClient:
+    docker_host = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
+    if docker_host.startswith("unix://"):
+        transport = httpx.AsyncHTTPTransport(uds=docker_host[len("unix://"):])
+        return httpx.AsyncClient(transport=transport, base_url=f"http://docker/{DOCKER_API_VERSION}", timeout=30.0)
+    base = docker_host.replace("tcp://", "http://", 1)
+    return httpx.AsyncClient(base_url=f"{base}/{DOCKER_API_VERSION}", timeout=30.0)
+
+
+def demux_lines(chunks: AsyncIterator[bytes], tty: bool) -> AsyncIterator[str]:
+    """
+    Split a container log stream into lines. Without a TTY the daemon multiplexes
+    stdout/stderr into frames with an 8-byte header (stream, 0, 0, 0, size);
+    frames don't align with lines, so partial lines are kept per stream.
+    """
+    async def iterate():
+        buffer = b""
+        partial = {}
+        async for chunk in chunks:
+            buffer += chunk
+            while True:
+                if tty:
+                    stream, payload, buffer = 1, buffer, b""
+                elif len(buffer) >= 8 and len(buffer) >= 8 + int.from_bytes(buffer[4:8], "big"):
+                    size = int.from_bytes(buffer[4:8], "big")
+                    stream, payload, buffer = buffer[0], buffer[8:8 + size], buffer[8 + size:]
+                else:
+                    break
+                *lines, partial[stream] = (partial.get(stream, b"") + payload).split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8", errors="replace").rstrip("\r")
+                if tty:
+                    break
+    return iterate()
+
+
+def tar_path(src: Path, arcname: str) -> bytes:
+    """Pack a file or directory into an in-memory tar stream for put_archive."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        tar.add(str(src), arcname=arcname)
+    return buffer.getvalue()
+
+
+class DockerEngine:
+    def __init__(self):
+        self.client = _client()
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _check(self, response: httpx.Response, action: str) -> httpx.Response:
+        if response.status_code >= 400:
+            await response.aread()
+            raise DockerEngineError(f"{action} failed ({response.status_code}): {response.text[:500]}")
+        return response
+
+    async def list_containers(self, labels: List[str]) -> List[dict]:
+        params = {"all": "1"}
+        if labels:
+            params["filters"] = json.dumps({"label": labels})
+        response = await self.client.get("/containers/json", params=params)
+        return (await self._check(response, "List containers")).json()
+
+    async def inspect(self, container_id: str) -> dict:
+        response = await self.client.get(f"/containers/{container_id}/json")
+        return (await self._check(response, f"Inspect {container_id}")).json()
+
+    async def put_archive(self, container_id: str, path: str, data: bytes):
+        """Extract a tar stream into `path` inside the container (works on created, unstarted containers)."""
+        response = await self.client.put(
+            f"/containers/{container_id}/archive",
+            params={"path": path},
+            content=data,
+            headers={"Content-Type": "application/x-tar"},
+        )
+        await self._check(response, f"Copy into {container_id}:{path}")
+
+    @asynccontextmanager
+    async def logs(self, container_id: str, since: float, tty: bool = False) -> AsyncIterator[AsyncIterator[str]]:
+        """Follow a container's stdout and stderr from `since` (epoch seconds), one timestamped line at a time."""
+        async with self.client.stream(
+            "GET", f"/containers/{container_id}/logs",
+            params={"follow": "1", "stdout": "1", "stderr": "1", "timestamps": "1", "since": f"{since:.3f}"},
+            timeout=httpx.Timeout(30.0, read=None),
+        ) as response:
+            await self._check(response, f"Follow logs of {container_id}")
+            yield demux_lines(response.aiter_bytes(), tty)
+
+    @asynccontextmanager
+    async def events(self, filters: Dict[str, List[str]]) -> AsyncIterator[AsyncIterator[dict]]:
+        """
+        Subscribe to daemon events. The subscription is live once the context is
+        entered, so nothing that happens afterwards is missed.
+        """
+        async with self.client.stream(
+            "GET", "/events",
+            params={"filters": json.dumps(filters)},
+            timeout=httpx.Timeout(30.0, read=None),
+        ) as response:
+            await self._check(response, "Subscribe to events")
+
+            async def iterate():
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+
+            yield iterate()
@@ -0,0 +1,94 @@
+"""
+.env Projection
+
+The control-plane DB is the source of truth for project secrets; each project's
+.env is a projection of it that docker compose reads. Secret writes schedule a
+projection instead of rewriting the file themselves:
+
+- writes to the same project within SECRETS_ENV_DEBOUNCE_SECONDS of each other
+  are coalesced into one projection,
+- the file is only replaced (atomically) when its content changes, and
+- only the services of a running dedicated stack that use a changed key are
+  recreated; nothing is restarted for keys no service reads.
+
+Every API process projects the secrets it wrote. Two processes projecting the
+same state write the same content, so the second one changes and restarts
+nothing.
+"""
+import os
+import threading
+from typing import Dict, List
+
+SECRETS_ENV_DEBOUNCE_SECONDS = float(os.getenv("SECRETS_ENV_DEBOUNCE_SECONDS", "2"))
+
+
+def project_env(project_id: str) -> List[str]:
+    """Write a project's .env from the DB now. Returns the services recreated."""
+    from core.database import SessionLocal
+    from models.project import Project, ProjectPlan, ProjectStatus
+    from services.provisioning_local import write_env_file
+    from services.secrets_service import get_project_secrets
+
+    db = SessionLocal()
+    try:
+        secrets = get_project_secrets(db, project_id)
+        project = db.query(Project).filter(Project.id == project_id).first()
+    finally:
+        db.close()
+    if not secrets:
+        return []
+
+    changed = write_env_file(project_id, secrets)
+    if not changed or not project or project.plan != ProjectPlan.dedicated or project.status != ProjectStatus.RUNNING:
+        return []
+
+    from services.provisioning_service import apply_project_env
+    return apply_project_env(project_id, changed)
+
+
+class EnvProjector:
+    def __init__(self):
+        self._timers: Dict[str, threading.Timer] = {}
+        self._project_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, project_id: str):
+        """Project the secrets once writes to this project have paused for the debounce delay."""
+        with self._lock:
+            timer = self._timers.pop(project_id, None)
+            if timer:
+                timer.cancel()
+            timer = threading.Timer(SECRETS_ENV_DEBOUNCE_SECONDS, self._run, args=(project_id,))
+            timer.daemon = True
+            self._timers[project_id] = timer
+            timer.start()
+
+    def _run(self, project_id: str):
+        with self._lock:
+            if self._timers.get(project_id) is threading.current_thread():
+                del self._timers[project_id]
+            project_lock = self._project_locks.setdefault(project_id, threading.Lock())
+        # A projection still recreating services finishes before the next one reads the DB
+        with project_lock:
+            try:
+                restarted = project_env(project_id)
+                if restarted:
+                    print(f"[Secrets] Recreated {', '.join(restarted)} of project {project_id}")
+            except Exception as e:
+                print(f"[Secrets] Failed to project secrets of {project_id} to .env: {e}")
+
+    def flush(self):
+        """Run every pending projection now."""
+        with self._lock:
+            pending = list(self._timers.items())
+            self._timers.clear()
+        for project_id, timer in pending:
+            timer.cancel()
+            self._run(project_id)
+
+    def stop(self):
+        # Don't drop writes that are still waiting out the debounce delay
+        self.flush()
+
+
+env_projector = EnvProjector()
@@ -0,0 +1,296 @@
+"""
+Fleet Service
+
+Runs one task (a SQL script or a Python callable) against many shared project
+databases at once, for maintenance that has to touch every tenant.
+
+- Targets are selected from the projects table by cluster, org and status.
+- Each cluster gets its own bounded worker pool and clusters run side by side,
+  so a slow or overloaded cluster does not hold up the others.
+- Every database is handled over a single connection: the session settings,
+  the task and its commit all reuse it. Postgres connections are bound to one
+  database, so this is the only reuse available across a fleet.
+- A per-database deadline cancels the running query and reports a timeout.
+- Results are appended to an optional JSONL journal as they complete; passing
+  the same journal again skips databases that already succeeded.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+FLEET_CONCURRENCY_PER_CLUSTER = int(os.getenv("FLEET_CONCURRENCY_PER_CLUSTER", "8"))
+FLEET_DB_TIMEOUT_SECONDS = int(os.getenv("FLEET_DB_TIMEOUT_SECONDS", "300"))
+FLEET_CONNECT_TIMEOUT_SECONDS = int(os.getenv("FLEET_CONNECT_TIMEOUT_SECONDS", "10"))
+# Rows of a SQL task's final result set kept in the report, per database
+FLEET_MAX_OUTPUT_ROWS = int(os.getenv("FLEET_MAX_OUTPUT_ROWS", "100"))
+
+# Result statuses
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TIMEOUT = "timeout"
+SKIPPED = "skipped"
+
+
+def select_targets(db, cluster_id: Optional[str] = None, org_id: Optional[str] = None,
+                   statuses: Optional[Iterable[str]] = None) -> List[dict]:
+    """
+    Shared project databases matching the filters, with their cluster endpoint.
+    Without `statuses`, every project that is not being deleted is selected.
+    """
+    from models.cluster import Cluster, ClusterType
+    from models.project import Project, ProjectPlan, ProjectStatus
+    from services.shared_provisioning_service import SHARED_POSTGRES_HOST, SHARED_POSTGRES_PORT
+
+    clusters = {c.id: c for c in db.query(Cluster).all()}
+    global_cluster = next((c for c in clusters.values() if c.type == ClusterType.global_shared), None)
+
+    query = db.query(Project).filter(
+        Project.plan == ProjectPlan.shared,
+        Project.db_name.isnot(None),
+    )
+    if statuses:
+        query = query.filter(Project.status.in_([ProjectStatus(s) for s in statuses]))
+    else:
+        query = query.filter(Project.status.notin_([ProjectStatus.DELETING, ProjectStatus.DELETED]))
+    if org_id:
+        query = query.filter(Project.org_id == org_id)
+
+    targets = []
+    for project in query.order_by(Project.db_name).all():
+        # Legacy projects created before clusters existed live in the global cluster
+        cluster = clusters.get(project.cluster_id) if project.cluster_id else global_cluster
+        resolved_id = cluster.id if cluster else project.cluster_id
+        if cluster_id and resolved_id != cluster_id:
+            continue
+        targets.append({
+            "project_id": project.id,
+            "org_id": project.org_id,
+            "cluster_id": resolved_id,
+            "db_name": project.db_name,
+            "host": (cluster.postgres_host if cluster else None) or SHARED_POSTGRES_HOST,
+            "port": (cluster.postgres_port if cluster else None) or SHARED_POSTGRES_PORT,
+        })
+    return targets
+
+
+def sql_task(sql_text: str) -> Callable:
+    """
+    Task running `sql_text` as one script. The rows of its last statement
+    (if any) are returned, capped at FLEET_MAX_OUTPUT_ROWS.
+    """
+    def run(conn, target: dict):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql_text)
+            output = {"rowcount": cursor.rowcount}
+            if cursor.description:
+                columns = [col[0] for col in cursor.description]
+                output["rows"] = [
+                    dict(zip(columns, (_jsonable(v) for v in row)))
+                    for row in cursor.fetchmany(FLEET_MAX_OUTPUT_ROWS)
+                ]
+            return output
+        finally:
+            cursor.close()
+
+    run.task_id = "sql:" + hashlib.sha256(sql_text.encode()).hexdigest()[:16]
+    return run
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _default_connect(target: dict):
+    import psycopg2
+    from services.shared_provisioning_service import SHARED_POSTGRES_USER, SHARED_POSTGRES_PASSWORD
+
+    # Same admin credentials as get_custom_connection, plus a connect timeout
+    return psycopg2.connect(
+        host=target["host"],
+        port=target["port"],
+        user=SHARED_POSTGRES_USER,
+        password=SHARED_POSTGRES_PASSWORD,
+        dbname=target["db_name"],
+        connect_timeout=FLEET_CONNECT_TIMEOUT_SECONDS,
+        application_name="supalove-fleet",
+    )
+
+
+def load_journal(path: str, task_id: str) -> Dict[tuple, dict]:
+    """Last recorded result per (cluster_id, db_name) for `task_id`."""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from an interrupted write
+            if entry.get("task") == task_id:
+                done[(entry["cluster_id"], entry["db_name"])] = entry
+    return done
+
+
+class FleetExecutor:
+    """
+    Runs `task(conn, target)` on each target. The task's return value (JSON
+    serialisable) becomes the result's `output`; raising marks it failed.
+    Unless `autocommit` is set, the task runs in one transaction committed on success.
+    """
+
+    def __init__(self, task: Callable, task_id: Optional[str] = None,
+                 concurrency: int = FLEET_CONCURRENCY_PER_CLUSTER,
+                 timeout_seconds: float = FLEET_DB_TIMEOUT_SECONDS,
+                 autocommit: bool = False,
+                 journal_path: Optional[str] = None,
+                 connect: Callable = _default_connect,
+                 on_result: Optional[Callable[[dict], None]] = None):
+        self.task = task
+        self.task_id = task_id or getattr(task, "task_id", None) or \
+            f"callable:{getattr(task, '__module__', '?')}.{getattr(task, '__qualname__', repr(task))}"
+        self.concurrency = max(1, concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.autocommit = autocommit
+        self.journal_path = journal_path
+        self.connect = connect
+        self.on_result = on_result
+        self._journal_lock = threading.Lock()
+
+    def _record(self, result: dict):
+        if self.journal_path and result["status"] != SKIPPED:
+            line = json.dumps(dict(result, task=self.task_id))
+            with self._journal_lock:
+                with open(self.journal_path, "a") as f:
+                    f.write(line + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+        if self.on_result:
+            self.on_result(result)
+
+    def run_one(self, target: dict) -> dict:
+        result = {
+            "project_id": target.get("project_id"),
+            "org_id": target.get("org_id"),
+            "cluster_id": target.get("cluster_id"),
+            "db_name": target["db_name"],
+            "status": FAILED,
+            "output": None,
+            "error": None,
+            "duration_ms": 0,
+        }
+        start = time.perf_counter()
+        conn = None
+        timer = None
+        timed_out = threading.Event()
+        try:
+            conn = self.connect(target)
+            conn.autocommit = self.autocommit
+
+            # Statement timeout as a server-side backstop; the timer enforces the
+            # deadline for the database as a whole, across all statements
+            cursor = conn.cursor()
+            cursor.execute("SET statement_timeout = %s", [f"{int(self.timeout_seconds * 1000)}ms"])
+            cursor.close()
+            if not self.autocommit:
+                conn.commit()
+
+            def cancel():
+                timed_out.set()
+                try:
+                    conn.cancel()
+                except Exception:
+                    pass
+
+            timer = threading.Timer(self.timeout_seconds, cancel)
+            timer.daemon = True
+            timer.start()
+
+            output = self.task(conn, target)
+            if timed_out.is_set():
+                raise TimeoutError()
+            if not self.autocommit:
+                conn.commit()
+            result["status"] = SUCCEEDED
+            result["output"] = output
+        except Exception as e:
+            if conn is not None and not self.autocommit:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            if timed_out.is_set():
+                result["status"] = TIMEOUT
+                result["error"] = f"timed out after {self.timeout_seconds}s"
+            else:
+                result["error"] = str(e).strip() or e.__class__.__name__
+        finally:
+            if timer:
+                timer.cancel()
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            result["duration_ms"] = int((time.perf_counter() - start) * 1000)
+
+        self._record(result)
+        return result
+
+    def _run_cluster(self, targets: List[dict]) -> List[dict]:
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(targets)),
+                                thread_name_prefix="fleet") as pool:
+            return list(pool.map(self.run_one, targets))
+
+    def run(self, targets: List[dict]) -> dict:
+        """Run the task everywhere and return the report."""
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        done = load_journal(self.journal_path, self.task_id)
+
+        by_cluster: Dict[str, List[dict]] = {}
+        skipped: Dict[str, List[dict]] = {}
+        for target in targets:
+            key = (target.get("cluster_id"), target["db_name"])
+            previous = done.get(key)
+            if previous and previous["status"] == SUCCEEDED:
+                entry = dict(previous, status=SKIPPED, error=None, duration_ms=0)
+                entry.pop("task", None)
+                skipped.setdefault(key[0], []).append(entry)
+                if self.on_result:
+                    self.on_result(entry)
+                continue
+            by_cluster.setdefault(key[0], []).append(target)
+
+        results: Dict[str, List[dict]] = {cid: list(entries) for cid, entries in skipped.items()}
+        if by_cluster:
+            with ThreadPoolExecutor(max_workers=len(by_cluster), thread_name_prefix="fleet-cluster") as pool:
+                futures = {cid: pool.submit(self._run_cluster, items) for cid, items in by_cluster.items()}
+                for cid, future in futures.items():
+                    results.setdefault(cid, []).extend(future.result())
+
+        totals = {SUCCEEDED: 0, FAILED: 0, TIMEOUT: 0, SKIPPED: 0}
+        for entries in results.values():
+            for entry in entries:
+                totals[entry["status"]] += 1
+
+        return {
+            "task": self.task_id,
+            "started_at": started_at.isoformat(),
+            "finished_at": datetime.utcnow().isoformat(),
+            "duration_ms": int((time.perf_counter() - start) * 1000),
+            "total": len(targets),
+            "totals": totals,
+            "clusters": {str(cid): entries for cid, entries in results.items()},
+        }
@@ -32,14 +32,11 @@ class FunctionsService:
         # For now, assuming functions service runs on a calculated port
         db = SessionLocal()
         try:
-            from models.project_secret import ProjectSecret
-            port_secret = db.query(ProjectSecret).filter(
-                ProjectSecret.project_id == self.project_id,
-                ProjectSecret.key == "FUNCTIONS_PORT"
-            ).first()
+            from services.secrets_service import get_secret
+            functions_port = get_secret(db, self.project_id, "FUNCTIONS_PORT")
             
-            if port_secret:
-                return f"http://localhost:{port_secret.value}/{function_name}"
+            if functions_port:
+                return f"http://localhost:{functions_port}/{function_name}"
             return None
         finally:
             db.close()
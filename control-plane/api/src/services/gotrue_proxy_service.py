@@ -8,7 +8,7 @@ GoTrue runs on each project's AUTH_PORT and provides Supabase-compatible auth AP
 import httpx
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from models.project_secret import ProjectSecret
+from services.secrets_service import get_project_secrets
 
 
 class GoTrueProxyService:
@@ -22,10 +22,7 @@ class GoTrueProxyService:
     
     def _load_secrets(self):
         """Load project secrets from database."""
-        secrets = self.db.query(ProjectSecret).filter(
-            ProjectSecret.project_id == self.project_id
-        ).all()
-        self._secrets = {s.key: s.value for s in secrets}
+        self._secrets = get_project_secrets(self.db, self.project_id)
     
     @property
     def auth_url(self) -> str:
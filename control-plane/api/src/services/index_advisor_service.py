@@ -0,0 +1,362 @@
+"""
+Index Advisor
+
+Suggests indexes to create or drop in a project's `public` schema from three
+sources:
+
+- Slow queries captured from the Postgres log (slow_queries) are EXPLAINed, in
+  a read-only transaction that is rolled back. A sequential scan with a filter
+  on a large table suggests an index on the filtered columns, unless an index
+  already leads with them. Its benefit is the slow-query time spent in those
+  statements.
+- pg_stat_user_tables: large tables read mostly by sequential scans are
+  reported for review, with the rows each scan reads.
+- pg_stat_user_indexes: indexes never scanned since the statistics were reset,
+  and indexes duplicating another one (same definition, or a strict column
+  prefix of another btree index), are suggested for dropping. Their benefit is
+  the space and write overhead reclaimed. Indexes behind a primary key, a
+  unique or an exclusion constraint are never suggested.
+
+Statements with $n placeholders can't be EXPLAINed without values on Postgres
+15. pg_stat_statements only has such texts, so only captured slow queries are
+EXPLAINed, and of those only the ones sent with literal values. Statements run
+over the extended query protocol (PostgREST's `execute <unnamed>: ... $1`) are
+skipped, since their parameters aren't kept, and counted in the report as
+`statements_skipped`. Statements whose EXPLAIN fails (table since dropped,
+different search_path) are counted as `statements_failed`.
+
+Reports are cached per project for INDEX_ADVISOR_TTL_SECONDS. The scheduler
+refreshes the reports of projects viewed within INDEX_ADVISOR_WATCH_SECONDS in
+the background, so the endpoint usually answers from the cache.
+"""
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.slow_query import SlowQuery
+
+INDEX_ADVISOR_TTL_SECONDS = float(os.getenv("INDEX_ADVISOR_TTL_SECONDS", "3600"))
+INDEX_ADVISOR_WATCH_SECONDS = float(os.getenv("INDEX_ADVISOR_WATCH_SECONDS", "86400"))
+INDEX_ADVISOR_REFRESH_SECONDS = int(os.getenv("INDEX_ADVISOR_REFRESH_SECONDS", "900"))
+INDEX_ADVISOR_LOOKBACK = timedelta(days=7)  # Slow queries considered
+INDEX_ADVISOR_MAX_STATEMENTS = 20  # Distinct slow statements EXPLAINed per run
+INDEX_ADVISOR_MIN_ROWS = 10000  # Smaller tables are fine with sequential scans
+INDEX_ADVISOR_STATEMENT_TIMEOUT_MS = 5000
+
+_TABLES_SQL = """
+    SELECT relname AS table, seq_scan, seq_tup_read, COALESCE(idx_scan, 0) AS idx_scan,
+           n_live_tup, n_tup_ins + n_tup_upd + n_tup_del AS writes,
+           pg_relation_size(relid) AS bytes
+    FROM pg_stat_user_tables
+    WHERE schemaname = 'public'
+"""
+_INDEXES_SQL = """
+    SELECT s.relname AS table, s.indexrelname AS index, s.idx_scan,
+           pg_relation_size(s.indexrelid) AS bytes,
+           i.indisunique OR i.indisprimary OR i.indisexclusion AS constraint_backed,
+           am.amname AS method,
+           ARRAY(
+               SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, n)
+               JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+               ORDER BY k.n
+           )::text[] AS columns,
+           i.indclass::text AS opclasses,
+           pg_get_expr(i.indexprs, i.indrelid) AS expressions,
+           pg_get_expr(i.indpred, i.indrelid) AS predicate,
+           pg_get_indexdef(s.indexrelid) AS definition
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    JOIN pg_class c ON c.oid = s.indexrelid
+    JOIN pg_am am ON am.oid = c.relam
+    WHERE s.schemaname = 'public'
+"""
+_STATS_SINCE_SQL = "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE)\b", re.IGNORECASE)
+_PLACEHOLDER = r"\$[0-9]"  # A bind parameter ($1, $2, ...), as a regex both Postgres and Python read alike
+# `(col = ...)`, `((col)::text = ...)`: a column compared with an indexable operator
+_FILTER_COLUMN = re.compile(r"\(+\"?([a-z_][a-z0-9_]*)\"?\)?(?:::[a-z ]+)?\s(=|<=|>=|<|>)\s")
+
+_cache: Dict[str, dict] = {}
+_cache_lock = threading.Lock()
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def seq_scans(plan: dict) -> List[dict]:
+    """Filtered sequential scans in an EXPLAIN (FORMAT JSON) plan: table, equality and range columns."""
+    found = []
+    node = plan.get("Plan", plan)
+    if node.get("Node Type") == "Seq Scan" and node.get("Filter") and node.get("Relation Name"):
+        equality, ranged = [], []
+        for column, operator in _FILTER_COLUMN.findall(node["Filter"]):
+            target = equality if operator == "=" else ranged
+            if column not in equality and column not in ranged:
+                target.append(column)
+        if equality or ranged:
+            found.append({
+                "table": node["Relation Name"],
+                # Equality columns first; a btree can use at most one range column after them
+                "columns": equality + ranged[:1],
+                "rows": node.get("Plan Rows"),
+                "cost": node.get("Total Cost"),
+            })
+    for child in node.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def redundant_indexes(indexes: List[dict]) -> List[dict]:
+    """Indexes made redundant by another one: (index, covered by, why)."""
+    redundant = []
+    plain = [i for i in indexes if not i["expressions"]]
+    for index in plain:
+        if index["constraint_backed"]:
+            continue
+        for other in plain:
+            if other is index or other["table"] != index["table"] or other["predicate"] != index["predicate"]:
+                continue
+            if other["method"] != index["method"]:
+                continue
+            same = other["columns"] == index["columns"] and other["opclasses"] == index["opclasses"]
+            if same and (other["constraint_backed"] or other["index"] < index["index"]):
+                redundant.append({"index": index, "covered_by": other["index"], "why": "duplicate"})
+                break
+            is_prefix = (
+                index["method"] == "btree"
+                and len(index["columns"]) < len(other["columns"])
+                and other["columns"][:len(index["columns"])] == index["columns"]
+                and other["opclasses"].split()[:len(index["columns"])] == index["opclasses"].split()
+            )
+            if is_prefix:
+                redundant.append({"index": index, "covered_by": other["index"], "why": "prefix"})
+                break
+    return redundant
+
+
+def recommend(tables: List[dict], indexes: List[dict], scans: List[dict]) -> List[dict]:
+    """
+    Combine table stats, index stats and the sequential scans found in slow
+    statements' plans (each with the statement's `calls` and `total_ms`).
+    """
+    tables_by_name = {t["table"]: t for t in tables}
+    recommendations = []
+
+    # Indexes to create, one per table and column list
+    wanted: Dict[tuple, dict] = {}
+    for scan in scans:
+        table = tables_by_name.get(scan["table"])
+        if table is None or table["n_live_tup"] < INDEX_ADVISOR_MIN_ROWS:
+            continue
+        covered = any(
+            i["table"] == scan["table"] and not i["expressions"] and not i["predicate"]
+            and i["method"] == "btree" and i["columns"][:len(scan["columns"])] == scan["columns"]
+            for i in indexes
+        )
+        if covered:
+            continue
+        key = (scan["table"], tuple(scan["columns"]))
+        entry = wanted.setdefault(key, {"statements": 0, "calls": 0, "slow_query_ms": 0.0})
+        entry["statements"] += 1
+        entry["calls"] += scan["calls"]
+        entry["slow_query_ms"] += scan["total_ms"]
+
+    for (table_name, columns), benefit in sorted(wanted.items(), key=lambda item: -item[1]["slow_query_ms"]):
+        table = tables_by_name[table_name]
+        recommendations.append({
+            "action": "create",
+            "table": table_name,
+            "columns": list(columns),
+            "sql": f"CREATE INDEX CONCURRENTLY ON public.{_quote(table_name)} ({', '.join(_quote(c) for c in columns)})",
+            "reason": f"Slow statements filter {table_name} on {', '.join(columns)} with a sequential scan",
+            "estimated_benefit": {
+                "slow_statements": benefit["statements"],
+                "slow_calls": benefit["calls"],
+                "slow_query_ms": round(benefit["slow_query_ms"], 1),
+                "rows_per_seq_scan": table["seq_tup_read"] // table["seq_scan"] if table["seq_scan"] else None,
+            },
+        })
+
+    # Large tables read mostly sequentially, without a statement to pin it on
+    suggested_tables = {table_name for table_name, _ in wanted}
+    for table in sorted(tables, key=lambda t: -t["seq_tup_read"]):
+        if table["table"] in suggested_tables or table["n_live_tup"] < INDEX_ADVISOR_MIN_ROWS:
+            continue
+        if table["seq_scan"] > table["idx_scan"] and table["seq_tup_read"] // max(table["seq_scan"], 1) >= INDEX_ADVISOR_MIN_ROWS:
+            recommendations.append({
+                "action": "review",
+                "table": table["table"],
+                "sql": None,
+                "reason": f"{table['table']} is read by sequential scans more often than by index scans",
+                "estimated_benefit": {
+                    "seq_scans": table["seq_scan"],
+                    "idx_scans": table["idx_scan"],
+                    "rows_per_seq_scan": table["seq_tup_read"] // table["seq_scan"],
+                },
+            })
+
+    # Indexes to drop
+    drops = []
+    redundant = {id(r["index"]): r for r in redundant_indexes(indexes)}
+    for index in indexes:
+        if index["constraint_backed"]:
+            continue
+        table = tables_by_name.get(index["table"], {})
+        if id(index) in redundant:
+            entry = redundant[id(index)]
+            reason = (
+                f"Same definition as {entry['covered_by']}" if entry["why"] == "duplicate"
+                else f"Its columns are a prefix of {entry['covered_by']}, which serves the same lookups"
+            )
+        elif index["idx_scan"] == 0:
+            reason = "Never used since the statistics were last reset"
+        else:
+            continue
+        drops.append({
+            "action": "drop",
+            "table": index["table"],
+            "index": index["index"],
+            "sql": f"DROP INDEX CONCURRENTLY public.{_quote(index['index'])}",
+            "reason": reason,
+            "estimated_benefit": {
+                "bytes_reclaimed": index["bytes"],
+                "writes_avoided": table.get("writes"),  # Row changes that also had to update this index
+            },
+        })
+    recommendations.extend(sorted(drops, key=lambda d: -d["estimated_benefit"]["bytes_reclaimed"]))
+    return recommendations
+
+
+class IndexAdvisorService:
+
+    @staticmethod
+    def _slow_statements(db: Session, project_id: str) -> Tuple[List[dict], int]:
+        """
+        The slowest recent statements that can be EXPLAINed, and how many distinct
+        ones were left out for carrying $n placeholders.
+        """
+        recent = (
+            SlowQuery.project_id == project_id,
+            SlowQuery.occurred_at >= datetime.utcnow() - INDEX_ADVISOR_LOOKBACK,
+        )
+        parameterized = SlowQuery.statement.regexp_match(_PLACEHOLDER)
+        skipped = db.query(func.count(func.distinct(SlowQuery.statement))).filter(*recent, parameterized).scalar()
+        rows = db.query(
+            SlowQuery.statement,
+            func.count(SlowQuery.id),
+            func.sum(SlowQuery.duration_ms),
+        ).filter(*recent, ~parameterized).group_by(SlowQuery.statement).order_by(
+            func.sum(SlowQuery.duration_ms).desc()
+        ).limit(INDEX_ADVISOR_MAX_STATEMENTS).all()
+        statements = [
+            {"statement": statement, "calls": calls, "total_ms": float(total_ms)}
+            for statement, calls, total_ms in rows
+            if _EXPLAINABLE.match(statement) and ";" not in statement.rstrip().rstrip(";")
+        ]
+        return statements, skipped or 0
+
+    @staticmethod
+    def analyze(db: Session, project_id: str) -> dict:
+        """Build a fresh report from the project database and its captured slow queries."""
+        from services.database_service import DatabaseService
+
+        statements, skipped = IndexAdvisorService._slow_statements(db, project_id)
+        conn = psycopg2.connect(
+            DatabaseService(project_id)._get_connection_string(),
+            options=f"-c statement_timeout={INDEX_ADVISOR_STATEMENT_TIMEOUT_MS}",
+        )
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(_TABLES_SQL)
+            tables = [dict(row) for row in cursor.fetchall()]
+            cursor.execute(_INDEXES_SQL)
+            indexes = [dict(row) for row in cursor.fetchall()]
+            cursor.execute(_STATS_SINCE_SQL)
+            row = cursor.fetchone()
+            stats_since = row["stats_reset"] if row else None
+            conn.rollback()
+
+            scans, explained, failed = [], 0, 0
+            for statement in statements:
+                try:
+                    # Plans only; read-only and rolled back in case the text hides more than one statement
+                    cursor.execute("SET TRANSACTION READ ONLY")
+                    cursor.execute("EXPLAIN (FORMAT JSON) " + statement["statement"].rstrip().rstrip(";"))
+                    plan = cursor.fetchone()["QUERY PLAN"]
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    explained += 1
+                    for scan in seq_scans(plan[0]):
+                        scans.append(dict(scan, calls=statement["calls"], total_ms=statement["total_ms"]))
+                except psycopg2.Error:
+                    failed += 1  # Table since dropped, statement needs a different search_path, ...
+                finally:
+                    conn.rollback()
+            cursor.close()
+        finally:
+            conn.close()
+
+        return {
+            "project_id": project_id,
+            "generated_at": datetime.utcnow().isoformat(),
+            "stats_since": stats_since.isoformat() if stats_since else None,
+            "tables_analyzed": len(tables),
+            "statements_explained": explained,
+            "statements_skipped": skipped,
+            "statements_failed": failed,
+            "recommendations": recommend(tables, indexes, scans),
+        }
+
+    @staticmethod
+    def get_report(db: Session, project_id: str, refresh: bool = False) -> dict:
+        """The cached report of a project, built now if there is none yet (or `refresh`)."""
+        now = time.time()
+        with _cache_lock:
+            entry = _cache.get(project_id)
+            if entry:
+                entry["viewed_at"] = now
+        if entry and not refresh:
+            return dict(entry["report"], stale=now - entry["refreshed_at"] > INDEX_ADVISOR_TTL_SECONDS)
+
+        report = IndexAdvisorService.analyze(db, project_id)
+        with _cache_lock:
+            _cache[project_id] = {"report": report, "refreshed_at": time.time(), "viewed_at": now}
+        return dict(report, stale=False)
+
+    @staticmethod
+    def refresh_watched(db: Session) -> int:
+        """Rebuild expired reports of recently viewed projects; forget the others. Returns reports rebuilt."""
+        now = time.time()
+        with _cache_lock:
+            for project_id in [p for p, e in _cache.items() if now - e["viewed_at"] > INDEX_ADVISOR_WATCH_SECONDS]:
+                del _cache[project_id]
+            due = [p for p, e in _cache.items() if now - e["refreshed_at"] > INDEX_ADVISOR_TTL_SECONDS]
+
+        refreshed = 0
+        for project_id in due:
+            try:
+                report = IndexAdvisorService.analyze(db, project_id)
+            except Exception as e:
+                print(f"[IndexAdvisor] Refreshing {project_id} failed: {e}")
+                continue
+            with _cache_lock:
+                if project_id in _cache:
+                    _cache[project_id].update(report=report, refreshed_at=time.time())
+                    refreshed += 1
+        return refreshed
+
+    @staticmethod
+    def forget(project_id: str):
+        with _cache_lock:
+            _cache.pop(project_id, None)
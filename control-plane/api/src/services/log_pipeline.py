@@ -0,0 +1,563 @@
+"""
+Log Pipeline
+
+Follows the logs of shared-stack and dedicated-project containers once, in the
+background, and indexes every line by project and service in an in-process
+ring store that the logs API queries.
+
+Containers come from the container registry as soon as it sees them start
+(and at least every LOG_DISCOVERY_SECONDS), and each is followed over a single
+streaming request. A newly seen container is read from LOG_BACKFILL_SECONDS
+back; a container that restarts is resumed after the last line already stored.
+
+Lines of a dedicated project's containers belong to that project. The shared
+Postgres writes its database name into every line's prefix, so its records go
+to the project owning that database (see services/postgres_logs.py); slow
+statements among them are also stored as the project's slow queries. Lines of
+the other shared services are attributed by `project_<id>` (role names) or by a
+known project ID appearing in the line (gateway request paths). Lines that
+can't be attributed to a project are dropped, so a tenant never sees another
+tenant's activity.
+
+Live viewers (the logs stream endpoint) subscribe per project; every stored
+entry is fanned out to them from the same followers.
+"""
+import asyncio
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from services.container_registry import container_registry
+from services.docker_engine import DockerEngine
+from services.postgres_logs import PostgresLogAssembler, project_of_database, slow_query
+
+LOG_PIPELINE_ENABLED = os.getenv("LOG_PIPELINE_ENABLED", "true").lower() == "true"
+LOG_RING_SIZE = int(os.getenv("LOG_RING_SIZE", "5000"))  # Lines kept per project and service
+LOG_DISCOVERY_SECONDS = float(os.getenv("LOG_DISCOVERY_SECONDS", "15"))
+LOG_BACKFILL_SECONDS = int(os.getenv("LOG_BACKFILL_SECONDS", "300"))
+LOG_MAX_LINE_CHARS = int(os.getenv("LOG_MAX_LINE_CHARS", "8192"))
+# Entries buffered per live viewer before further ones are dropped
+LOG_STREAM_QUEUE_SIZE = int(os.getenv("LOG_STREAM_QUEUE_SIZE", "1000"))
+SLOW_QUERY_FLUSH_SECONDS = float(os.getenv("SLOW_QUERY_FLUSH_SECONDS", "5"))
+SLOW_QUERY_BUFFER_SIZE = 10000  # Rows held while the control-plane DB is unreachable
+# A Postgres record is complete once no further line of it arrived for this long
+POSTGRES_RECORD_IDLE_SECONDS = 0.5
+
+LEVELS = ["debug", "info", "warning", "error", "fatal"]
+
+# Compose service -> logs API service
+SHARED_SERVICES = {
+    "shared-postgres": "database",
+    "shared-gateway-v3": "api",
+    "shared-api": "api",
+    "shared-auth": "auth",
+    "shared-storage": "storage",
+    "shared-realtime": "realtime",
+}
+DEDICATED_SERVICES = {
+    "postgres": "database",
+    "api": "api",
+    "gateway": "api",
+    "auth": "auth",
+    "storage": "storage",
+    "realtime": "realtime",
+    "functions": "functions",
+}
+
+_LEVEL_NAMES = {
+    "debug": "debug", "trace": "debug",
+    "log": "info", "info": "info", "notice": "info",
+    "warn": "warning", "warning": "warning",
+    "err": "error", "error": "error",
+    "fatal": "fatal", "panic": "fatal", "critical": "fatal", "crit": "fatal",
+}
+_PG_LEVEL = re.compile(r"\b(DEBUG[1-5]?|LOG|INFO|NOTICE|WARNING|ERROR|FATAL|PANIC):")
+_GENERIC_LEVEL = re.compile(r"\b(debug|trace|info|notice|warn|warning|err|error|fatal|panic|critical|crit)\b", re.IGNORECASE)
+_PROJECT_DB = re.compile(r"project_([0-9a-f]{12})(?![0-9a-f])")
+_PROJECT_ID = re.compile(r"(?<![0-9a-f])([0-9a-f]{12})(?![0-9a-f])")
+
+
+def _normalize_level(name: str) -> Optional[str]:
+    name = name.lower()
+    if name.startswith("debug"):
+        return "debug"
+    return _LEVEL_NAMES.get(name)
+
+
+def _parse_timestamp(text: str) -> Optional[float]:
+    """Docker's RFC 3339 timestamps carry nanoseconds; datetime takes microseconds."""
+    text = text.rstrip("Z")
+    if "." in text:
+        head, fraction = text.split(".", 1)
+        text = f"{head}.{fraction[:6]}"
+    try:
+        return datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def split_timestamp(raw: str) -> Tuple[float, str]:
+    """(timestamp, text) of a line read with Docker's timestamps option."""
+    ts_text, _, text = raw.partition(" ")
+    timestamp = _parse_timestamp(ts_text)
+    if timestamp is None:
+        return time.time(), raw
+    return timestamp, text
+
+
+def _detect_level(message: str) -> str:
+    level = None
+    if message.startswith("{"):
+        try:
+            fields = json.loads(message)
+        except ValueError:
+            fields = None
+        if isinstance(fields, dict):
+            level = _normalize_level(str(fields.get("level") or fields.get("severity") or fields.get("error_severity") or ""))
+    if level is None:
+        match = _PG_LEVEL.search(message) or _GENERIC_LEVEL.search(message)
+        level = (_normalize_level(match.group(1)) if match else None) or "info"
+    return level
+
+
+def _attribute(message: str, known_projects: Set[str]) -> Optional[str]:
+    match = _PROJECT_DB.search(message)
+    if match:
+        return match.group(1)
+    return next((pid for pid in _PROJECT_ID.findall(message) if pid in known_projects), None)
+
+
+def parse_line(raw: str, service: str, project_id: Optional[str], known_projects: Set[str]) -> dict:
+    """
+    Turn one timestamped container log line into an entry. `project_id` is None
+    for shared services, in which case it is taken from the line (None if the
+    line names no project).
+    """
+    timestamp, message = split_timestamp(raw)
+    message = message[:LOG_MAX_LINE_CHARS]
+    level = _detect_level(message)
+    if project_id is None:
+        project_id = _attribute(message, known_projects)
+
+    return {
+        "timestamp": timestamp,
+        "project_id": project_id,
+        "service": service,
+        "level": level,
+        "message": message,
+    }
+
+
+def postgres_entry(record: dict, service: str, project_id: Optional[str], known_projects: Set[str]) -> dict:
+    """
+    Entry of a Postgres record (see PostgresLogAssembler). On the shared cluster
+    it belongs to the project owning the record's database; records of the admin
+    database (e.g. CREATE DATABASE) fall back to the project they name.
+    """
+    message = record["text"][:LOG_MAX_LINE_CHARS]
+    if record["severity"]:
+        level = _normalize_level(record["severity"]) or "info"
+    else:
+        level = _detect_level(message)
+    if project_id is None:
+        project_id = project_of_database(record["database"]) or _attribute(message, known_projects)
+    return {
+        "timestamp": record["timestamp"],
+        "project_id": project_id,
+        "service": service,
+        "level": level,
+        "message": message,
+    }
+
+
+async def with_idle_ticks(lines, seconds: float):
+    """Yield the lines of an async iterator, and None whenever none arrived for `seconds`."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    done = object()
+
+    async def pump():
+        try:
+            async for line in lines:
+                await queue.put(line)
+        finally:
+            try:
+                queue.put_nowait(done)
+            except asyncio.QueueFull:
+                pass
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                line = await asyncio.wait_for(queue.get(), seconds)
+            except asyncio.TimeoutError:
+                if task.done() and queue.empty():
+                    break
+                yield None
+                continue
+            if line is done:
+                break
+            yield line
+        await task  # Surfaces the stream's error, if it failed
+    finally:
+        task.cancel()
+
+
+def entry_matches(entry: dict, service: Optional[str], min_level: Optional[str], search: Optional[str]) -> bool:
+    if service is not None and entry["service"] != service:
+        return False
+    if min_level and LEVELS.index(entry["level"]) < LEVELS.index(min_level):
+        return False
+    if search and search.lower() not in entry["message"].lower():
+        return False
+    return True
+
+
+class LogStore:
+    """
+    Bounded ring of entries per (project, service). Entry IDs increase
+    monotonically within a store; stream event IDs carry the store's epoch too,
+    since another process (or this one after a restart) numbers from 1 again.
+    """
+
+    def __init__(self, size: int = LOG_RING_SIZE):
+        self.size = size
+        self.epoch = uuid.uuid4().hex[:12]
+        self.last_id = 0
+        self._streams: Dict[Tuple[str, str], deque] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def event_id(self, entry: dict) -> str:
+        return f"{self.epoch}-{entry['id']}"
+
+    def resume_after(self, event_id: Optional[str]) -> Optional[int]:
+        """
+        Entry ID a stream reconnecting with `event_id` (Last-Event-ID) resumes
+        after; None if this store didn't issue it, so nothing can be replayed.
+        """
+        epoch, _, entry_id = (event_id or "").partition("-")
+        if epoch != self.epoch or not entry_id.isdigit() or int(entry_id) > self.last_id:
+            return None
+        return int(entry_id)
+
+    def append(self, entry: dict):
+        with self._lock:
+            entry["id"] = self.last_id = next(self._ids)
+            key = (entry["project_id"], entry["service"])
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = deque(maxlen=self.size)
+            stream.append(entry)
+
+    def retain(self, project_ids: Set[str]):
+        """Drop the logs of projects that no longer exist."""
+        with self._lock:
+            for key in [k for k in self._streams if k[0] not in project_ids]:
+                del self._streams[key]
+
+    def query(self, project_id: str, service: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, min_level: Optional[str] = None, search: Optional[str] = None,
+              before: Optional[int] = None, after: Optional[int] = None,
+              limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+        """
+        Entries of a project, newest first. `before` is the cursor returned with
+        the previous page; returns (entries, next cursor or None on the last page).
+        `after` limits the result to entries newer than that ID.
+        """
+        matches = []
+        with self._lock:
+            streams = [s for (pid, svc), s in self._streams.items()
+                       if pid == project_id and (service is None or svc == service)]
+            for stream in streams:
+                found = 0
+                for entry in reversed(stream):
+                    if before is not None and entry["id"] >= before:
+                        continue
+                    if after is not None and entry["id"] <= after:
+                        break
+                    if since is not None and entry["timestamp"] < since:
+                        continue
+                    if until is not None and entry["timestamp"] > until:
+                        continue
+                    if not entry_matches(entry, None, min_level, search):
+                        continue
+                    matches.append(dict(entry))
+                    found += 1
+                    if found == limit:
+                        break
+
+        matches.sort(key=lambda e: e["id"], reverse=True)
+        page = matches[:limit]
+        return page, (page[-1]["id"] if len(page) == limit else None)
+
+
+class LogViewer:
+    """
+    One live viewer of a project's logs. New entries wait in a bounded queue;
+    when a slow client lets it fill up, further entries are dropped and
+    recorded as gaps (ID range and count) the client is told about in order.
+    """
+
+    def __init__(self, project_id: str, loop: asyncio.AbstractEventLoop, service: Optional[str] = None,
+                 min_level: Optional[str] = None, search: Optional[str] = None,
+                 queue_size: int = LOG_STREAM_QUEUE_SIZE):
+        self.project_id = project_id
+        self.loop = loop
+        self.service = service
+        self.min_level = min_level
+        self.search = search
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.gaps: deque = deque()
+        self._open_gap = None
+
+    def offer(self, entry: dict):
+        """Called on the viewer's event loop."""
+        if not entry_matches(entry, self.service, self.min_level, self.search):
+            return
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            if self._open_gap is None:
+                self._open_gap = {"from_id": entry["id"], "to_id": entry["id"], "count": 0}
+                self.gaps.append(self._open_gap)
+            self._open_gap["to_id"] = entry["id"]
+            self._open_gap["count"] += 1
+            return
+        self._open_gap = None
+
+    def gaps_before(self, entry_id: int) -> List[dict]:
+        """Gaps that happened before the given entry, in order."""
+        gaps = []
+        while self.gaps and self.gaps[0]["to_id"] < entry_id:
+            gap = self.gaps.popleft()
+            if gap is self._open_gap:
+                self._open_gap = None
+            gaps.append(gap)
+        return gaps
+
+
+class LogSubscriptions:
+    """
+    Fans newly ingested entries out to live viewers. Entries are only handed to
+    an event loop when the project has viewers there, once per entry however
+    many viewers share it.
+    """
+
+    def __init__(self):
+        self._viewers: Dict[str, List[LogViewer]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, viewer: LogViewer) -> LogViewer:
+        with self._lock:
+            self._viewers.setdefault(viewer.project_id, []).append(viewer)
+        return viewer
+
+    def unsubscribe(self, viewer: LogViewer):
+        with self._lock:
+            viewers = self._viewers.get(viewer.project_id, [])
+            if viewer in viewers:
+                viewers.remove(viewer)
+            if not viewers:
+                self._viewers.pop(viewer.project_id, None)
+
+    def viewer_count(self, project_id: str) -> int:
+        with self._lock:
+            return len(self._viewers.get(project_id, []))
+
+    def publish(self, entry: dict):
+        """Called from the pipeline thread for every stored entry."""
+        with self._lock:
+            viewers = self._viewers.get(entry["project_id"])
+            loops = {v.loop for v in viewers} if viewers else ()
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, entry, loop)
+            except RuntimeError:
+                pass  # Loop closed, its viewers are going away
+
+    def _dispatch(self, entry: dict, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            viewers = [v for v in self._viewers.get(entry["project_id"], []) if v.loop is loop]
+        for viewer in viewers:
+            viewer.offer(entry)
+
+
+class LogPipeline:
+    """Background thread running the container followers on its own event loop."""
+
+    def __init__(self):
+        self.store = LogStore()
+        self.subscriptions = LogSubscriptions()
+        self._known_projects: Set[str] = set()
+        self._following: Dict[str, asyncio.Task] = {}
+        self._resume_at: Dict[str, float] = {}
+        self._slow_queries: deque = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not LOG_PIPELINE_ENABLED or self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="log-pipeline", daemon=True)
+        self._thread.start()
+        print("[Logs] Log pipeline started")
+
+    def stop(self):
+        self._stopping.set()
+        self._thread = None
+
+    def _refresh_projects(self):
+        from core.database import SessionLocal
+        from models.project import Project, ProjectStatus
+
+        db = SessionLocal()
+        try:
+            rows = db.query(Project.id).filter(Project.status != ProjectStatus.DELETED).all()
+        finally:
+            db.close()
+        self._known_projects = {row[0] for row in rows}
+        self.store.retain(self._known_projects)
+
+    def _source(self, labels: Dict[str, str]) -> Optional[Tuple[str, Optional[str]]]:
+        """(logs API service, owning project or None for shared) of a container, or None to skip it."""
+        compose_service = labels.get("com.docker.compose.service")
+        compose_project = labels.get("com.docker.compose.project")
+        if compose_service in SHARED_SERVICES:
+            return SHARED_SERVICES[compose_service], None
+        if compose_project in self._known_projects and compose_service in DEDICATED_SERVICES:
+            return DEDICATED_SERVICES[compose_service], compose_project
+        return None
+
+    async def _discover(self, engine: DockerEngine):
+        if not container_registry.ready:
+            return
+        containers = container_registry.all()
+        running = set()
+        for container in containers:
+            if container["state"] != "running":
+                continue
+            source = self._source(container["labels"])
+            if source is None:
+                continue
+            running.add(container["id"])
+            task = self._following.get(container["id"])
+            if task is None or task.done():
+                self._following[container["id"]] = asyncio.create_task(
+                    self._follow(engine, container["id"], *source)
+                )
+        for container_id in [c for c in self._following if c not in running]:
+            self._following.pop(container_id).cancel()
+        # Stopped containers keep their resume point until they are removed
+        existing = {c["id"] for c in containers}
+        for container_id in [c for c in self._resume_at if c not in existing]:
+            del self._resume_at[container_id]
+
+    def _ingest(self, entry: dict):
+        if entry["project_id"]:
+            self.store.append(entry)
+            self.subscriptions.publish(entry)
+
+    def _ingest_postgres(self, records: List[dict], service: str, project_id: Optional[str]):
+        for record in records:
+            entry = postgres_entry(record, service, project_id, self._known_projects)
+            self._ingest(entry)
+            row = slow_query(record, entry["project_id"]) if entry["project_id"] else None
+            if row:
+                self._slow_queries.append(row)
+
+    async def _follow(self, engine: DockerEngine, container_id: str, service: str, project_id: Optional[str]):
+        since = self._resume_at.get(container_id, time.time() - LOG_BACKFILL_SECONDS)
+        try:
+            info = await engine.inspect(container_id)
+            tty = bool((info.get("Config") or {}).get("Tty"))
+            async with engine.logs(container_id, since, tty) as lines:
+                if service == "database":
+                    await self._follow_postgres(container_id, lines, service, project_id)
+                    return
+                async for raw in lines:
+                    entry = parse_line(raw, service, project_id, self._known_projects)
+                    # Resume strictly after the last line seen, attributed or not
+                    self._resume_at[container_id] = entry["timestamp"] + 1e-6
+                    self._ingest(entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Logs] Following {container_id[:12]} ({service}) stopped: {e}")
+
+    async def _follow_postgres(self, container_id: str, lines, service: str, project_id: Optional[str]):
+        """Postgres records can span lines, so lines are grouped into records first."""
+        assembler = PostgresLogAssembler(LOG_MAX_LINE_CHARS)
+        async for raw in with_idle_ticks(lines, POSTGRES_RECORD_IDLE_SECONDS):
+            if raw is None:
+                self._ingest_postgres(assembler.flush(), service, project_id)
+                continue
+            timestamp, text = split_timestamp(raw)
+            self._resume_at[container_id] = timestamp + 1e-6
+            self._ingest_postgres(assembler.feed(timestamp, text), service, project_id)
+        self._ingest_postgres(assembler.flush(), service, project_id)
+
+    def _flush_slow_queries(self):
+        from core.database import SessionLocal
+        from services.slow_query_service import SlowQueryService
+
+        rows = []
+        while self._slow_queries:
+            rows.append(self._slow_queries.popleft())
+        if not rows:
+            return
+        db = SessionLocal()
+        try:
+            SlowQueryService.record(db, rows)
+        except Exception as e:
+            db.rollback()
+            # Keep them for the next attempt; the buffer drops the oldest when full
+            self._slow_queries.extendleft(reversed(rows))
+            print(f"[Logs] Storing {len(rows)} slow queries failed: {e}")
+        finally:
+            db.close()
+
+    async def _flush_slow_queries_periodically(self):
+        while not self._stopping.is_set():
+            await asyncio.sleep(SLOW_QUERY_FLUSH_SECONDS)
+            await asyncio.to_thread(self._flush_slow_queries)
+
+    async def _run(self):
+        engine = DockerEngine()
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        # Follow new containers as soon as the registry sees them start
+        container_registry.on_change(lambda: loop.call_soon_threadsafe(changed.set))
+        projects_refreshed_at = 0.0
+        flusher = asyncio.create_task(self._flush_slow_queries_periodically())
+        try:
+            while not self._stopping.is_set():
+                try:
+                    if time.monotonic() - projects_refreshed_at >= LOG_DISCOVERY_SECONDS:
+                        await asyncio.to_thread(self._refresh_projects)
+                        projects_refreshed_at = time.monotonic()
+                    await self._discover(engine)
+                except Exception as e:
+                    print(f"[Logs] Container discovery failed: {e}")
+                try:
+                    await asyncio.wait_for(changed.wait(), LOG_DISCOVERY_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                changed.clear()
+        finally:
+            flusher.cancel()
+            for task in self._following.values():
+                task.cancel()
+            await engine.close()
+            self._flush_slow_queries()
+
+
+log_pipeline = LogPipeline()
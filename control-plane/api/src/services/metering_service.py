@@ -0,0 +1,82 @@
+"""
+Metering Service
+
+Ingests per-project request deltas flushed in batches by the shared routing proxy
+and folds them into the org's current 1-minute usage bucket.
+"""
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.project import Project
+from models.usage_record import UsageRecord, UsageResolution
+
+# Shared secret the routing proxy sends in X-Metering-Token
+METERING_TOKEN = os.getenv("METERING_TOKEN", "")
+
+
+class MeteringService:
+    @staticmethod
+    def record_batch(db: Session, deltas: List[Dict], now: Optional[datetime] = None) -> int:
+        """
+        Adds request counts, bytes and latency to the current 1m usage bucket of each project's org.
+        Deltas for unknown projects are dropped. Returns the number of org buckets updated.
+        """
+        if not deltas:
+            return 0
+
+        now = now or datetime.utcnow()
+        bucket = now.replace(second=0, microsecond=0)
+
+        # Resolve all projects in one query
+        project_ids = {d["project_id"] for d in deltas}
+        org_by_project = dict(
+            db.query(Project.id, Project.org_id).filter(
+                Project.id.in_(project_ids),
+                Project.org_id.isnot(None)
+            ).all()
+        )
+
+        per_org = {}
+        for delta in deltas:
+            org_id = org_by_project.get(delta["project_id"])
+            if not org_id:
+                continue
+            totals = per_org.setdefault(org_id, {"requests": 0, "bytes_in": 0, "bytes_out": 0, "latency_ms": 0})
+            totals["requests"] += int(delta.get("requests", 0))
+            totals["bytes_in"] += int(delta.get("bytes_in", 0))
+            totals["bytes_out"] += int(delta.get("bytes_out", 0))
+            totals["latency_ms"] += int(delta.get("latency_ms_total", 0))
+
+        if not per_org:
+            return 0
+
+        rows = [
+            {
+                "org_id": org_id,
+                "resolution": UsageResolution.minute.value,
+                "recorded_at": bucket,
+                "api_requests_count": t["requests"],
+                "bytes_in": t["bytes_in"],
+                "bytes_out": t["bytes_out"],
+                "api_latency_ms_total": t["latency_ms"],
+                "sample_count": 0,
+            }
+            for org_id, t in per_org.items()
+        ]
+
+        stmt = pg_insert(UsageRecord).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_usage_records_bucket",
+            set_={
+                "api_requests_count": UsageRecord.api_requests_count + stmt.excluded.api_requests_count,
+                "bytes_in": UsageRecord.bytes_in + stmt.excluded.bytes_in,
+                "bytes_out": UsageRecord.bytes_out + stmt.excluded.bytes_out,
+                "api_latency_ms_total": UsageRecord.api_latency_ms_total + stmt.excluded.api_latency_ms_total,
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+        return len(rows)
@@ -0,0 +1,141 @@
+"""
+Metrics Service
+
+Refreshes the business gauges exposed on /metrics from the control-plane DB.
+Runs on its own scheduler interval so Prometheus scrapes never hit the database.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core import metrics
+from models.cluster import Cluster
+from models.organization import Organization
+from models.project import Project, ProjectStatus
+from models.user import User
+from services.container_registry import container_registry
+
+BUSINESS_METRICS_INTERVAL_SECONDS = int(os.getenv("BUSINESS_METRICS_INTERVAL_SECONDS", "30"))
+
+# Latest successful backup per project, fed by the backup job.
+# Seeded once from the backup bucket so a restart doesn't report every project as missing.
+_backup_lock = threading.Lock()
+_last_backup_success: Dict[str, datetime] = {}
+_backup_history_seeded = False
+
+# Label sets written on the previous refresh, so series that disappear can be removed
+_published_labels: Dict[object, set] = {}
+
+
+def _label(value) -> str:
+    if value is None:
+        return "none"
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def _publish(gauge, values: Dict[Tuple[str, ...], float]):
+    """Set a labelled gauge to exactly `values`, dropping series that no longer exist."""
+    for labels, value in values.items():
+        gauge.labels(*labels).set(value)
+
+    previous = _published_labels.get(gauge, set())
+    for labels in previous - set(values):
+        try:
+            gauge.remove(*labels)
+        except KeyError:
+            pass
+    _published_labels[gauge] = set(values)
+
+
+class MetricsService:
+    @staticmethod
+    def record_backup(project_id: str, success: bool, at: Optional[datetime] = None):
+        """Called by the backup job after each project's backup attempt."""
+        if not success:
+            return
+        with _backup_lock:
+            _last_backup_success[project_id] = at or datetime.utcnow()
+
+    @staticmethod
+    def record_backup_run(succeeded: int, failed: int):
+        """Called by the backup job once a run has finished."""
+        metrics.supalove_backup_last_run_projects.labels(result="success").set(succeeded)
+        metrics.supalove_backup_last_run_projects.labels(result="failure").set(failed)
+        metrics.supalove_backup_last_run_timestamp_seconds.set(time.time())
+
+    @staticmethod
+    def seed_backup_history(backup_service):
+        """Load the latest backup time per project from the backup bucket (one listing)."""
+        global _backup_history_seeded
+        if _backup_history_seeded:
+            return
+
+        latest: Dict[str, datetime] = {}
+        objects = backup_service.storage_service.client.list_objects(
+            backup_service.backup_bucket, recursive=True
+        )
+        for obj in objects:
+            project_id = obj.object_name.split("/", 1)[0]
+            # MinIO returns aware UTC datetimes; the rest of the control plane is naive UTC
+            modified = obj.last_modified.replace(tzinfo=None) if obj.last_modified else None
+            if modified and (project_id not in latest or modified > latest[project_id]):
+                latest[project_id] = modified
+
+        with _backup_lock:
+            for project_id, modified in latest.items():
+                if modified > _last_backup_success.get(project_id, datetime.min):
+                    _last_backup_success[project_id] = modified
+        _backup_history_seeded = True
+
+    @staticmethod
+    def refresh_business_metrics(db: Session, now: Optional[datetime] = None):
+        """Recompute all business gauges with a handful of grouped queries."""
+        now = now or datetime.utcnow()
+
+        project_rows = db.query(
+            Project.status, Project.plan, Project.cluster_id, func.count(Project.id)
+        ).group_by(Project.status, Project.plan, Project.cluster_id).all()
+
+        projects = {}
+        for status, plan, cluster_id, count in project_rows:
+            key = (_label(status), _label(plan), _label(cluster_id))
+            projects[key] = projects.get(key, 0) + count
+        _publish(metrics.supalove_projects, projects)
+        metrics.supalove_projects_total.set(sum(projects.values()))
+
+        metrics.supalove_users_total.set(db.query(func.count(User.id)).scalar() or 0)
+        metrics.supalove_orgs_total.set(db.query(func.count(Organization.id)).scalar() or 0)
+
+        cluster_rows = db.query(Cluster.status, func.count(Cluster.id)).group_by(Cluster.status).all()
+        _publish(metrics.supalove_clusters, {(_label(status),): count for status, count in cluster_rows})
+
+        # Container states come from the in-memory registry, no Docker call
+        if container_registry.ready:
+            project_ids = {row[0] for row in db.query(Project.id).all()}
+            containers = {}
+            for container in container_registry.all():
+                if container["compose_project"] in project_ids:
+                    kind = "project"
+                elif container["compose_service"] and container["compose_service"].startswith("shared-"):
+                    kind = "shared"
+                else:
+                    kind = "other"
+                key = (kind, _label(container["state"]), _label(container["health"]))
+                containers[key] = containers.get(key, 0) + 1
+            _publish(metrics.supalove_containers, containers)
+
+        # Backup freshness across projects that should be backed up
+        running_ids = [
+            row[0] for row in db.query(Project.id).filter(Project.status == ProjectStatus.RUNNING).all()
+        ]
+        with _backup_lock:
+            known = [_last_backup_success[pid] for pid in running_ids if pid in _last_backup_success]
+        metrics.supalove_backup_missing_projects.set(len(running_ids) - len(known))
+        oldest_age = (now - min(known)).total_seconds() if known else 0
+        metrics.supalove_backup_oldest_age_seconds.set(max(oldest_age, 0))
+
+        metrics.supalove_business_metrics_refreshed_timestamp_seconds.set(time.time())
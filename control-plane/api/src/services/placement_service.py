@@ -0,0 +1,216 @@
+"""
+Placement Service
+
+Chooses the shared cluster a new project's database goes to.
+
+Every running global shared cluster is a candidate. Candidates over a capacity
+cap (databases, connection ratio, bytes, projects of the same org) are
+excluded; the rest are scored as a weighted sum of their load ratios and the
+lowest score wins. The org term spreads one org's projects across clusters
+(soft anti-affinity).
+
+cluster_usage.cpu_percent is still an estimate, not a reading, so CPU neither
+caps nor weighs placement by default (PLACEMENT_MAX_CPU_PERCENT and the cpu
+weight can turn it on once it is measured).
+
+Cluster load is read from cluster_usage (refreshed by the scheduler) and project
+counts from the projects table, once per PLACEMENT_CACHE_SECONDS into an
+in-process snapshot. Placements made since the last refresh are added to the
+snapshot so a burst of creations does not pile onto one cluster.
+Every decision, with its candidate scores, is stored in placement_decisions.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.cluster import Cluster, ClusterType, ClusterStatus
+from models.cluster_usage import ClusterUsage
+from models.placement_decision import PlacementDecision
+from models.project import Project, ProjectStatus
+
+PLACEMENT_CACHE_SECONDS = float(os.getenv("PLACEMENT_CACHE_SECONDS", "30"))
+
+# Capacity caps; 0 disables a cap
+PLACEMENT_MAX_DATABASES = int(os.getenv("PLACEMENT_MAX_DATABASES", "500"))
+PLACEMENT_MAX_CONNECTION_RATIO = float(os.getenv("PLACEMENT_MAX_CONNECTION_RATIO", "0.9"))
+PLACEMENT_MAX_DB_BYTES = int(os.getenv("PLACEMENT_MAX_DB_BYTES", "0"))
+PLACEMENT_MAX_CPU_PERCENT = float(os.getenv("PLACEMENT_MAX_CPU_PERCENT", "0"))
+PLACEMENT_MAX_ORG_PROJECTS_PER_CLUSTER = int(os.getenv("PLACEMENT_MAX_ORG_PROJECTS_PER_CLUSTER", "0"))
+
+DEFAULT_WEIGHTS = {
+    "databases": 1.0,
+    "connections": 1.0,
+    "bytes": 0.5,
+    "cpu": 0.0,
+    "org": 2.0,
+}
+
+
+def _parse_weights(raw: str) -> Dict[str, float]:
+    """PLACEMENT_WEIGHTS="databases=1,cpu=0.25" overrides individual defaults."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, value = item.partition("=")
+        if name.strip() not in weights:
+            raise ValueError(f"Unknown placement weight {name!r}")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+PLACEMENT_WEIGHTS = _parse_weights(os.getenv("PLACEMENT_WEIGHTS", ""))
+
+
+def score_candidates(candidates: List[dict], org_id: Optional[str],
+                     weights: Dict[str, float] = PLACEMENT_WEIGHTS) -> List[dict]:
+    """
+    Score candidate clusters for a project of `org_id`, best first. Each
+    candidate is a dict with cluster_id, db_count, active_connections,
+    max_connections, db_bytes, cpu_percent, max_databases and org_counts
+    ({org_id: projects}); returns copies with `score`/`components`, or
+    `excluded` naming the cap that ruled it out.
+    """
+    org_total = sum(c["org_counts"].get(org_id, 0) for c in candidates) if org_id else 0
+    largest_bytes = max([c["db_bytes"] for c in candidates] + [1])
+
+    scored = []
+    for candidate in candidates:
+        entry = {k: v for k, v in candidate.items() if k != "org_counts"}
+        org_projects = candidate["org_counts"].get(org_id, 0) if org_id else 0
+        entry["org_projects"] = org_projects
+
+        max_databases = candidate.get("max_databases") or PLACEMENT_MAX_DATABASES
+        max_connections = candidate.get("max_connections") or 0
+        connection_ratio = candidate["active_connections"] / max_connections if max_connections else 0.0
+
+        if max_databases and candidate["db_count"] >= max_databases:
+            entry["excluded"] = "databases"
+        elif PLACEMENT_MAX_CONNECTION_RATIO and connection_ratio >= PLACEMENT_MAX_CONNECTION_RATIO:
+            entry["excluded"] = "connections"
+        elif PLACEMENT_MAX_DB_BYTES and candidate["db_bytes"] >= PLACEMENT_MAX_DB_BYTES:
+            entry["excluded"] = "bytes"
+        elif PLACEMENT_MAX_CPU_PERCENT and candidate["cpu_percent"] >= PLACEMENT_MAX_CPU_PERCENT:
+            entry["excluded"] = "cpu"
+        elif PLACEMENT_MAX_ORG_PROJECTS_PER_CLUSTER and org_projects >= PLACEMENT_MAX_ORG_PROJECTS_PER_CLUSTER:
+            entry["excluded"] = "org"
+        else:
+            components = {
+                "databases": candidate["db_count"] / max_databases if max_databases else 0.0,
+                "connections": connection_ratio,
+                # Without a byte cap, size is judged relative to the largest candidate
+                "bytes": candidate["db_bytes"] / (PLACEMENT_MAX_DB_BYTES or largest_bytes),
+                "cpu": candidate["cpu_percent"] / 100.0,
+                "org": org_projects / org_total if org_total else 0.0,
+            }
+            entry["components"] = {k: round(v, 4) for k, v in components.items()}
+            entry["score"] = round(sum(weights[k] * v for k, v in components.items()), 4)
+        scored.append(entry)
+
+    return sorted(scored, key=lambda e: ("excluded" in e, e.get("score", 0.0), e["cluster_id"]))
+
+
+class _Snapshot:
+    """Candidate clusters and their load, shared by all requests in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded_at = 0.0
+        self.candidates: Dict[str, dict] = {}
+
+    def refresh(self, db: Session):
+        clusters = db.query(Cluster, ClusterUsage).outerjoin(
+            ClusterUsage, ClusterUsage.cluster_id == Cluster.id
+        ).filter(
+            Cluster.type == ClusterType.global_shared,
+            Cluster.status == ClusterStatus.running
+        ).order_by(Cluster.created_at).all()
+
+        candidates = {}
+        for cluster, usage in clusters:
+            candidates[cluster.id] = {
+                "cluster_id": cluster.id,
+                "db_count": 0,
+                "active_connections": (usage.active_connections or 0) if usage else 0,
+                "max_connections": usage.max_connections if usage else None,
+                "db_bytes": (usage.db_bytes or 0) if usage else 0,
+                "cpu_percent": (usage.cpu_percent or 0.0) if usage else 0.0,
+                "max_databases": cluster.max_databases,
+                "org_counts": {},
+            }
+
+        # Live project counts (usage.db_count only covers running projects and lags a minute)
+        default_cluster = next(iter(candidates), None)
+        rows = db.query(Project.cluster_id, Project.org_id, func.count(Project.id)).filter(
+            Project.status.notin_([ProjectStatus.DELETING, ProjectStatus.DELETED])
+        ).group_by(Project.cluster_id, Project.org_id).all()
+        for cluster_id, org_id, count in rows:
+            # Legacy projects without a cluster live in the original global cluster
+            candidate = candidates.get(cluster_id or default_cluster)
+            if candidate is None:
+                continue
+            candidate["db_count"] += count
+            candidate["org_counts"][org_id] = candidate["org_counts"].get(org_id, 0) + count
+
+        self.candidates = candidates
+        self.loaded_at = time.monotonic()
+
+
+_snapshot = _Snapshot()
+
+
+class PlacementService:
+    @staticmethod
+    def invalidate():
+        """Force the next placement to reload cluster load (e.g. after usage refresh)."""
+        _snapshot.loaded_at = 0.0
+
+    @staticmethod
+    def record(db: Session, project_id: Optional[str], org_id: Optional[str],
+               cluster_id: Optional[str], strategy: str, candidates: List[dict] = None):
+        db.add(PlacementDecision(
+            project_id=project_id,
+            org_id=org_id,
+            cluster_id=cluster_id,
+            strategy=strategy,
+            candidates=candidates or [],
+            weights=PLACEMENT_WEIGHTS if strategy == "scored" else {},
+        ))
+        db.commit()
+
+    @staticmethod
+    def place(db: Session, org_id: Optional[str], project_id: Optional[str] = None) -> Cluster:
+        """Pick the least loaded eligible global shared cluster for a new project."""
+        with _snapshot.lock:
+            if time.monotonic() - _snapshot.loaded_at > PLACEMENT_CACHE_SECONDS:
+                _snapshot.refresh(db)
+
+            if not _snapshot.candidates:
+                # Fresh install: nothing to score yet
+                from services.cluster_service import ClusterService
+                cluster = ClusterService.get_or_create_global_cluster(db)
+                PlacementService.invalidate()
+                PlacementService.record(db, project_id, org_id, cluster.id, "scored")
+                return cluster
+
+            ranked = score_candidates(list(_snapshot.candidates.values()), org_id)
+            best = ranked[0]
+            if "excluded" in best:
+                PlacementService.record(db, project_id, org_id, None, "scored", ranked)
+                raise HTTPException(status_code=503, detail="No shared cluster has capacity for a new project")
+
+            # Count this placement until the next refresh
+            chosen = _snapshot.candidates[best["cluster_id"]]
+            chosen["db_count"] += 1
+            chosen["org_counts"][org_id] = chosen["org_counts"].get(org_id, 0) + 1
+
+        cluster = db.query(Cluster).filter(Cluster.id == best["cluster_id"]).first()
+        if not cluster:
+            PlacementService.invalidate()
+            raise HTTPException(status_code=503, detail="Selected cluster no longer exists, please retry")
+        PlacementService.record(db, project_id, org_id, cluster.id, "scored", ranked)
+        print(f"[Placement] Project {project_id} -> cluster {cluster.id} (score {best['score']})")
+        return cluster
@@ -0,0 +1,96 @@
+"""
+Port Allocator
+
+Hands out host ports for dedicated project stacks and private cluster stacks
+from the port_reservations table. Each owner type draws from its own range
+(PORT_RANGE_PROJECT, PORT_RANGE_CLUSTER, "low-high" inclusive).
+
+An owner's ports are reserved in one batch inside a savepoint. The unique
+constraint on port means two concurrent allocations can't both get a port:
+the loser's batch is rolled back and retried against the updated table.
+Allocation is idempotent per owner and name, so a retried provisioning gets
+the same ports back. Ports return to the pool when their owner is released.
+"""
+import os
+from typing import Dict, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.port_reservation import PortReservation
+
+PORT_ALLOCATION_ATTEMPTS = int(os.getenv("PORT_ALLOCATION_ATTEMPTS", "5"))
+
+
+def _parse_range(raw: str) -> Tuple[int, int]:
+    low, _, high = raw.partition("-")
+    low, high = int(low), int(high)
+    if not 0 < low <= high < 65536:
+        raise ValueError(f"Invalid port range {raw!r}")
+    return low, high
+
+
+PORT_RANGES = {
+    "project": _parse_range(os.getenv("PORT_RANGE_PROJECT", "5500-6399")),
+    "cluster": _parse_range(os.getenv("PORT_RANGE_CLUSTER", "6400-6999")),
+}
+
+
+class PortAllocator:
+    @staticmethod
+    def get_ports(db: Session, owner_type: str, owner_id: str) -> Dict[str, int]:
+        rows = db.query(PortReservation).filter(
+            PortReservation.owner_type == owner_type,
+            PortReservation.owner_id == owner_id
+        ).all()
+        return {r.name: r.port for r in rows}
+
+    @staticmethod
+    def allocate(db: Session, owner_type: str, owner_id: str, names: List[str]) -> Dict[str, int]:
+        """Reserve one port per name for the owner and commit. Returns {name: port}."""
+        if owner_type not in PORT_RANGES:
+            raise ValueError(f"Unknown port owner type {owner_type!r}")
+        low, high = PORT_RANGES[owner_type]
+
+        for _ in range(PORT_ALLOCATION_ATTEMPTS):
+            reserved = PortAllocator.get_ports(db, owner_type, owner_id)
+            missing = [name for name in names if name not in reserved]
+            if not missing:
+                return {name: reserved[name] for name in names}
+
+            taken = {port for (port,) in db.query(PortReservation.port).filter(
+                PortReservation.port.between(low, high)
+            ).all()}
+            free = []
+            for port in range(low, high + 1):
+                if port not in taken:
+                    free.append(port)
+                    if len(free) == len(missing):
+                        break
+            if len(free) < len(missing):
+                raise RuntimeError(f"No free {owner_type} ports left in range {low}-{high}")
+
+            try:
+                with db.begin_nested():
+                    for name, port in zip(missing, free):
+                        db.add(PortReservation(port=port, owner_type=owner_type, owner_id=owner_id, name=name))
+                db.commit()
+            except IntegrityError:
+                # Another allocation claimed one of these ports first
+                continue
+            reserved.update(zip(missing, free))
+            return {name: reserved[name] for name in names}
+
+        raise RuntimeError(f"Could not reserve ports for {owner_type} {owner_id} after {PORT_ALLOCATION_ATTEMPTS} attempts")
+
+    @staticmethod
+    def release(db: Session, owner_type: str, owner_id: str) -> int:
+        """Return all of an owner's ports to the pool. Returns how many were released."""
+        released = db.query(PortReservation).filter(
+            PortReservation.owner_type == owner_type,
+            PortReservation.owner_id == owner_id
+        ).delete(synchronize_session=False)
+        db.commit()
+        if released:
+            print(f"[Ports] Released {released} port(s) of {owner_type} {owner_id}")
+        return released
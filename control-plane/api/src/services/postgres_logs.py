@@ -0,0 +1,103 @@
+"""
+Postgres Logs
+
+Parses the shared Postgres' stderr log, written with
+
+    log_line_prefix = '%m [%p] db=%d,user=%u,app=%a '
+
+(see data-plane/shared/docker-compose.yml). Every record starts with that
+prefix, so its database, and with it its project, is known without searching
+the message. A record can span several lines: multi-line statements continue on
+tab-indented lines, and an ERROR is followed by its DETAIL/HINT/STATEMENT/...
+lines from the same backend. The assembler puts those back together.
+
+Statements slower than log_min_duration_statement are logged as
+`duration: 1234.567 ms  statement: ...` and turned into slow-query rows.
+"""
+import re
+from datetime import datetime
+from typing import List, Optional
+
+PG_LOG_LINE = re.compile(
+    r"^(?P<logged_at>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)? \S+) \[(?P<pid>\d+)\] "
+    r"db=(?P<database>[^,]*),user=(?P<user>[^,]*),app=(?P<application>.*?) "
+    r"(?P<severity>DEBUG[1-5]|LOG|INFO|NOTICE|WARNING|ERROR|FATAL|PANIC|"
+    r"DETAIL|HINT|QUERY|CONTEXT|STATEMENT|LOCATION):  (?P<message>.*)$"
+)
+# Lines that belong to the record logged just before by the same backend
+_SECONDARY = {"DETAIL", "HINT", "QUERY", "CONTEXT", "STATEMENT", "LOCATION"}
+_DURATION = re.compile(r"^duration: (?P<ms>\d+(?:\.\d+)?) ms  (?:statement|execute [^:]*): (?P<statement>.*)$", re.DOTALL)
+_PROJECT_DATABASE = re.compile(r"^project_([0-9a-f]{12})$")
+
+
+def project_of_database(database: Optional[str]) -> Optional[str]:
+    match = _PROJECT_DATABASE.match(database or "")
+    return match.group(1) if match else None
+
+
+class PostgresLogAssembler:
+    """
+    Groups the lines of one Postgres container back into records. A record is
+    complete once the next one starts, or when the follower calls flush()
+    because no line arrived for a moment.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._pending: Optional[dict] = None
+
+    def feed(self, timestamp: float, line: str) -> List[dict]:
+        """Add one line; returns the records it completed."""
+        match = PG_LOG_LINE.match(line)
+        pending = self._pending
+        if match and match.group("severity") in _SECONDARY and pending and pending["pid"] == match.group("pid"):
+            self._extend(pending, "text", line)
+            return []
+        if match:
+            completed = self.flush()
+            self._pending = {
+                "timestamp": timestamp,
+                "pid": match.group("pid"),
+                "database": match.group("database") or None,
+                "user": match.group("user") or None,
+                "application": match.group("application") or None,
+                "severity": match.group("severity"),
+                "message": match.group("message"),
+                "text": line,
+            }
+            return completed
+        if pending:
+            # Continuation of a multi-line message (Postgres indents them with a tab)
+            self._extend(pending, "message", line[1:] if line.startswith("\t") else line)
+            self._extend(pending, "text", line)
+            return []
+        # Not written with the prefix (entrypoint scripts, startup before the config applies)
+        return [{"timestamp": timestamp, "pid": None, "database": None, "user": None,
+                 "application": None, "severity": None, "message": line, "text": line}]
+
+    def flush(self) -> List[dict]:
+        pending, self._pending = self._pending, None
+        return [pending] if pending else []
+
+    def _extend(self, record: dict, field: str, line: str):
+        if len(record[field]) < self.max_chars:
+            record[field] = f"{record[field]}\n{line}"[:self.max_chars]
+
+
+def slow_query(record: dict, project_id: str) -> Optional[dict]:
+    """The slow-query row of a `duration: ... statement: ...` record, or None."""
+    if record["severity"] != "LOG":
+        return None
+    match = _DURATION.match(record["message"])
+    if not match:
+        return None
+    return {
+        "project_id": project_id,
+        "occurred_at": datetime.utcfromtimestamp(record["timestamp"]),
+        "duration_ms": float(match.group("ms")),
+        "pid": int(record["pid"]),
+        "database": record["database"],
+        "user_name": record["user"],
+        "application": record["application"],
+        "statement": match.group("statement"),
+    }
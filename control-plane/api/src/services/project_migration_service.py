@@ -0,0 +1,242 @@
+"""
+Project Migration Service
+
+Versioned schema migrations for shared project databases.
+
+Migration files live in src/project_migrations as NNNN_description.sql and are
+applied in version order. Each project database records what it has applied in
+supalove.migrations (version, name, checksum), so:
+- only pending migrations run, each in its own transaction with its record
+- an interrupted run resumes at the first unapplied version
+- editing an applied migration is detected via its checksum and refused
+
+The supalove schema isn't granted to the API roles nor served by PostgREST, so
+clients can't read or rewrite the records. Databases that still keep them in
+public.supalove_migrations (where the baseline's default privileges exposed
+them) have the table moved on their next run.
+
+Cluster-wide runs fan out over all project (and warm pool) databases in the
+cluster with a bounded thread pool.
+"""
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+PROJECT_MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "project_migrations"
+PROJECT_MIGRATION_CONCURRENCY = int(os.getenv("PROJECT_MIGRATION_CONCURRENCY", "8"))
+
+_FILENAME_RE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+
+MIGRATIONS_TABLE = "supalove.migrations"
+LEGACY_MIGRATIONS_TABLE = "public.supalove_migrations"
+
+MIGRATIONS_TABLE_SQL = """
+CREATE SCHEMA IF NOT EXISTS supalove;
+REVOKE ALL ON SCHEMA supalove FROM PUBLIC;
+DO $$ BEGIN
+    IF to_regclass('public.supalove_migrations') IS NOT NULL AND to_regclass('supalove.migrations') IS NULL THEN
+        ALTER TABLE public.supalove_migrations SET SCHEMA supalove;
+        ALTER TABLE supalove.supalove_migrations RENAME TO migrations;
+    END IF;
+END $$;
+CREATE TABLE IF NOT EXISTS supalove.migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    execution_ms INTEGER
+);
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _new_result(db_name: str) -> dict:
+    return {"db_name": db_name, "applied": [], "pending": [], "error": None, "duration_ms": 0}
+
+
+_migrations_cache: Optional[List[dict]] = None
+
+
+def load_migrations(directory: Path = PROJECT_MIGRATIONS_DIR) -> List[dict]:
+    """Read and validate migration files, ordered by version."""
+    global _migrations_cache
+    if directory == PROJECT_MIGRATIONS_DIR and _migrations_cache is not None:
+        return _migrations_cache
+
+    migrations = []
+    seen = set()
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME_RE.match(path.name)
+        if not match:
+            raise MigrationError(f"Invalid migration filename: {path.name} (expected NNNN_name.sql)")
+        version = int(match.group(1))
+        if version in seen:
+            raise MigrationError(f"Duplicate migration version {version}")
+        seen.add(version)
+        body = path.read_text()
+        migrations.append({
+            "version": version,
+            "name": match.group(2),
+            "sql": body,
+            "checksum": hashlib.sha256(body.encode()).hexdigest(),
+        })
+
+    migrations.sort(key=lambda m: m["version"])
+    if directory == PROJECT_MIGRATIONS_DIR:
+        _migrations_cache = migrations
+    return migrations
+
+
+def latest_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1]["version"] if migrations else 0
+
+
+def _migrations_table(cursor) -> Optional[str]:
+    """Where the database keeps its records, if it has any yet."""
+    for table in (MIGRATIONS_TABLE, LEGACY_MIGRATIONS_TABLE):
+        cursor.execute("SELECT to_regclass(%s)", [table])
+        if cursor.fetchone()[0] is not None:
+            return table
+    return None
+
+
+def _applied_checksums(cursor) -> Dict[int, str]:
+    table = _migrations_table(cursor)
+    if table is None:
+        return {}
+    cursor.execute(f"SELECT version, checksum FROM {table}")
+    return dict(cursor.fetchall())
+
+
+def _pending(migrations: List[dict], applied: Dict[int, str]) -> List[dict]:
+    for migration in migrations:
+        version = migration["version"]
+        if version in applied and applied[version] != migration["checksum"]:
+            raise MigrationError(
+                f"Checksum mismatch for applied migration {version}_{migration['name']}; "
+                "add a new migration instead of editing an applied one"
+            )
+    return [m for m in migrations if m["version"] not in applied]
+
+
+def migrate_connection(conn, db_name: str, dry_run: bool = False,
+                       migrations: Optional[List[dict]] = None) -> dict:
+    """Apply pending migrations over an open psycopg2 connection to one database."""
+    migrations = migrations if migrations is not None else load_migrations()
+    result = _new_result(db_name)
+    start = time.perf_counter()
+
+    cursor = conn.cursor()
+    try:
+        pending = _pending(migrations, _applied_checksums(cursor))
+        legacy = _migrations_table(cursor) == LEGACY_MIGRATIONS_TABLE
+        conn.rollback()
+        result["pending"] = [m["version"] for m in pending]
+        if dry_run or not (pending or legacy):
+            return result
+
+        # One runner per database at a time; released when the session ends
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext('supalove_migrations'))")
+        if not cursor.fetchone()[0]:
+            raise MigrationError("another migration run holds the lock")
+        try:
+            cursor.execute(MIGRATIONS_TABLE_SQL)
+            conn.commit()
+            # Re-read under the lock in case a concurrent run finished first
+            pending = _pending(migrations, _applied_checksums(cursor))
+            for migration in pending:
+                step_start = time.perf_counter()
+                cursor.execute(migration["sql"])
+                cursor.execute(
+                    f"INSERT INTO {MIGRATIONS_TABLE} (version, name, checksum, execution_ms) VALUES (%s, %s, %s, %s)",
+                    [migration["version"], migration["name"], migration["checksum"],
+                     int((time.perf_counter() - step_start) * 1000)]
+                )
+                conn.commit()
+                result["applied"].append(migration["version"])
+        finally:
+            conn.rollback()
+            cursor.execute("SELECT pg_advisory_unlock(hashtext('supalove_migrations'))")
+            conn.commit()
+        result["pending"] = [v for v in result["pending"] if v not in result["applied"]]
+    except Exception as e:
+        conn.rollback()
+        result["error"] = str(e)
+    finally:
+        cursor.close()
+        result["duration_ms"] = int((time.perf_counter() - start) * 1000)
+    return result
+
+
+def migrate_database(host: str, port: int, db_name: str, dry_run: bool = False) -> dict:
+    """Open an admin connection to `db_name` and bring it to the latest version."""
+    from services.shared_provisioning_service import get_custom_connection
+
+    try:
+        conn = get_custom_connection(host, port, dbname=db_name)
+    except Exception as e:
+        result = _new_result(db_name)
+        result["error"] = f"connect failed: {e}"
+        return result
+    try:
+        return migrate_connection(conn, db_name, dry_run=dry_run)
+    finally:
+        conn.close()
+
+
+def cluster_database_names(db, cluster) -> List[str]:
+    """Project and ready warm-pool databases living in `cluster`."""
+    from models.cluster import ClusterType
+    from models.project import Project, ProjectPlan, ProjectStatus
+    from models.warm_pool_database import WarmPoolDatabase, WarmPoolStatus
+
+    in_cluster = Project.cluster_id == cluster.id
+    if cluster.type == ClusterType.global_shared:
+        # Legacy projects created before clusters existed live in the global cluster
+        in_cluster = in_cluster | Project.cluster_id.is_(None)
+
+    names = [
+        row[0] for row in db.query(Project.db_name).filter(
+            in_cluster,
+            Project.plan == ProjectPlan.shared,
+            Project.db_name.isnot(None),
+            Project.status.notin_([ProjectStatus.DELETING, ProjectStatus.DELETED]),
+        ).all()
+    ]
+    names += [
+        row[0] for row in db.query(WarmPoolDatabase.db_name).filter(
+            WarmPoolDatabase.cluster_id == cluster.id,
+            WarmPoolDatabase.status == WarmPoolStatus.ready
+        ).all()
+    ]
+    return sorted(set(names))
+
+
+def migrate_cluster(
+    host: str,
+    port: int,
+    db_names: List[str],
+    concurrency: int = PROJECT_MIGRATION_CONCURRENCY,
+    dry_run: bool = False,
+    on_progress: Optional[Callable[[int, int, dict], None]] = None,
+) -> List[dict]:
+    """Migrate many databases on one cluster in parallel; failures don't stop the run."""
+    load_migrations()  # Fail fast on bad files before opening connections
+    results = []
+    total = len(db_names)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="migrate") as pool:
+        futures = [pool.submit(migrate_database, host, port, name, dry_run) for name in db_names]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            if on_progress:
+                on_progress(done, total, result)
+    return results
@@ -3,7 +3,11 @@ from sqlalchemy.orm import Session
 
 from core.database import SessionLocal  # Keeping it if referenced elsewhere or remove if totally unused
 from models.project import Project, ProjectStatus, ProjectPlan, BackendType
-from services.secrets_service import generate_project_secrets
+from services.secrets_service import generate_project_secrets, get_project_secrets
+from services.port_allocator import PortAllocator
+from services.slow_query_service import SlowQueryService
+from services.query_insights_service import QueryInsightsService
+from services.index_advisor_service import IndexAdvisorService
 from services.auth_service import AuthService
 from services.storage_service import StorageService
 from services.provisioning_service import (
@@ -14,7 +18,13 @@ from services.provisioning_service import (
     restore_project as provision_restore,
 )
 from services.shared_provisioning_service import provision_shared_project
+from services.provisioning_job_service import ProvisioningJobService, JobDeferred
+from models.provisioning_job import ProvisioningJobKind
+import logging
 
+logger = logging.getLogger(__name__)
+
+DELETED_STATUSES = (ProjectStatus.DELETING, ProjectStatus.DELETED)
 
 
 def get_projects(db: Session, org_id: str = None):
@@ -46,7 +56,6 @@ def create_project(db: Session, custom_domain: str = None, name: str = None, org
 
     # 2️⃣ Resolve Cluster
     from services.cluster_service import ClusterService
-    from models.cluster import ClusterStatus
     
     # Determine explicit placement if provided
     placement = None
@@ -55,9 +64,9 @@ def create_project(db: Session, custom_domain: str = None, name: str = None, org
     elif plan == "shared":
         placement = "shared"
         
-    cluster = ClusterService.resolve_cluster_for_project(db, org_id)
-    
     project_id = uuid.uuid4().hex[:12]
+
+    cluster = ClusterService.resolve_cluster_for_project(db, org_id, project_id)
     
     # Determine plan and backend type based on cluster
     # Note: 'dedicated' in ProjectPlan is now essentially 'running in private cluster' or 'dedicated-single'
@@ -92,70 +101,18 @@ def create_project(db: Session, custom_domain: str = None, name: str = None, org
         db.commit()
 
         # 4️⃣ Generate secrets
-        secrets = generate_project_secrets(db, project_id, plan="shared")
-        if custom_domain:
-            secrets["CUSTOM_DOMAIN"] = custom_domain
+        generate_project_secrets(db, project_id, plan="shared")
         db.commit()
 
-        # 5️⃣ Provisioning Logic
-        # If cluster is creating, we MUST wait (Async)
-        if cluster.status == ClusterStatus.creating:
-            # Leave as CREATING. Scheduler will pick up Cluster provisioning.
-            # We also need a way for Project to transition to RUNNING once Cluster is ready.
-            # For now, let's assume Scheduler also checks "Creating" projects in "Running" clusters?
-            # Or simpler: The API returns creating, FE polls. 
-            pass
-        
-        elif cluster.status == ClusterStatus.running:
-            # Cluster ready, provision immediately
-            project.status = ProjectStatus.PROVISIONING
-            db.commit()
-            
-            # Provision project DB in the resolved cluster
-            provision_output = provision_shared_project(db, project, cluster, secrets)
-            
-            project.status = ProjectStatus.RUNNING
-            EntitlementService.increment_project_count(db, org_id)
-            db.commit()
-            
-            # 6️⃣ Create admin user for the project
-            try:
-                from services.project_user_service import ProjectUserService
-                import logging
-                
-                logger = logging.getLogger(__name__)
-                logger.info(f"Creating admin user for project {project_id}")
-                
-                user_service = ProjectUserService()
-                admin_result = user_service.create_admin_for_new_project(
-                    db=db,
-                    project_id=project_id,
-                    org_id=org_id
-                )
-                
-                logger.info(
-                    f"Successfully created admin user {admin_result['email']} "
-                    f"for project {project_id}"
-                )
-                
-            except Exception as e:
-                # Log error but don't fail project creation
-                # User can create admin manually later via UI
-                logger = logging.getLogger(__name__)
-                logger.error(
-                    f"Failed to create admin user for project {project_id}: {e}",
-                    exc_info=True
-                )
-            
-            db.refresh(project)
-            
-            return {
-                "id": project_id,
-                "status": project.status,
-                "plan": project.plan.value,
-                "api_url": provision_output.get("api_url"),
-                "db_url": provision_output.get("db_url"),
-            }
+        # 5️⃣ Queue provisioning
+        # DB creation, migrations and the admin user run in a provisioning worker.
+        # If the cluster is still being created the job waits for it.
+        job = ProvisioningJobService.enqueue(
+            db,
+            project_id,
+            ProvisioningJobKind.provision_shared,
+            payload={"custom_domain": custom_domain} if custom_domain else {}
+        )
 
         return {
             "id": project_id,
@@ -163,6 +120,7 @@ def create_project(db: Session, custom_domain: str = None, name: str = None, org
             "plan": project.plan.value,
             "api_url": None, # Not ready
             "db_url": None,
+            "job_id": job.id,
         }
         
     except Exception as e:
@@ -176,6 +134,113 @@ def create_project(db: Session, custom_domain: str = None, name: str = None, org
         raise e
 
 
+def run_shared_provisioning(db: Session, project_id: str, payload: dict) -> dict:
+    """
+    Provisioning job handler: creates the project DB in its cluster, applies the
+    schema and creates the admin user. Safe to re-run on retry.
+    """
+    from services.entitlement_service import EntitlementService
+    from models.cluster import Cluster, ClusterStatus
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise ValueError(f"Project {project_id} not found")
+    if project.status == ProjectStatus.RUNNING:
+        return {"status": "already_running"}
+    if project.status in DELETED_STATUSES:
+        return {"status": "deleted"}
+
+    cluster = db.query(Cluster).filter(Cluster.id == project.cluster_id).first()
+    if not cluster:
+        raise ValueError(f"Cluster {project.cluster_id} not found")
+    if cluster.status == ClusterStatus.creating:
+        raise JobDeferred(f"Cluster {cluster.id} is still being created")
+    if cluster.status != ClusterStatus.running:
+        raise RuntimeError(f"Cluster {cluster.id} is {cluster.status.value}")
+
+    project.status = ProjectStatus.PROVISIONING
+    db.commit()
+
+    secrets = get_project_secrets(db, project_id)
+
+    # Provision project DB in the resolved cluster
+    provision_output = provision_shared_project(db, project, cluster, secrets)
+
+    # Deleted while the database was being created: drop it again instead of reviving the project
+    db.refresh(project)
+    if project.status in DELETED_STATUSES:
+        from services.shared_provisioning_service import delete_shared_project
+        delete_shared_project(project)
+        return {"status": "deleted"}
+
+    project.status = ProjectStatus.RUNNING
+    project.last_error = None
+    EntitlementService.increment_project_count(db, project.org_id)
+    db.commit()
+
+    # 6️⃣ Create admin user for the project
+    try:
+        from services.project_user_service import ProjectUserService
+
+        logger.info(f"Creating admin user for project {project_id}")
+
+        user_service = ProjectUserService()
+        admin_result = user_service.create_admin_for_new_project(
+            db=db,
+            project_id=project_id,
+            org_id=project.org_id
+        )
+
+        logger.info(
+            f"Successfully created admin user {admin_result['email']} "
+            f"for project {project_id}"
+        )
+
+    except Exception as e:
+        # Log error but don't fail project creation
+        # User can create admin manually later via UI
+        logger.error(
+            f"Failed to create admin user for project {project_id}: {e}",
+            exc_info=True
+        )
+
+    return {
+        "api_url": provision_output.get("api_url"),
+        "db_url": provision_output.get("db_url"),
+    }
+
+def migrate_project_cluster(db: Session, project_id: str, target_cluster_id: str):
+    """
+    Queue a move of a shared project's database to another cluster.
+    Raises ValueError if the move isn't possible.
+    """
+    from services.cluster_migration_service import validate_target, MIGRATION_MAX_ATTEMPTS
+
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        return None
+    if ProvisioningJobService.active_job(db, project_id, ProvisioningJobKind.migrate_cluster):
+        raise ValueError("A migration is already in progress for this project")
+
+    target = validate_target(db, project, target_cluster_id)
+    source_cluster_id = project.cluster_id
+    if source_cluster_id is None:
+        from services.cluster_service import ClusterService
+        source_cluster_id = ClusterService.get_or_create_global_cluster(db).id
+
+    job = ProvisioningJobService.enqueue(
+        db,
+        project_id,
+        ProvisioningJobKind.migrate_cluster,
+        payload={"source_cluster_id": source_cluster_id, "target_cluster_id": target.id},
+        max_attempts=MIGRATION_MAX_ATTEMPTS,
+    )
+    return {
+        "project_id": project_id,
+        "source_cluster_id": source_cluster_id,
+        "target_cluster_id": target.id,
+        "job_id": job.id,
+    }
+
 
 def stop_project(db: Session, project_id: str):
     project = db.query(Project).filter(Project.id == project_id).first()
@@ -213,6 +278,8 @@ def delete_project(db: Session, project_id: str):
         return None
 
     project.status = ProjectStatus.DELETING
+    # Queued or deferred jobs would otherwise recreate the project's database
+    ProvisioningJobService.cancel_queued(db, project_id, "Project deleted")
     db.commit()
 
     # Only destroy containers for dedicated projects
@@ -222,6 +289,12 @@ def delete_project(db: Session, project_id: str):
         # For shared projects, drop the database from the shared cluster
         from services.shared_provisioning_service import delete_shared_project
         delete_shared_project(project)
+
+    # Host ports of the project's stack go back to the pool
+    PortAllocator.release(db, "project", project_id)
+    SlowQueryService.delete_project(db, project_id)
+    QueryInsightsService.delete_project(db, project_id)
+    IndexAdvisorService.forget(project_id)
     
     project.status = ProjectStatus.DELETED
     db.commit()
@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 from models.user import User
 from models.org_member import OrgMember, OrgRole
 from models.project_secret import ProjectSecret
+from services.secrets_cache import secrets_changed
 import requests
 
 logger = logging.getLogger(__name__)
@@ -182,6 +183,7 @@ class ProjectUserService:
                 value=temp_password
             )
             db.add(admin_pass_secret)
+            secrets_changed(db, project_id)
             db.commit()
             
             logger.info(
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional
 
 class Provisioner(ABC):
     """Abstract base class for infrastructure provisioning providers."""
@@ -27,4 +27,12 @@ class Provisioner(ABC):
     @abstractmethod
     def restore(self, project_id: str) -> None:
         """Restore a deleted/archived project."""
-        pass
\ No newline at end of file
+        pass
+
+    def is_running(self, project_id: str) -> bool:
+        """Whether the project's runtime is already up. Providers that can't tell return False."""
+        return False
+
+    def apply_env(self, project_id: str, changed_keys: Iterable[str]) -> List[str]:
+        """Restart what uses changed secrets; returns the services restarted. Providers that can't do nothing."""
+        return []
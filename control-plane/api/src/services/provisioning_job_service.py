@@ -0,0 +1,262 @@
+"""
+Provisioning Job Service
+
+Durable queue for slow provisioning work (shared DB creation, schema migrations,
+admin user setup) backed by the provisioning_jobs table.
+
+Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so several workers and
+several API replicas can drain the queue without double-running a job. Failed jobs
+are retried with exponential backoff; a job whose worker died is re-claimed once
+its lease expires.
+"""
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.project import Project, ProjectStatus
+from models.provisioning_job import ProvisioningJob, ProvisioningJobKind, ProvisioningJobStatus
+
+PROVISIONING_WORKERS = int(os.getenv("PROVISIONING_WORKERS", "2"))
+PROVISIONING_POLL_SECONDS = float(os.getenv("PROVISIONING_POLL_SECONDS", "2"))
+PROVISIONING_MAX_ATTEMPTS = int(os.getenv("PROVISIONING_MAX_ATTEMPTS", "5"))
+PROVISIONING_BACKOFF_BASE_SECONDS = int(os.getenv("PROVISIONING_BACKOFF_BASE_SECONDS", "5"))
+PROVISIONING_BACKOFF_MAX_SECONDS = int(os.getenv("PROVISIONING_BACKOFF_MAX_SECONDS", "300"))
+# A running job not finished within the lease is assumed orphaned and re-claimed
+PROVISIONING_LEASE_SECONDS = int(os.getenv("PROVISIONING_LEASE_SECONDS", "900"))
+# How long to wait before re-checking a job whose cluster is still being created
+PROVISIONING_DEFER_SECONDS = int(os.getenv("PROVISIONING_DEFER_SECONDS", "10"))
+
+TERMINAL_STATUSES = (ProvisioningJobStatus.succeeded, ProvisioningJobStatus.failed)
+
+
+class JobDeferred(Exception):
+    """Raised by a handler when the job can't run yet; it is re-queued without using an attempt."""
+
+
+def _handlers():
+    # Imported lazily: project_service enqueues jobs from this module
+    from services.project_service import run_shared_provisioning
+    from services.cluster_migration_service import run_cluster_migration
+    return {
+        ProvisioningJobKind.provision_shared: run_shared_provisioning,
+        ProvisioningJobKind.migrate_cluster: run_cluster_migration,
+    }
+
+
+class ProvisioningJobService:
+    @staticmethod
+    def enqueue(db: Session, project_id: str, kind: ProvisioningJobKind, payload: Optional[dict] = None,
+                max_attempts: int = PROVISIONING_MAX_ATTEMPTS) -> ProvisioningJob:
+        job = ProvisioningJob(
+            project_id=project_id,
+            kind=kind,
+            status=ProvisioningJobStatus.queued,
+            payload=payload or {},
+            max_attempts=max_attempts,
+            run_after=datetime.utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        worker_pool.notify()
+        return job
+
+    @staticmethod
+    def active_job(db: Session, project_id: str, kind: ProvisioningJobKind) -> Optional[ProvisioningJob]:
+        """A queued or running job of `kind` for the project, if any."""
+        return db.query(ProvisioningJob).filter(
+            ProvisioningJob.project_id == project_id,
+            ProvisioningJob.kind == kind,
+            ProvisioningJob.status.notin_(TERMINAL_STATUSES)
+        ).first()
+
+    @staticmethod
+    def cancel_queued(db: Session, project_id: str, reason: str) -> int:
+        """Fail the project's queued jobs, deferred or waiting to retry included. Returns jobs cancelled."""
+        jobs = db.query(ProvisioningJob).filter(
+            ProvisioningJob.project_id == project_id,
+            ProvisioningJob.status == ProvisioningJobStatus.queued
+        ).all()
+        for job in jobs:
+            job.status = ProvisioningJobStatus.failed
+            job.last_error = reason
+            job.finished_at = datetime.utcnow()
+        return len(jobs)
+
+    @staticmethod
+    def get_job(db: Session, project_id: str, job_id: str) -> Optional[ProvisioningJob]:
+        return db.query(ProvisioningJob).filter(
+            ProvisioningJob.id == job_id,
+            ProvisioningJob.project_id == project_id
+        ).first()
+
+    @staticmethod
+    def list_jobs(db: Session, project_id: str, limit: int = 20) -> List[ProvisioningJob]:
+        return db.query(ProvisioningJob).filter(
+            ProvisioningJob.project_id == project_id
+        ).order_by(ProvisioningJob.created_at.desc()).limit(limit).all()
+
+    @staticmethod
+    def to_dict(job: ProvisioningJob) -> dict:
+        return {
+            "id": job.id,
+            "project_id": job.project_id,
+            "kind": job.kind.value,
+            "status": job.status.value,
+            "attempts": job.attempts,
+            "max_attempts": job.max_attempts,
+            "run_after": job.run_after.isoformat() if job.run_after else None,
+            "last_error": job.last_error,
+            "result": job.result,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    @staticmethod
+    def claim(db: Session, worker_id: str, now: Optional[datetime] = None) -> Optional[ProvisioningJob]:
+        """Lock and lease the next runnable job, skipping rows other workers hold."""
+        now = now or datetime.utcnow()
+        lease_expired = now - timedelta(seconds=PROVISIONING_LEASE_SECONDS)
+
+        job = db.query(ProvisioningJob).filter(
+            or_(
+                and_(
+                    ProvisioningJob.status == ProvisioningJobStatus.queued,
+                    ProvisioningJob.run_after <= now
+                ),
+                and_(
+                    ProvisioningJob.status == ProvisioningJobStatus.running,
+                    ProvisioningJob.locked_at < lease_expired
+                ),
+            )
+        ).order_by(ProvisioningJob.run_after).with_for_update(skip_locked=True).first()
+
+        if not job:
+            db.rollback()
+            return None
+
+        job.status = ProvisioningJobStatus.running
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+        db.commit()
+        return job
+
+    @staticmethod
+    def _backoff_seconds(attempts: int) -> int:
+        return min(PROVISIONING_BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), PROVISIONING_BACKOFF_MAX_SECONDS)
+
+    @staticmethod
+    def run(db: Session, job: ProvisioningJob):
+        """Execute a claimed job and record success, retry or final failure."""
+        handler = _handlers().get(job.kind)
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind {job.kind}")
+            result = handler(db, job.project_id, job.payload or {})
+        except JobDeferred as e:
+            db.rollback()
+            job.status = ProvisioningJobStatus.queued
+            job.attempts -= 1
+            job.run_after = datetime.utcnow() + timedelta(seconds=PROVISIONING_DEFER_SECONDS)
+            job.last_error = str(e)
+            job.locked_by = None
+            job.locked_at = None
+            db.commit()
+            return
+        except Exception as e:
+            db.rollback()
+            job.last_error = str(e)
+            job.locked_by = None
+            job.locked_at = None
+            project = db.query(Project).filter(Project.id == job.project_id).first()
+
+            if job.attempts >= job.max_attempts:
+                print(f"[ProvisioningJobs] Job {job.id} failed permanently after {job.attempts} attempt(s): {e}")
+                job.status = ProvisioningJobStatus.failed
+                job.finished_at = datetime.utcnow()
+                # A failed migration leaves the project where it was, still usable
+                if project and job.kind == ProvisioningJobKind.provision_shared:
+                    project.status = ProjectStatus.FAILED
+                    project.last_error = str(e)
+            else:
+                delay = ProvisioningJobService._backoff_seconds(job.attempts)
+                print(f"[ProvisioningJobs] Job {job.id} attempt {job.attempts} failed, retrying in {delay}s: {e}")
+                job.status = ProvisioningJobStatus.queued
+                job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+                if project and job.kind == ProvisioningJobKind.provision_shared:
+                    project.last_error = str(e)
+            db.commit()
+            return
+
+        job.status = ProvisioningJobStatus.succeeded
+        job.result = result
+        job.last_error = None
+        job.locked_by = None
+        job.locked_at = None
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        print(f"[ProvisioningJobs] Job {job.id} ({job.kind.value}) succeeded for project {job.project_id}")
+
+    @staticmethod
+    def process_available(worker_id: str) -> int:
+        """Drain runnable jobs one at a time, each in its own session. Returns jobs processed."""
+        processed = 0
+        while True:
+            db = SessionLocal()
+            try:
+                job = ProvisioningJobService.claim(db, worker_id)
+                if not job:
+                    return processed
+                ProvisioningJobService.run(db, job)
+                processed += 1
+            finally:
+                db.close()
+
+
+class ProvisioningWorkerPool:
+    """Background threads polling the job queue; enqueue() wakes them up early."""
+
+    def __init__(self, size: int = PROVISIONING_WORKERS, poll_seconds: float = PROVISIONING_POLL_SECONDS):
+        self.size = size
+        self.poll_seconds = poll_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _loop(self, worker_id: str):
+        while not self._stopping.is_set():
+            try:
+                ProvisioningJobService.process_available(worker_id)
+            except Exception as e:
+                print(f"[ProvisioningJobs] Worker {worker_id} error: {e}")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        host = socket.gethostname()
+        for i in range(self.size):
+            worker_id = f"{host}-{os.getpid()}-{i}"
+            thread = threading.Thread(target=self._loop, args=(worker_id,), name=f"provisioning-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[ProvisioningJobs] Started {self.size} worker(s)")
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        self._threads = []
+
+
+worker_pool = ProvisioningWorkerPool()
@@ -41,6 +41,12 @@ def stop_project(project_id: str):
 def start_project(project_id: str):
     return _provider.start(project_id)
 
+def is_project_running(project_id: str) -> bool:
+    return _provider.is_running(project_id)
+
+def apply_project_env(project_id: str, changed_keys) -> list:
+    return _provider.apply_env(project_id, changed_keys)
+
 def delete_project(project_id: str):
     return _provider.destroy(project_id)
 
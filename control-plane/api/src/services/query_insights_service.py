@@ -0,0 +1,277 @@
+"""
+Query Insights
+
+Every QUERY_INSIGHTS_INTERVAL_SECONDS the collector snapshots each running
+cluster's pg_stat_statements (enabled once per cluster, it is preloaded by the
+Postgres image) and stores, per project database and statement, what changed
+since the previous snapshot. The insights endpoint sums those deltas over a
+time range, so it never touches the tenant clusters.
+
+Counters are cumulative in Postgres, so the first snapshot after a control
+plane restart only sets the baseline. A statement whose counters went down was
+evicted and re-added, or the stats were reset; its current counters are taken
+as the delta. Statement texts are only read for statements not seen before,
+since reading them means reading the whole query text file.
+
+The baselines live in memory, so only one API process may collect: two
+collectors would each store the same calls. The one holding the
+`query_insights` advisory lock collects and keeps the lock (on a connection of
+its own) between runs; another process takes over, from a fresh baseline,
+once that connection is gone.
+"""
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from models.query_stat import QueryStat
+from services.postgres_logs import project_of_database
+
+logger = logging.getLogger(__name__)
+
+QUERY_INSIGHTS_INTERVAL_SECONDS = int(os.getenv("QUERY_INSIGHTS_INTERVAL_SECONDS", "300"))
+QUERY_INSIGHTS_RETENTION_DAYS = int(os.getenv("QUERY_INSIGHTS_RETENTION_DAYS", "7"))
+QUERY_INSIGHTS_MAX_QUERY_CHARS = 4096
+
+QUERY_INSIGHTS_RANGES = {
+    "1h": timedelta(hours=1),
+    "6h": timedelta(hours=6),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+}
+
+_STATEMENTS_SQL = r"""
+    SELECT d.datname, r.rolname, s.userid, s.queryid, s.toplevel,
+           s.calls, s.total_exec_time, s.rows, s.shared_blks_hit, s.shared_blks_read
+    FROM pg_stat_statements(false) s
+    JOIN pg_database d ON d.oid = s.dbid
+    LEFT JOIN pg_roles r ON r.oid = s.userid
+    WHERE d.datname LIKE 'project\_%' AND s.queryid IS NOT NULL
+"""
+_TEXTS_SQL = "SELECT DISTINCT ON (queryid) queryid, query FROM pg_stat_statements(true) WHERE queryid = ANY(%s)"
+
+# Counters in a snapshot: (calls, total_time_ms, rows, shared_blks_hit, shared_blks_read)
+Counters = Tuple[int, float, int, int, int]
+# Key of a statement: (database, user OID, queryid, toplevel)
+StatementKey = Tuple[str, int, int, bool]
+
+# cluster_id -> {"stats_reset": ..., "counters": {StatementKey: Counters}, "users": {...}}
+_baselines: Dict[str, dict] = {}
+# queryid -> statement text, for the statements in the latest snapshots
+_texts: Dict[int, str] = {}
+_extension_ready = set()
+# Connection holding the collector lock while this process is the collector
+_collector_conn = None
+
+
+def compute_deltas(previous: Dict[StatementKey, Counters],
+                   current: Dict[StatementKey, Counters]) -> Dict[StatementKey, Counters]:
+    """Per statement, what ran between two snapshots; statements that didn't run are left out."""
+    deltas = {}
+    for key, counters in current.items():
+        before = previous.get(key)
+        if before is not None and counters[0] >= before[0]:
+            counters = tuple(now - then for now, then in zip(counters, before))
+        if counters[0] > 0:
+            deltas[key] = counters
+    return deltas
+
+
+class QueryInsightsService:
+
+    @staticmethod
+    def _is_collector(db: Session) -> bool:
+        """Take (or check that this process still holds) the collector lock."""
+        global _collector_conn
+        engine = db.get_bind().engine
+        if engine.dialect.name != "postgresql":
+            return True
+        if _collector_conn is not None:
+            try:
+                _collector_conn.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                # The lock went with the session; another process may be collecting now
+                logger.warning(f"Lost the query insights collector lock: {e}")
+                _collector_conn.close()
+                _collector_conn = None
+
+        conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        if not conn.execute(text("SELECT pg_try_advisory_lock(hashtext('query_insights'))")).scalar():
+            conn.close()
+            return False
+        # Baselines from an earlier turn as collector are older than what others stored since
+        _baselines.clear()
+        _collector_conn = conn
+        return True
+
+    @staticmethod
+    def _snapshot(cluster) -> Optional[dict]:
+        """Read a cluster's pg_stat_statements; None if it can't be reached or lacks the extension."""
+        from services.shared_provisioning_service import get_custom_connection
+
+        try:
+            conn = get_custom_connection(cluster.postgres_host, cluster.postgres_port)
+        except Exception as e:
+            logger.warning(f"Could not snapshot query stats of cluster {cluster.id}: {e}")
+            return None
+        try:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            if cluster.id not in _extension_ready:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+                _extension_ready.add(cluster.id)
+            cursor.execute("SELECT stats_reset FROM pg_stat_statements_info")
+            stats_reset = cursor.fetchone()[0]
+            cursor.execute(_STATEMENTS_SQL)
+            counters, users = {}, {}
+            for datname, rolname, userid, queryid, toplevel, calls, total, rows, hit, read in cursor.fetchall():
+                counters[(datname, userid, queryid, toplevel)] = (calls, float(total), rows, hit, read)
+                users[userid] = rolname
+
+            missing = list({key[2] for key in counters} - set(_texts))
+            if missing:
+                cursor.execute(_TEXTS_SQL, (missing,))
+                for queryid, query in cursor.fetchall():
+                    _texts[queryid] = (query or "")[:QUERY_INSIGHTS_MAX_QUERY_CHARS]
+            cursor.close()
+            return {"stats_reset": stats_reset, "counters": counters, "users": users}
+        except Exception as e:
+            _extension_ready.discard(cluster.id)
+            logger.warning(f"Could not snapshot query stats of cluster {cluster.id}: {e}")
+            return None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def collect(db: Session, now: Optional[datetime] = None) -> int:
+        """
+        Snapshot every running cluster and store the per-project deltas. Returns
+        rows stored; 0 in processes that aren't the collector.
+        """
+        from models.cluster import Cluster, ClusterStatus
+        from models.project import Project, ProjectStatus
+
+        if not QueryInsightsService._is_collector(db):
+            return 0
+        now = now or datetime.utcnow()
+        stored = 0
+        seen_queryids = set()
+        for cluster in db.query(Cluster).filter(Cluster.status == ClusterStatus.running).all():
+            snapshot = QueryInsightsService._snapshot(cluster)
+            if snapshot is None:
+                continue
+            seen_queryids.update(key[2] for key in snapshot["counters"])
+            baseline = _baselines.get(cluster.id)
+            _baselines[cluster.id] = snapshot
+            if baseline is None:
+                continue
+            previous = baseline["counters"] if baseline["stats_reset"] == snapshot["stats_reset"] else {}
+
+            projects = {
+                row[0] for row in db.query(Project.id).filter(
+                    Project.cluster_id == cluster.id, Project.status != ProjectStatus.DELETED
+                ).all()
+            }
+            for (datname, userid, queryid, _), (calls, total, rows, hit, read) in compute_deltas(previous, snapshot["counters"]).items():
+                project_id = project_of_database(datname)
+                if project_id not in projects:
+                    continue
+                db.add(QueryStat(
+                    project_id=project_id,
+                    cluster_id=cluster.id,
+                    bucket_at=now,
+                    queryid=queryid,
+                    user_name=snapshot["users"].get(userid),
+                    query=_texts.get(queryid, ""),
+                    calls=calls,
+                    total_time_ms=total,
+                    rows=rows,
+                    shared_blks_hit=hit,
+                    shared_blks_read=read,
+                ))
+                stored += 1
+            db.commit()
+
+        # Forget texts of statements no cluster reports any more
+        for queryid in [q for q in _texts if q not in seen_queryids]:
+            del _texts[queryid]
+        return stored
+
+    @staticmethod
+    def top_queries(db: Session, project_id: str, range_key: str = "24h", order_by: str = "total_time",
+                    limit: int = 20, now: Optional[datetime] = None) -> dict:
+        """A project's statements over a range, ranked by total time, mean time, calls or rows."""
+        if range_key not in QUERY_INSIGHTS_RANGES:
+            raise ValueError(f"Unknown range {range_key!r}, expected one of {', '.join(QUERY_INSIGHTS_RANGES)}")
+
+        calls = func.sum(QueryStat.calls)
+        total_time = func.sum(QueryStat.total_time_ms)
+        rows = func.sum(QueryStat.rows)
+        orders = {
+            "total_time": total_time,
+            "mean_time": total_time / calls,
+            "calls": calls,
+            "rows": rows,
+        }
+        if order_by not in orders:
+            raise ValueError(f"Unknown order_by {order_by!r}, expected one of {', '.join(orders)}")
+
+        now = now or datetime.utcnow()
+        since = now - QUERY_INSIGHTS_RANGES[range_key]
+        in_range = db.query(QueryStat).filter(QueryStat.project_id == project_id, QueryStat.bucket_at >= since)
+
+        total_calls, total_ms, collected_at = in_range.with_entities(
+            func.coalesce(calls, 0), func.coalesce(total_time, 0.0), func.max(QueryStat.bucket_at)
+        ).one()
+
+        ranked = in_range.with_entities(
+            QueryStat.queryid,
+            func.max(QueryStat.query),
+            calls,
+            total_time,
+            rows,
+            func.sum(QueryStat.shared_blks_hit),
+            func.sum(QueryStat.shared_blks_read),
+        ).group_by(QueryStat.queryid).order_by(orders[order_by].desc(), QueryStat.queryid).limit(limit).all()
+
+        queries = []
+        for queryid, query, q_calls, q_total, q_rows, hit, read in ranked:
+            blocks = (hit or 0) + (read or 0)
+            queries.append({
+                "queryid": str(queryid),  # 64-bit, would lose precision as a JSON number
+                "query": query,
+                "calls": int(q_calls),
+                "total_time_ms": round(q_total, 3),
+                "mean_time_ms": round(q_total / q_calls, 3),
+                "rows": int(q_rows),
+                "rows_per_call": round(q_rows / q_calls, 2),
+                "cache_hit_ratio": round(hit / blocks, 4) if blocks else None,
+                "share_of_total_time": round(q_total / total_ms, 4) if total_ms else None,
+            })
+
+        return {
+            "range": range_key,
+            "order_by": order_by,
+            "since": since.isoformat(),
+            "collected_at": collected_at.isoformat() if collected_at else None,
+            "totals": {"calls": int(total_calls), "total_time_ms": round(total_ms, 3)},
+            "queries": queries,
+        }
+
+    @staticmethod
+    def delete_project(db: Session, project_id: str) -> int:
+        """Drop a deleted project's query stats (the caller commits)."""
+        return db.query(QueryStat).filter(QueryStat.project_id == project_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def prune(db: Session, now: Optional[datetime] = None) -> int:
+        """Deletes query stats past QUERY_INSIGHTS_RETENTION_DAYS. Returns rows deleted."""
+        now = now or datetime.utcnow()
+        deleted = db.query(QueryStat).filter(
+            QueryStat.bucket_at < now - timedelta(days=QUERY_INSIGHTS_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
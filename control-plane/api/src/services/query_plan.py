@@ -0,0 +1,199 @@
+"""
+Query Plans
+
+Turns the output of EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) into the tree the
+SQL editor draws. Every node has its inclusive and exclusive time over all
+loops, actual vs estimated rows, and buffer hits and reads. The nodes that
+explain a slow query are flagged:
+
+- seq_scan_large: a sequential scan reading at least EXPLAIN_LARGE_SCAN_ROWS rows
+- bad_estimate / bad_join_estimate: actual rows off from the estimate by at
+  least EXPLAIN_ESTIMATE_FACTOR (a wrong join estimate usually picks the join)
+- spilled: a sort or hash that went to disk
+- hotspot: a node taking at least EXPLAIN_HOTSPOT_SHARE of the execution time
+"""
+import itertools
+import re
+from typing import List, Tuple
+
+EXPLAIN_LARGE_SCAN_ROWS = 10000
+EXPLAIN_ESTIMATE_FACTOR = 10.0
+EXPLAIN_ESTIMATE_MIN_ROWS = 100  # Misestimates below this many rows don't matter
+EXPLAIN_HOTSPOT_SHARE = 0.2
+EXPLAIN_TOP_NODES = 5
+
+_JOINS = {"Nested Loop", "Hash Join", "Merge Join"}
+_DOLLAR_TAG = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+
+
+def split_single_statement(sql: str) -> str:
+    """
+    The statement without a trailing semicolon. Raises ValueError if `sql` holds
+    more than one statement: a second statement (COMMIT, VACUUM, ...) could
+    escape the transaction the plan is rolled back in.
+    """
+    i, n, end = 0, len(sql), None
+    while i < n:
+        c = sql[i]
+        if sql.startswith("--", i):
+            j = sql.find("\n", i)
+            i = n if j == -1 else j + 1
+            continue
+        if sql.startswith("/*", i):
+            j = sql.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            continue
+        if end is not None:
+            if not c.isspace():
+                raise ValueError("Explain mode runs a single statement")
+            i += 1
+            continue
+        if c in ("'", '"'):
+            # E'...' strings escape with backslashes, the others by doubling the quote
+            backslashes = c == "'" and i > 0 and sql[i - 1] in "eE" and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == "_"))
+            j = i + 1
+            while j < n:
+                if backslashes and sql[j] == "\\":
+                    j += 2
+                elif sql[j] == c and sql.startswith(c * 2, j):
+                    j += 2
+                elif sql[j] == c:
+                    break
+                else:
+                    j += 1
+            i = j + 1
+            continue
+        # Inside an identifier (x$a$), $ doesn't start a dollar quote
+        if c == "$" and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] in "_$")):
+            tag = _DOLLAR_TAG.match(sql, i)
+            if tag:
+                j = sql.find(tag.group(0), tag.end())
+                i = n if j == -1 else j + len(tag.group(0))
+                continue
+        if c == ";":
+            end = i
+        i += 1
+    statement = (sql if end is None else sql[:end]).strip()
+    if not statement:
+        raise ValueError("Nothing to explain")
+    return statement
+
+
+def _buffers(node: dict) -> dict:
+    return {
+        "shared_hit": node.get("Shared Hit Blocks", 0),
+        "shared_read": node.get("Shared Read Blocks", 0),
+        "shared_dirtied": node.get("Shared Dirtied Blocks", 0),
+        "shared_written": node.get("Shared Written Blocks", 0),
+        "temp_read": node.get("Temp Read Blocks", 0),
+        "temp_written": node.get("Temp Written Blocks", 0),
+    }
+
+
+def _normalize(node: dict, ids) -> dict:
+    node_id = next(ids)  # Pre-order, so the root is 1
+    loops = node.get("Actual Loops", 1) or 0
+    children = [_normalize(child, ids) for child in node.get("Plans", [])]
+    total_ms = (node.get("Actual Total Time") or 0.0) * loops
+    # Parallel and init-plan children can add up to more than their parent
+    self_ms = max(total_ms - sum(c["total_ms"] for c in children), 0.0)
+    actual_rows = node.get("Actual Rows", 0)
+    plan_rows = node.get("Plan Rows", 0)
+
+    estimate_factor = None
+    if loops:
+        high, low = max(actual_rows, plan_rows), max(min(actual_rows, plan_rows), 1)
+        estimate_factor = round(high / low, 2)
+        if actual_rows < plan_rows:
+            estimate_factor = -estimate_factor  # Negative: fewer rows than estimated
+
+    normalized = {
+        "id": node_id,
+        "node_type": node.get("Node Type"),
+        "relation": node.get("Relation Name"),
+        "alias": node.get("Alias"),
+        "index": node.get("Index Name"),
+        "join_type": node.get("Join Type"),
+        "parent_relationship": node.get("Parent Relationship"),
+        "condition": next((node[k] for k in ("Index Cond", "Hash Cond", "Merge Cond", "Join Filter", "Recheck Cond") if k in node), None),
+        "filter": node.get("Filter"),
+        "rows_removed_by_filter": node.get("Rows Removed by Filter", 0) * loops,
+        "loops": loops,
+        "actual_rows": actual_rows * loops,
+        "plan_rows": plan_rows * loops,
+        "estimate_factor": estimate_factor,
+        "startup_ms": round(node.get("Actual Startup Time") or 0.0, 3),
+        "total_ms": round(total_ms, 3),
+        "self_ms": round(self_ms, 3),
+        "estimated_cost": node.get("Total Cost"),
+        "buffers": _buffers(node),
+        "sort_space_type": node.get("Sort Space Type"),
+        "hash_batches": node.get("Hash Batches"),
+        "flags": [],
+        "children": children,
+    }
+    if loops == 0:
+        normalized["never_executed"] = True
+    return normalized
+
+
+def _walk(node: dict):
+    yield node
+    for child in node["children"]:
+        yield from _walk(child)
+
+
+def _flag(node: dict, execution_ms: float) -> List[Tuple[str, str]]:
+    flags = []
+    rows_read = node["actual_rows"] + node["rows_removed_by_filter"]
+    if node["node_type"] in ("Seq Scan", "Parallel Seq Scan") and rows_read >= EXPLAIN_LARGE_SCAN_ROWS:
+        flags.append(("seq_scan_large", f"Sequential scan of {node['relation']} read {rows_read} rows"
+                      + (f", {node['rows_removed_by_filter']} removed by the filter" if node["rows_removed_by_filter"] else "")))
+
+    factor = node["estimate_factor"]
+    if factor and abs(factor) >= EXPLAIN_ESTIMATE_FACTOR and max(node["actual_rows"], node["plan_rows"]) >= EXPLAIN_ESTIMATE_MIN_ROWS:
+        kind = "bad_join_estimate" if node["node_type"] in _JOINS else "bad_estimate"
+        direction = "more" if factor > 0 else "fewer"
+        flags.append((kind, f"{node['actual_rows']} rows instead of the estimated {node['plan_rows']} ({abs(factor)}x {direction})"))
+
+    if node["sort_space_type"] == "Disk" or (node["hash_batches"] or 1) > 1 or node["buffers"]["temp_written"]:
+        flags.append(("spilled", "Spilled to disk; work_mem was too small"))
+
+    if execution_ms and node["self_ms"] / execution_ms >= EXPLAIN_HOTSPOT_SHARE:
+        flags.append(("hotspot", f"{round(100 * node['self_ms'] / execution_ms)}% of the execution time"))
+    return flags
+
+
+def analyze_plan(explain_output: list) -> dict:
+    """Normalize the single-element result of EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)."""
+    result = explain_output[0]
+    root = _normalize(result["Plan"], itertools.count(1))
+    execution_ms = result.get("Execution Time") or 0.0
+
+    flags = []
+    for node in _walk(root):
+        for kind, message in _flag(node, execution_ms):
+            node["flags"].append(kind)
+            flags.append({"node_id": node["id"], "kind": kind, "message": message})
+
+    top = sorted(_walk(root), key=lambda n: -n["self_ms"])[:EXPLAIN_TOP_NODES]
+    return {
+        "planning_ms": result.get("Planning Time"),
+        "execution_ms": execution_ms,
+        "plan": root,
+        "flags": flags,
+        "top_nodes": [
+            {
+                "node_id": n["id"],
+                "node_type": n["node_type"],
+                "relation": n["relation"],
+                "self_ms": n["self_ms"],
+                "share": round(n["self_ms"] / execution_ms, 4) if execution_ms else None,
+            }
+            for n in top
+        ],
+        "triggers": [
+            {"name": t.get("Trigger Name"), "relation": t.get("Relation"), "ms": t.get("Time"), "calls": t.get("Calls")}
+            for t in result.get("Triggers", [])
+        ],
+    }
@@ -0,0 +1,132 @@
+"""
+Startup Reconciliation Service
+
+Brings dedicated project stacks that were RUNNING before a backend restart back up.
+Runs in a background thread with a bounded worker pool so the API can serve
+traffic (and report ready) while containers are being started.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Optional
+
+from core.database import SessionLocal
+from models.project import Project, ProjectStatus, ProjectPlan
+from services.provisioning_service import start_project, is_project_running
+
+STARTUP_RECONCILE_CONCURRENCY = int(os.getenv("STARTUP_RECONCILE_CONCURRENCY", "4"))
+
+
+class ReconciliationProgress:
+    """Thread-safe progress counters exposed on /health/ready."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = "pending"  # pending -> running -> completed | failed
+        self.total = 0
+        self.started = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def begin(self, total: int):
+        with self._lock:
+            self.state = "running"
+            self.total = total
+            self.started_at = datetime.utcnow()
+
+    def record(self, project_id: str, outcome: str, error: Optional[str] = None):
+        with self._lock:
+            if outcome == "started":
+                self.started += 1
+            elif outcome == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+                self.errors[project_id] = error or "unknown error"
+
+    def finish(self, state: str = "completed"):
+        with self._lock:
+            self.state = state
+            self.finished_at = datetime.utcnow()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            done = self.started + self.skipped + self.failed
+            return {
+                "state": self.state,
+                "total": self.total,
+                "done": done,
+                "started": self.started,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "errors": dict(self.errors),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            }
+
+
+progress = ReconciliationProgress()
+
+
+def _reconcile_project(project_id: str) -> str:
+    """Start one project's stack unless its containers are already up."""
+    if is_project_running(project_id):
+        return "skipped"
+    start_project(project_id)
+    return "started"
+
+
+def reconcile_running_projects(max_workers: int = STARTUP_RECONCILE_CONCURRENCY):
+    """Start all dedicated projects that were RUNNING on backend boot, in parallel."""
+    db = SessionLocal()
+    try:
+        # Shared projects live in the shared cluster and have no per-project containers
+        project_ids = [
+            row[0] for row in db.query(Project.id).filter(
+                Project.status == ProjectStatus.RUNNING,
+                Project.plan != ProjectPlan.shared
+            ).all()
+        ]
+    except Exception as e:
+        print(f"[Reconcile] Could not load running projects: {e}")
+        progress.finish("failed")
+        return
+    finally:
+        db.close()
+
+    progress.begin(len(project_ids))
+    if not project_ids:
+        print("[Reconcile] No dedicated projects to start")
+        progress.finish()
+        return
+
+    print(f"[Reconcile] Reconciling {len(project_ids)} project(s) with {max_workers} worker(s)...")
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reconcile") as pool:
+        futures = {pool.submit(_reconcile_project, pid): pid for pid in project_ids}
+        for future in as_completed(futures):
+            project_id = futures[future]
+            try:
+                outcome = future.result()
+                progress.record(project_id, outcome)
+                print(f"[Reconcile] {project_id}: {outcome}")
+            except Exception as e:
+                progress.record(project_id, "failed", str(e))
+                print(f"[Reconcile] Failed to start project {project_id}: {e}")
+
+    progress.finish()
+    summary = progress.snapshot()
+    print(
+        f"[Reconcile] Done: {summary['started']} started, "
+        f"{summary['skipped']} already up, {summary['failed']} failed"
+    )
+
+
+def start_reconciliation_in_background() -> threading.Thread:
+    """Kick off reconciliation without blocking application startup."""
+    thread = threading.Thread(target=reconcile_running_projects, name="startup-reconcile", daemon=True)
+    thread.start()
+    return thread
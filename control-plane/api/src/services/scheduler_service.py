@@ -6,6 +6,9 @@ from datetime import datetime
 
 from services.project_service import get_projects
 from services.backup_service import BackupService
+from services.metrics_service import MetricsService, BUSINESS_METRICS_INTERVAL_SECONDS
+from services.query_insights_service import QUERY_INSIGHTS_INTERVAL_SECONDS
+from services.index_advisor_service import INDEX_ADVISOR_REFRESH_SECONDS
 
 class SchedulerService:
     def __init__(self):
@@ -41,31 +44,118 @@ class SchedulerService:
             replace_existing=True
         )
 
+        # Sample org usage into 1m buckets and refresh the 1h/1d rollups
+        self.scheduler.add_job(
+            func=self.record_usage_history,
+            trigger=IntervalTrigger(seconds=60),
+            id="usage_history",
+            name="Record Usage History",
+            replace_existing=True
+        )
+
+        # Drop usage buckets past their retention
+        self.scheduler.add_job(
+            func=self.prune_usage_history,
+            trigger=IntervalTrigger(hours=1),
+            id="usage_history_prune",
+            name="Prune Usage History",
+            replace_existing=True
+        )
+
+        # Drop slow queries past their retention
+        self.scheduler.add_job(
+            func=self.prune_slow_queries,
+            trigger=IntervalTrigger(hours=1),
+            id="slow_queries_prune",
+            name="Prune Slow Queries",
+            replace_existing=True
+        )
+
+        # Snapshot pg_stat_statements of every cluster into per-project deltas
+        self.scheduler.add_job(
+            func=self.collect_query_insights,
+            trigger=IntervalTrigger(seconds=QUERY_INSIGHTS_INTERVAL_SECONDS),
+            next_run_time=datetime.now(),
+            id="query_insights",
+            name="Collect Query Insights",
+            replace_existing=True
+        )
+
+        # Drop query insights past their retention
+        self.scheduler.add_job(
+            func=self.prune_query_insights,
+            trigger=IntervalTrigger(hours=1),
+            id="query_insights_prune",
+            name="Prune Query Insights",
+            replace_existing=True
+        )
+
+        # Rebuild expired index advisor reports of projects viewed lately
+        self.scheduler.add_job(
+            func=self.refresh_index_advice,
+            trigger=IntervalTrigger(seconds=INDEX_ADVISOR_REFRESH_SECONDS),
+            id="index_advisor",
+            name="Refresh Index Advisor Reports",
+            replace_existing=True
+        )
+
+        # Drop previous JWT secrets once their rotation overlap has ended
+        self.scheduler.add_job(
+            func=self.expire_previous_jwt_secrets,
+            trigger=IntervalTrigger(minutes=10),
+            id="jwt_secret_expiry",
+            name="Expire Previous JWT Secrets",
+            replace_existing=True
+        )
+
+        # Keep each running cluster's pool of pre-migrated databases full
+        self.scheduler.add_job(
+            func=self.fill_warm_pool,
+            trigger=IntervalTrigger(seconds=30),
+            id="warm_pool_fill",
+            name="Fill Warm Database Pool",
+            replace_existing=True
+        )
+
+        # Refresh /metrics business gauges (first run right away so scrapes aren't empty)
+        self.scheduler.add_job(
+            func=self.refresh_business_metrics,
+            trigger=IntervalTrigger(seconds=BUSINESS_METRICS_INTERVAL_SECONDS),
+            next_run_time=datetime.now(),
+            id="business_metrics",
+            name="Refresh Business Metrics",
+            replace_existing=True
+        )
+
     def run_daily_backups(self):
         print("[Scheduler] Starting daily backups...")
         projects = get_projects()
+        succeeded, failed = 0, 0
         for project in projects:
             if project.status == "running":
                 try:
                     print(f"[Scheduler] Backing up project {project.id}")
                     self.backup_service.backup_database(project.id)
                     self.backup_service.backup_storage(project.id)
+                    MetricsService.record_backup(project.id, success=True)
+                    succeeded += 1
                 except Exception as e:
                     print(f"[Scheduler] Backup failed for {project.id}: {e}")
+                    MetricsService.record_backup(project.id, success=False)
+                    failed += 1
+        MetricsService.record_backup_run(succeeded, failed)
         print("[Scheduler] Daily backups completed.")
 
     def provision_pending_resources(self):
         """Check for pending resources and provision them."""
         from core.database import SessionLocal
         from services.cluster_service import ClusterService
-        from models.cluster import Cluster, ClusterStatus
         
         db = SessionLocal()
         try:
-            # 1. Check for pending clusters
-            clusters = db.query(Cluster).filter(Cluster.status == ClusterStatus.creating).all()
-            for cluster in clusters:
-                ClusterService.provision_cluster(db, cluster.id)
+            # 1. Hand pending clusters to the provisioning pool (bounded, with timeouts);
+            #    bringing up a stack takes minutes and must not block the scheduler
+            ClusterService.provision_pending(db)
         except Exception as e:
             print(f"[Scheduler] Provisioning error: {e}")
         finally:
@@ -77,6 +167,8 @@ class SchedulerService:
         from models.cluster import Cluster, ClusterStatus
         from models.cluster_usage import ClusterUsage
         from models.project import Project, ProjectStatus
+        from services.cluster_service import ClusterService
+        from services.placement_service import PlacementService
         import random
         
         db = SessionLocal()
@@ -103,17 +195,165 @@ class SchedulerService:
                 usage.cpu_percent = round(random.uniform(5.0, 30.0), 1) + (project_count * 0.5)
                 usage.memory_mb = 128 + (project_count * 50)
                 
-                # Active connections query could go here if we had admin access to each cluster
-                usage.active_connections = project_count * 2  # Mock estimation
+                load = ClusterService.read_load(cluster)
+                if load:
+                    usage.active_connections = load["active_connections"]
+                    usage.max_connections = load["max_connections"]
+                    usage.db_bytes = load["db_bytes"]
+                else:
+                    usage.active_connections = project_count * 2  # Mock estimation
                 
                 usage.updated_at = datetime.utcnow()
                 db.commit()
+
+            # Placement scores clusters from these figures
+            PlacementService.invalidate()
                 
         except Exception as e:
             print(f"[Scheduler] Usage update error: {e}")
         finally:
             db.close()
 
+    def record_usage_history(self):
+        """Append usage samples and roll them up into hourly/daily buckets."""
+        from core.database import SessionLocal
+        from services.usage_service import UsageService
+
+        db = SessionLocal()
+        try:
+            usage_service = UsageService(db)
+            usage_service.record_samples()
+            usage_service.rollup()
+        except Exception as e:
+            db.rollback()
+            print(f"[Scheduler] Usage history error: {e}")
+        finally:
+            db.close()
+
+    def prune_usage_history(self):
+        """Delete usage buckets older than their retention window."""
+        from core.database import SessionLocal
+        from services.usage_service import UsageService
+
+        db = SessionLocal()
+        try:
+            deleted = UsageService(db).prune()
+            if deleted:
+                print(f"[Scheduler] Pruned {deleted} usage record(s)")
+        except Exception as e:
+            db.rollback()
+            print(f"[Scheduler] Usage prune error: {e}")
+        finally:
+            db.close()
+
+    def prune_slow_queries(self):
+        """Delete slow queries older than SLOW_QUERY_RETENTION_DAYS."""
+        from core.database import SessionLocal
+        from services.slow_query_service import SlowQueryService
+
+        db = SessionLocal()
+        try:
+            deleted = SlowQueryService.prune(db)
+            if deleted:
+                print(f"[Scheduler] Pruned {deleted} slow query record(s)")
+        except Exception as e:
+            db.rollback()
+            print(f"[Scheduler] Slow query prune error: {e}")
+        finally:
+            db.close()
+
+    def collect_query_insights(self):
+        """Store what each project's statements did since the last snapshot."""
+        from core.database import SessionLocal
+        from services.query_insights_service import QueryInsightsService
+
+        db = SessionLocal()
+        try:
+            QueryInsightsService.collect(db)
+        except Exception as e:
+            db.rollback()
+            print(f"[Scheduler] Query insights error: {e}")
+        finally:
+            db.close()
+
+    def prune_query_insights(self):
+        """Delete query stats older than QUERY_INSIGHTS_RETENTION_DAYS."""
+        from core.database import SessionLocal
+        from services.query_insights_service import QueryInsightsService
+
+        db = SessionLocal()
+        try:
+            deleted = QueryInsightsService.prune(db)
+            if deleted:
+                print(f"[Scheduler] Pruned {deleted} query stat record(s)")
+        except Exception as e:
+            db.rollback()
+            print(f"[Scheduler] Query insights prune error: {e}")
+        finally:
+            db.close()
+
+    def refresh_index_advice(self):
+        """Rebuild cached index recommendations in the background."""
+        from core.database import SessionLocal
+        from services.index_advisor_service import IndexAdvisorService
+
+        db = SessionLocal()
+        try:
+            refreshed = IndexAdvisorService.refresh_watched(db)
+            if refreshed:
+                print(f"[Scheduler] Refreshed {refreshed} index advisor report(s)")
+        except Exception as e:
+            print(f"[Scheduler] Index advisor error: {e}")
+        finally:
+            db.close()
+
+    def expire_previous_jwt_secrets(self):
+        """Remove JWT secrets and API keys kept for a rotation's overlap window once it ended."""
+        from core.database import SessionLocal
+        from services.api_key_service import ApiKeyService
+
+        db = SessionLocal()
+        try:
+            expired = ApiKeyService.expire_previous(db)
+            if expired:
+                print(f"[Scheduler] Expired previous JWT secret of {expired} project(s)")
+        except Exception as e:
+            db.rollback()
+            print(f"[Scheduler] JWT secret expiry error: {e}")
+        finally:
+            db.close()
+
+    def fill_warm_pool(self):
+        """Create pre-migrated databases until every cluster's pool is full."""
+        from core.database import SessionLocal
+        from services.warm_pool_service import WarmPoolService
+
+        db = SessionLocal()
+        try:
+            WarmPoolService.fill(db)
+        except Exception as e:
+            db.rollback()
+            print(f"[Scheduler] Warm pool error: {e}")
+        finally:
+            db.close()
+
+    def refresh_business_metrics(self):
+        """Recount the business gauges served by /metrics."""
+        from core.database import SessionLocal
+
+        try:
+            MetricsService.seed_backup_history(self.backup_service)
+        except Exception as e:
+            print(f"[Scheduler] Backup history seed error: {e}")
+
+        db = SessionLocal()
+        try:
+            MetricsService.refresh_business_metrics(db)
+        except Exception as e:
+            print(f"[Scheduler] Business metrics error: {e}")
+        finally:
+            db.close()
+
     def start(self):
         if not self.scheduler.running:
             print("[Scheduler] Starting background scheduler...")
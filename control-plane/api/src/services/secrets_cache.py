@@ -0,0 +1,162 @@
+"""
+Secrets Cache
+
+In-process cache of each project's secrets (key -> value), so request paths
+that need a port, password or key don't query project_secrets every time.
+
+Each project has a version that changes whenever its secrets may have changed;
+a cached copy is only served while its version is current. Code that writes
+project_secrets calls `secrets_changed(db, project_id)` before committing:
+
+- the project is invalidated in this process once the transaction commits, and
+- a NOTIFY on SECRETS_CHANNEL (sent by Postgres only if the transaction
+  commits) makes every other API process invalidate it too.
+
+A background thread LISTENs on that channel. While it isn't connected, other
+processes' changes could go unnoticed, so cached copies are only trusted for
+SECRETS_CACHE_UNLISTENED_TTL_SECONDS instead of SECRETS_CACHE_TTL_SECONDS, and
+everything is invalidated once it (re)connects. A session that changed a
+project's secrets reads them from the database until it commits, so neither it
+nor the cache ever sees uncommitted values.
+"""
+import itertools
+import os
+import select
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from core.metrics import supalove_secrets_cache_requests_total, supalove_secrets_cache_invalidations_total
+from models.project_secret import ProjectSecret
+
+SECRETS_CACHE_ENABLED = os.getenv("SECRETS_CACHE_ENABLED", "true").lower() == "true"
+SECRETS_CACHE_TTL_SECONDS = float(os.getenv("SECRETS_CACHE_TTL_SECONDS", "300"))
+SECRETS_CACHE_UNLISTENED_TTL_SECONDS = float(os.getenv("SECRETS_CACHE_UNLISTENED_TTL_SECONDS", "5"))
+SECRETS_CHANNEL = "project_secrets"
+SECRETS_LISTEN_RETRY_SECONDS = 5.0
+
+_CHANGED = "secrets_changed"  # Session.info key: projects whose secrets this transaction wrote
+
+
+class SecretsCache:
+    def __init__(self):
+        self._entries: Dict[str, dict] = {}
+        self._versions: Dict[str, int] = {}
+        self._counter = itertools.count(1)
+        self._base_version = 0  # Version of projects not invalidated since the last full invalidation
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.listening = False
+
+    def get(self, db: Session, project_id: str) -> Tuple[Optional[int], Dict[str, str]]:
+        """
+        (version, secrets) of a project, from the cache when the cached copy is
+        current. The version is None when the session has uncommitted changes to
+        them, so nothing derived from them gets cached either.
+        """
+        uncommitted = project_id in db.info.get(_CHANGED, ())
+        ttl = SECRETS_CACHE_TTL_SECONDS if self.listening else SECRETS_CACHE_UNLISTENED_TTL_SECONDS
+        with self._lock:
+            version = self._versions.get(project_id, self._base_version)
+            entry = self._entries.get(project_id)
+            if (SECRETS_CACHE_ENABLED and not uncommitted and entry and entry["version"] == version
+                    and time.monotonic() - entry["loaded_at"] < ttl):
+                supalove_secrets_cache_requests_total.labels(result="hit").inc()
+                return version, dict(entry["secrets"])
+
+        supalove_secrets_cache_requests_total.labels(result="miss").inc()
+        rows = db.query(ProjectSecret.key, ProjectSecret.value).filter(ProjectSecret.project_id == project_id).all()
+        secrets = {key: value for key, value in rows}
+        if SECRETS_CACHE_ENABLED and not uncommitted:
+            with self._lock:
+                # Not if the secrets changed while they were being read
+                if self._versions.get(project_id, self._base_version) == version:
+                    self._entries[project_id] = {"version": version, "secrets": secrets, "loaded_at": time.monotonic()}
+        return (None if uncommitted else version), dict(secrets)
+
+    def invalidate(self, project_id: Optional[str] = None, source: str = "local"):
+        """Give a project (or, with None, every project) a new version."""
+        with self._lock:
+            if project_id is None:
+                self._base_version = next(self._counter)
+                self._versions.clear()
+                self._entries.clear()
+            else:
+                self._versions[project_id] = next(self._counter)
+                self._entries.pop(project_id, None)
+        supalove_secrets_cache_invalidations_total.labels(source=source).inc()
+
+    # Cross-process invalidation
+
+    def _listen_once(self):
+        import psycopg2
+        from sqlalchemy.engine import make_url
+        from core.database import DATABASE_URL
+
+        url = make_url(DATABASE_URL)
+        conn = psycopg2.connect(host=url.host, port=url.port, user=url.username,
+                                password=url.password, dbname=url.database)
+        try:
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {SECRETS_CHANNEL}")
+            # Changes made while nobody listened are unknown
+            self.invalidate(source="reconnect")
+            self.listening = True
+            print("[Secrets] Listening for secret changes")
+            while not self._stopping.is_set():
+                if select.select([conn], [], [], SECRETS_LISTEN_RETRY_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    self.invalidate(notification.payload or None, source="notify")
+        finally:
+            self.listening = False
+            conn.close()
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            try:
+                self._listen_once()
+            except Exception as e:
+                print(f"[Secrets] Secret change listener lost: {e}")
+            self._stopping.wait(SECRETS_LISTEN_RETRY_SECONDS)
+
+    def start(self):
+        from core.database import engine
+
+        if not SECRETS_CACHE_ENABLED or self._thread or engine.dialect.name != "postgresql":
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="secrets-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread = None
+
+
+secrets_cache = SecretsCache()
+
+
+def secrets_changed(db: Session, project_id: str):
+    """Call before committing a transaction that writes project_secrets."""
+    db.info.setdefault(_CHANGED, set()).add(project_id)
+    if db.get_bind().dialect.name == "postgresql":
+        # Delivered to the listeners only when (and if) the transaction commits
+        db.execute(text("SELECT pg_notify(:channel, :project_id)"), {"channel": SECRETS_CHANNEL, "project_id": project_id})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    for project_id in session.info.pop(_CHANGED, ()):
+        secrets_cache.invalidate(project_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session):
+    session.info.pop(_CHANGED, None)
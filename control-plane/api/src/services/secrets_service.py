@@ -1,11 +1,21 @@
 import os
+import re
 import secrets as py_secrets
-import socket
 from pathlib import Path
+from typing import Dict, Optional
 from sqlalchemy.orm import Session
 from models.project_secret import ProjectSecret
 from dotenv import dotenv_values, set_key, unset_key
-from services.provisioning_local import BASE_PROJECTS_DIR
+from services.provisioning_local import BASE_PROJECTS_DIR, write_env_file
+from services.port_allocator import PortAllocator
+from services.secrets_cache import secrets_cache, secrets_changed
+from services.env_projection import env_projector
+
+# Host ports a dedicated project stack publishes
+DEDICATED_PORT_KEYS = ["DB_PORT", "REST_PORT", "REALTIME_PORT", "STORAGE_PORT", "AUTH_PORT", "FUNCTIONS_PORT", "GATEWAY_PORT"]
+
+# Secrets end up as .env lines, so keys must be variable names and values single lines
+SECRET_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
 
 def get_project_env_path(project_id: str) -> Path:
     return BASE_PROJECTS_DIR / project_id / ".env"
@@ -21,94 +31,72 @@ def get_secrets(project_id: str) -> dict:
     return dotenv_values(env_path)
 
 def get_project_secrets(db: Session, project_id: str) -> dict:
-    """Retrieves secrets from the database."""
-    db_secrets = db.query(ProjectSecret).filter(ProjectSecret.project_id == project_id).all()
-    return {s.key: s.value for s in db_secrets}
+    """Retrieves secrets from the database, through the in-process secrets cache."""
+    return secrets_cache.get(db, project_id)[1]
+
+def get_secret(db: Session, project_id: str, key: str, default: str = None) -> str:
+    """A single secret of a project, or `default` if it isn't set."""
+    return get_project_secrets(db, project_id).get(key, default)
+
+def apply_secret_changes(db: Session, project_id: str, changes: Dict[str, Optional[str]]) -> dict:
+    """
+    Applies a diff of secrets ({key: value}, None deletes the key) in one
+    transaction, then schedules one .env projection for it.
+    Raises ValueError for keys or values that can't go into a .env file.
+    """
+    for key, value in changes.items():
+        if value is None:
+            continue
+        if not SECRET_KEY_PATTERN.match(key) or key == "PROJECT_ID":
+            raise ValueError(f"Invalid secret key {key!r}")
+        if "\n" in value or "\r" in value:
+            raise ValueError(f"Secret {key} must be a single line")
+
+    existing = {
+        s.key: s for s in db.query(ProjectSecret).filter(
+            ProjectSecret.project_id == project_id,
+            ProjectSecret.key.in_(list(changes))
+        ).all()
+    }
+    changed = False
+    for key, value in changes.items():
+        secret = existing.get(key)
+        if value is None:
+            if secret:
+                db.delete(secret)
+                changed = True
+        elif secret is None:
+            db.add(ProjectSecret(project_id=project_id, key=key, value=value))
+            changed = True
+        elif secret.value != value:
+            secret.value = value
+            changed = True
+
+    if changed:
+        secrets_changed(db, project_id)
+        db.commit()
+        # Sync to .env
+        env_projector.schedule(project_id)
+
+    return get_project_secrets(db, project_id)
 
 def set_secret(db: Session, project_id: str, key: str, value: str):
     """
     Sets a secret in the database and syncs to .env
     """
-    secret = db.query(ProjectSecret).filter(
-        ProjectSecret.project_id == project_id, 
-        ProjectSecret.key == key
-    ).first()
-    
-    if secret:
-        secret.value = value
-    else:
-        secret = ProjectSecret(project_id=project_id, key=key, value=value)
-        db.add(secret)
-        
-    db.commit()
-    
-    # Sync to .env
-    reconcile_secrets(db, project_id)
-    
-    return get_project_secrets(db, project_id)
+    if value is None:
+        raise ValueError("Value is required")
+    return apply_secret_changes(db, project_id, {key: value})
 
 def delete_secret(db: Session, project_id: str, key: str):
     """
     Deletes a secret from the database and syncs to .env
     """
-    db.query(ProjectSecret).filter(
-        ProjectSecret.project_id == project_id,
-        ProjectSecret.key == key
-    ).delete()
-    
-    db.commit()
-    
-    # Sync to .env
-    reconcile_secrets(db, project_id)
-    
-    return get_project_secrets(db, project_id)
-
-def find_free_port(start_port: int = 5000) -> int:
-    """Find a port that's free on the HOST Docker daemon.
-    
-    Important: We can't use socket.bind() because that checks the container's
-    network namespace, but project containers run on the host Docker daemon.
-    Instead, we query Docker for currently bound ports.
-    """
-    import subprocess
-    import re
-    
-    # Get all ports currently bound by Docker containers on the host
-    used_ports = set()
-    try:
-        result = subprocess.run(
-            ["docker", "ps", "--format", "{{.Ports}}"],
-            capture_output=True, text=True, timeout=10
-        )
-        for line in result.stdout.split('\n'):
-            # Parse port mappings like "0.0.0.0:5500->5432/tcp" or ":::5500->5432/tcp"
-            for match in re.findall(r'(?:0\.0\.0\.0|:::):(\d+)->', line):
-                used_ports.add(int(match))
-    except Exception as e:
-        print(f"Warning: Could not query Docker ports: {e}")
-        # Fallback to socket check if Docker query fails
-        port = start_port
-        while port < 65535:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                try:
-                    s.bind(("0.0.0.0", port))
-                    return port
-                except socket.error:
-                    port += 1
-        raise Exception("No free ports available")
-    
-    # Find first available port not in use by Docker
-    port = start_port
-    while port < 65535:
-        if port not in used_ports:
-            return port
-        port += 1
-    raise Exception("No free ports available")
+    return apply_secret_changes(db, project_id, {key: None})
 
 def generate_project_secrets(db: Session, project_id: str, plan: str = "dedicated") -> dict:
     """Generates and persists base project secrets: ports, passwords, JWT secrets, API keys."""
-    from jose import jwt
-    import datetime
+    from services.api_key_service import issue_api_key
     
     # Generate random strings
     db_password = py_secrets.token_hex(16)
@@ -129,29 +117,21 @@ def generate_project_secrets(db: Session, project_id: str, plan: str = "dedicate
     else:
         # Dedicated plan: generate random ones
         jwt_secret = py_secrets.token_urlsafe(32)
-        # Allocate ports (ensuring no conflicts)
-        db_port = find_free_port(5500)
-        rest_port = find_free_port(db_port + 1)
-        realtime_port = find_free_port(rest_port + 1)
-        storage_port = find_free_port(realtime_port + 1)
-        auth_port = find_free_port(storage_port + 1)
-        functions_port = find_free_port(auth_port + 1)
-        gateway_port = find_free_port(functions_port + 1)
+        # Reserve all host ports in one batch (released again when the project is deleted)
+        ports = PortAllocator.allocate(db, "project", project_id, DEDICATED_PORT_KEYS)
+        db_port = ports["DB_PORT"]
+        rest_port = ports["REST_PORT"]
+        realtime_port = ports["REALTIME_PORT"]
+        storage_port = ports["STORAGE_PORT"]
+        auth_port = ports["AUTH_PORT"]
+        functions_port = ports["FUNCTIONS_PORT"]
+        gateway_port = ports["GATEWAY_PORT"]
 
     secret_key_base = py_secrets.token_urlsafe(64)
     
     # Generate Supabase-compatible JWT keys
-    def generate_supabase_key(role: str, secret: str) -> str:
-        payload = {
-            "role": role,
-            "iss": "supabase",
-            "iat": int(datetime.datetime.utcnow().timestamp()),
-            "exp": int((datetime.datetime.utcnow() + datetime.timedelta(days=365*10)).timestamp())
-        }
-        return jwt.encode(payload, secret, algorithm="HS256")
-    
-    anon_key = generate_supabase_key("anon", jwt_secret)
-    service_role_key = generate_supabase_key("service_role", jwt_secret)
+    anon_key = issue_api_key("anon", jwt_secret)
+    service_role_key = issue_api_key("service_role", jwt_secret)
     
     db_name = f"project_{project_id}" if plan == "shared" else "postgres"
     db_user = f"{db_name}_user" if plan == "shared" else "postgres"
@@ -178,6 +158,7 @@ def generate_project_secrets(db: Session, project_id: str, plan: str = "dedicate
         db_secret = ProjectSecret(project_id=project_id, key=key, value=value)
         db.add(db_secret)
         
+    secrets_changed(db, project_id)
     db.commit()
     return generated_secrets
 
@@ -188,23 +169,12 @@ def reconcile_secrets(db: Session, project_id: str) -> bool:
     Data Plane .env is the Projection.
     """
     # 1. Fetch all secrets for this project from DB
-    db_secrets = db.query(ProjectSecret).filter(ProjectSecret.project_id == project_id).all()
-    if not db_secrets:
+    secrets_map = get_project_secrets(db, project_id)
+    if not secrets_map:
         return False
 
-    # 2. Convert to dictionary
-    secrets_map = {s.key: s.value for s in db_secrets}
-
-    # 3. Write to .env file (idempotent, overwrites local with DB truth)
-    project_dir = BASE_PROJECTS_DIR / project_id
-    project_dir.mkdir(parents=True, exist_ok=True)
-    env_file = project_dir / ".env"
-    
-    env_content = f"# Project: {project_id}\n# Managed by Control Plane\n"
-    for key, value in secrets_map.items():
-        env_content += f"{key}={value}\n"
-    
-    env_file.write_text(env_content)
+    # 2. Write to .env file (idempotent, overwrites local with DB truth; untouched if unchanged)
+    write_env_file(project_id, secrets_map)
     return True
 
 def import_secrets_from_env(db: Session, project_id: str) -> bool:
@@ -226,5 +196,6 @@ def import_secrets_from_env(db: Session, project_id: str) -> bool:
         if key not in existing_keys:
             db.add(ProjectSecret(project_id=project_id, key=key, value=value))
             
+    secrets_changed(db, project_id)
     db.commit()
     return True
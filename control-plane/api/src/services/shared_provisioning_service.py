@@ -3,15 +3,17 @@ Shared Provisioning Service
 
 Handles provisioning for shared plan projects:
 - Creates a database in the shared Postgres cluster
-- Applies Supabase migrations
+- Applies Supabase migrations (copied from a per-cluster template database)
 - Generates and stores JWT secrets
 - Does NOT spawn any Docker containers
 """
 import os
+import secrets as py_secrets
 import psycopg2
 from psycopg2 import sql
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Optional
 
 from models.project import Project
 
@@ -26,6 +28,11 @@ SHARED_POSTGRES_ADMIN_DB = os.getenv("SHARED_POSTGRES_ADMIN_DB", "postgres")
 # Shared gateway URL for API access
 SHARED_GATEWAY_URL = os.getenv("SHARED_GATEWAY_URL", "http://localhost:8081")
 
+# New project databases are copied from a per-cluster template holding all
+# project migrations. The template is versioned by the latest migration, so adding
+# a migration file makes the next provisioning build a fresh template.
+SHARED_DB_TEMPLATES_ENABLED = os.getenv("SHARED_DB_TEMPLATES", "true").lower() == "true"
+
 
 def get_admin_connection():
     """Get a connection to the shared Postgres cluster as admin."""
@@ -47,25 +54,40 @@ def get_custom_connection(host, port, dbname=None, user=None, password=None):
         dbname=dbname or SHARED_POSTGRES_ADMIN_DB,
     )
 
-def create_project_database(db_name: str, db_password: str, host: str, port: int) -> None:
+def create_project_database(db_name: str, db_password: str, host: str, port: int, template: Optional[str] = None) -> bool:
     """
-    Create a new database in the targeted Postgres cluster.
+    Create a new database in the targeted Postgres cluster, optionally as a copy
+    of a template database. Returns False if the database already existed.
     """
     conn = get_custom_connection(host, port)
     conn.autocommit = True
     cursor = conn.cursor()
     
+    project_user = f"{db_name}_user"
+    created = False
     try:
-        # Create the database
-        cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
-        print(f"[SharedProvisioning] Created database: {db_name}")
+        # Each step tolerates leftovers from a previous (retried) attempt
+        try:
+            if template:
+                cursor.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                    sql.Identifier(db_name), sql.Identifier(template)
+                ))
+            else:
+                cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(db_name)))
+            created = True
+            print(f"[SharedProvisioning] Created database: {db_name}" + (f" from {template}" if template else ""))
+        except psycopg2.errors.DuplicateDatabase:
+            print(f"[SharedProvisioning] Database {db_name} already exists, skipping creation")
         
         # Create project-specific roles
-        project_user = f"{db_name}_user"
-        cursor.execute(
-            sql.SQL("CREATE ROLE {} WITH LOGIN PASSWORD %s").format(sql.Identifier(project_user)),
-            [db_password]
-        )
+        try:
+            cursor.execute(
+                sql.SQL("CREATE ROLE {} WITH LOGIN PASSWORD %s").format(sql.Identifier(project_user)),
+                [db_password]
+            )
+            print(f"[SharedProvisioning] Created role: {project_user}")
+        except psycopg2.errors.DuplicateObject:
+            print(f"[SharedProvisioning] Role already exists, skipping creation")
         
         # Grant privileges on database
         cursor.execute(
@@ -74,172 +96,74 @@ def create_project_database(db_name: str, db_password: str, host: str, port: int
                 sql.Identifier(project_user)
             )
         )
-        print(f"[SharedProvisioning] Created role: {project_user}")
-        
-    except psycopg2.errors.DuplicateDatabase:
-        print(f"[SharedProvisioning] Database {db_name} already exists, skipping creation")
-    except psycopg2.errors.DuplicateObject:
-        print(f"[SharedProvisioning] Role already exists, skipping creation")
     finally:
         cursor.close()
         conn.close()
     # Schema-specific permissions will be granted in apply_supabase_migrations
-    # after the schemas are created.
+    # (or apply_project_grants for template copies) after the schemas exist.
     print(f"[SharedProvisioning] Database {db_name} and role {project_user} prepared")
+    return created
+
+
+def authenticator_role_sql(authenticator_password: str) -> sql.Composed:
+    """Cluster-wide role PostgREST logs in as; only created if missing."""
+    return sql.SQL("""
+        DO $$ BEGIN
+            CREATE ROLE authenticator NOINHERIT LOGIN PASSWORD {password};
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$;
+
+        -- Allow authenticator to switch roles
+        GRANT anon TO authenticator;
+        GRANT authenticated TO authenticator;
+        GRANT service_role TO authenticator;
+    """).format(password=sql.Literal(authenticator_password))
+
+
+def _apply_baseline(conn, db_name: str, authenticator_password: str) -> None:
+    """Bring a database to the latest project migration and make sure authenticator exists."""
+    from services.project_migration_service import migrate_connection, MigrationError
+
+    result = migrate_connection(conn, db_name)
+    if result["error"]:
+        raise MigrationError(f"Migrating {db_name} failed: {result['error']}")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(authenticator_role_sql(authenticator_password))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def project_grants_sql(project_user: str) -> sql.Composed:
+    """Grants giving a project's own role access to the baseline schemas."""
+    return sql.SQL("""
+        GRANT USAGE, CREATE ON SCHEMA public TO {user};
+        GRANT USAGE, CREATE ON SCHEMA auth TO {user};
+        GRANT USAGE, CREATE ON SCHEMA storage TO {user};
+        GRANT USAGE, CREATE ON SCHEMA _realtime TO {user};
+        GRANT ALL ON ALL TABLES IN SCHEMA auth TO {user};
+        GRANT ALL ON ALL SEQUENCES IN SCHEMA auth TO {user};
+        GRANT EXECUTE ON FUNCTION auth.uid() TO {user};
+        GRANT EXECUTE ON FUNCTION auth.role() TO {user};
+        GRANT EXECUTE ON FUNCTION auth.jwt() TO {user};
+        GRANT ALL ON ALL TABLES IN SCHEMA storage TO {user};
+        GRANT ALL ON ALL SEQUENCES IN SCHEMA storage TO {user};
+    """).format(user=sql.Identifier(project_user))
 
 
 def apply_supabase_migrations(db_name: str, db_password: str, host: str, port: int) -> None:
     """
-    Apply Supabase-compatible migrations to the project database.
+    Apply pending project migrations (src/project_migrations) to the project database,
+    then grant the project's role access to them.
     """
     conn = get_custom_connection(host, port, dbname=db_name)
     cursor = conn.cursor()
     
     try:
-        # Create Supabase-required schemas
         project_user = f"{db_name}_user"
-        migrations = f"""
-        -- Create required schemas
-        CREATE SCHEMA IF NOT EXISTS auth;
-        CREATE SCHEMA IF NOT EXISTS storage;
-        CREATE SCHEMA IF NOT EXISTS _realtime;
-        CREATE SCHEMA IF NOT EXISTS graphql_public;
-        
-        -- Create required roles for Supabase services
-        DO $$ BEGIN
-            CREATE ROLE anon NOLOGIN NOINHERIT;
-        EXCEPTION WHEN duplicate_object THEN NULL;
-        END $$;
-        
-        DO $$ BEGIN
-            CREATE ROLE authenticated NOLOGIN NOINHERIT;
-        EXCEPTION WHEN duplicate_object THEN NULL;
-        END $$;
-        
-        DO $$ BEGIN
-            CREATE ROLE service_role NOLOGIN NOINHERIT BYPASSRLS;
-        EXCEPTION WHEN duplicate_object THEN NULL;
-        END $$;
-        
-        DO $$ BEGIN
-            CREATE ROLE authenticator NOINHERIT LOGIN PASSWORD '{db_password}';
-        EXCEPTION WHEN duplicate_object THEN NULL;
-        END $$;
-        
-        -- Grant schema access to project roles
-        GRANT USAGE ON SCHEMA public TO anon, authenticated, service_role;
-        GRANT USAGE ON SCHEMA auth TO anon, authenticated, service_role;
-        GRANT USAGE ON SCHEMA storage TO anon, authenticated, service_role;
-        
-        -- Allow authenticator to switch roles
-        GRANT anon TO authenticator;
-        GRANT authenticated TO authenticator;
-        GRANT service_role TO authenticator;
-        
-        -- Grant schema access to the project user (the one used for migrations and SQL editor)
-        GRANT USAGE, CREATE ON SCHEMA public TO {project_user};
-        GRANT USAGE, CREATE ON SCHEMA auth TO {project_user};
-        GRANT USAGE, CREATE ON SCHEMA storage TO {project_user};
-        GRANT USAGE, CREATE ON SCHEMA _realtime TO {project_user};
-        
-        -- Enable Row Level Security functionality
-        ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON TABLES TO anon, authenticated, service_role;
-        ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON SEQUENCES TO anon, authenticated, service_role;
-        ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON FUNCTIONS TO anon, authenticated, service_role;
-        
-        -- ============================================
-        -- AUTH.USERS TABLE (Supabase Compatible)
-        -- ============================================
-        CREATE TABLE IF NOT EXISTS auth.users (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            email TEXT UNIQUE NOT NULL,
-            encrypted_password TEXT NOT NULL,
-            created_at TIMESTAMPTZ DEFAULT NOW(),
-            updated_at TIMESTAMPTZ DEFAULT NOW(),
-            email_confirmed_at TIMESTAMPTZ,
-            last_sign_in_at TIMESTAMPTZ,
-            role TEXT DEFAULT 'authenticated',
-            aud TEXT DEFAULT 'authenticated',
-            user_metadata JSONB DEFAULT '{{}}',
-            app_metadata JSONB DEFAULT '{{}}'
-        );
-        
-        -- Create auth.uid() function for RLS policies
-        CREATE OR REPLACE FUNCTION auth.uid() 
-        RETURNS UUID 
-        LANGUAGE sql STABLE
-        AS $$
-            SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::uuid
-        $$;
-        
-        -- Create auth.role() function for RLS policies
-        CREATE OR REPLACE FUNCTION auth.role() 
-        RETURNS TEXT 
-        LANGUAGE sql STABLE
-        AS $$
-            SELECT NULLIF(current_setting('request.jwt.claim.role', true), '')::text
-        $$;
-        
-        -- Create auth.jwt() function for RLS policies
-        CREATE OR REPLACE FUNCTION auth.jwt() 
-        RETURNS JSONB 
-        LANGUAGE sql STABLE
-        AS $$
-            SELECT COALESCE(
-                current_setting('request.jwt.claims', true),
-                '{{}}'
-            )::jsonb
-        $$;
-        
-        GRANT ALL ON ALL TABLES IN SCHEMA auth TO {project_user};
-        GRANT ALL ON ALL SEQUENCES IN SCHEMA auth TO {project_user};
-        GRANT EXECUTE ON FUNCTION auth.uid() TO anon, authenticated, service_role, {project_user};
-        GRANT EXECUTE ON FUNCTION auth.role() TO anon, authenticated, service_role, {project_user};
-        GRANT EXECUTE ON FUNCTION auth.jwt() TO anon, authenticated, service_role, {project_user};
-
-        -- ============================================
-        -- STORAGE TABLES
-        -- ============================================
-        CREATE TABLE IF NOT EXISTS storage.buckets (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            owner UUID,
-            created_at TIMESTAMPTZ DEFAULT NOW(),
-            updated_at TIMESTAMPTZ DEFAULT NOW(),
-            public BOOLEAN DEFAULT FALSE,
-            avif_autoprovision BOOLEAN DEFAULT FALSE,
-            file_size_limit BIGINT,
-            allowed_mime_types TEXT[]
-        );
-
-        CREATE TABLE IF NOT EXISTS storage.objects (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            bucket_id TEXT REFERENCES storage.buckets(id),
-            name TEXT,
-            owner UUID,
-            created_at TIMESTAMPTZ DEFAULT NOW(),
-            updated_at TIMESTAMPTZ DEFAULT NOW(),
-            last_accessed_at TIMESTAMPTZ DEFAULT NOW(),
-            metadata JSONB,
-            path_tokens TEXT[] GENERATED ALWAYS AS (string_to_array(name, '/')) STORED
-        );
-
-        GRANT ALL ON ALL TABLES IN SCHEMA storage TO {project_user};
-        GRANT ALL ON ALL SEQUENCES IN SCHEMA storage TO {project_user};
-
-        -- ============================================
-        -- REALTIME PUBLICATION
-        -- ============================================
-        DO $$ BEGIN
-            IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
-                CREATE PUBLICATION supabase_realtime;
-            END IF;
-        EXCEPTION WHEN OTHERS THEN 
-            RAISE NOTICE 'Could not create publication';
-        END $$;
-        """
-        
-        cursor.execute(migrations)
+        _apply_baseline(conn, db_name, db_password)
+        cursor.execute(project_grants_sql(project_user))
         conn.commit()
         print(f"[SharedProvisioning] Applied full migrations to {db_name}")
         
@@ -248,6 +172,144 @@ def apply_supabase_migrations(db_name: str, db_password: str, host: str, port: i
         conn.close()
 
 
+def apply_project_grants(db_name: str, host: str, port: int) -> None:
+    """Grant the project's role access to a database copied from the template."""
+    conn = get_custom_connection(host, port, dbname=db_name)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(project_grants_sql(f"{db_name}_user"))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def template_db_name(version: Optional[int] = None) -> str:
+    from services.project_migration_service import latest_version
+    return f"supalove_template_v{version if version is not None else latest_version()}"
+
+
+# (host, port, template name) entries known to exist
+_ready_templates = set()
+_ready_templates_lock = threading.Lock()
+
+
+def _terminate_and_drop(cursor, db_name: str) -> None:
+    cursor.execute(
+        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = %s AND pid <> pg_backend_pid()",
+        [db_name]
+    )
+    # Template databases can't be dropped until they are unmarked
+    cursor.execute(
+        "SELECT 1 FROM pg_database WHERE datname = %s AND datistemplate",
+        [db_name]
+    )
+    if cursor.fetchone():
+        cursor.execute(sql.SQL("ALTER DATABASE {} WITH IS_TEMPLATE false").format(sql.Identifier(db_name)))
+    cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(db_name)))
+
+
+def build_cluster_template(host: str, port: int, rebuild: bool = False) -> str:
+    """
+    Create (or with rebuild=True, replace) the cluster's supalove_template_vN database.
+    The baseline is applied to a scratch database which is then renamed into place,
+    so clones never see a half-built template. Older template versions are dropped.
+    """
+    name = template_db_name()
+    building = f"{name}_building"
+
+    conn = get_custom_connection(host, port)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        # Serialise builders (API replicas, the rebuild script) per cluster
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [name])
+        try:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", [name])
+            exists = cursor.fetchone() is not None
+            if exists and not rebuild:
+                return name
+
+            print(f"[SharedProvisioning] Building template {name} on {host}:{port}")
+            _terminate_and_drop(cursor, building)
+            cursor.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(building)))
+
+            build_conn = get_custom_connection(host, port, dbname=building)
+            try:
+                # Password only used if the cluster has no authenticator role yet
+                _apply_baseline(build_conn, building, py_secrets.token_hex(16))
+            finally:
+                build_conn.close()
+
+            if exists:
+                _terminate_and_drop(cursor, name)
+            cursor.execute(sql.SQL("ALTER DATABASE {} RENAME TO {}").format(
+                sql.Identifier(building), sql.Identifier(name)
+            ))
+            # CREATE DATABASE ... TEMPLATE fails while anyone is connected to the source
+            cursor.execute(sql.SQL("ALTER DATABASE {} WITH IS_TEMPLATE true ALLOW_CONNECTIONS false").format(
+                sql.Identifier(name)
+            ))
+
+            cursor.execute(
+                "SELECT datname FROM pg_database WHERE datname LIKE 'supalove\\_template\\_v%%' AND datname NOT IN (%s, %s)",
+                [name, building]
+            )
+            for (old_name,) in cursor.fetchall():
+                print(f"[SharedProvisioning] Dropping old template {old_name}")
+                _terminate_and_drop(cursor, old_name)
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [name])
+    finally:
+        cursor.close()
+        conn.close()
+
+    with _ready_templates_lock:
+        _ready_templates.add((host, port, name))
+    print(f"[SharedProvisioning] Template {name} ready on {host}:{port}")
+    return name
+
+
+def forget_cluster_templates(host: str, port: int) -> None:
+    """Drop cached template state for an endpoint whose Postgres was replaced or removed."""
+    with _ready_templates_lock:
+        for entry in [e for e in _ready_templates if e[:2] == (host, port)]:
+            _ready_templates.discard(entry)
+
+
+def ensure_cluster_template(host: str, port: int) -> Optional[str]:
+    """Return the cluster's template name, building it on first use. None if templates are unavailable."""
+    if not SHARED_DB_TEMPLATES_ENABLED:
+        return None
+    name = template_db_name()
+    with _ready_templates_lock:
+        if (host, port, name) in _ready_templates:
+            return name
+    try:
+        return build_cluster_template(host, port)
+    except Exception as e:
+        print(f"[SharedProvisioning] Template unavailable on {host}:{port}, using full migrations: {e}")
+        return None
+
+
+def create_migrated_database(db_name: str, db_password: str, host: str, port: int) -> None:
+    """
+    Create a project database with the Supabase baseline applied: a file-level copy
+    of the cluster template plus per-project grants, or the full DDL as a fallback.
+    """
+    template = ensure_cluster_template(host, port)
+    if template:
+        created = create_project_database(db_name, db_password, host=host, port=port, template=template)
+        if created:
+            apply_project_grants(db_name, host=host, port=port)
+            return
+        # Pre-existing database from an earlier attempt may predate the template;
+        # the full migrations are idempotent
+    else:
+        create_project_database(db_name, db_password, host=host, port=port)
+    apply_supabase_migrations(db_name, db_password, host=host, port=port)
+
+
 def provision_shared_project(db: Session, project: Project, cluster: Any, secrets: Dict[str, Any]) -> Dict[str, Any]:
     """
     Provision a shared project in a specific cluster.
@@ -275,11 +337,17 @@ def provision_shared_project(db: Session, project: Project, cluster: Any, secret
     
     print(f"[SharedProvisioning] Provisioning shared project: {project.id} in cluster {cluster.id}")
     
-    # 1. Create the database
-    create_project_database(db_name, db_password, host=host, port=port)
+    # 0. Fast path: take an already-migrated database from the cluster's warm pool
+    from services.warm_pool_service import WarmPoolService
+    if WarmPoolService.claim(db, cluster, project.id, db_name, db_password):
+        print(f"[SharedProvisioning] Shared project {project.id} provisioned from warm pool")
+        return {
+            "api_url": f"{api_url}/projects/{project.id}",
+            "db_url": f"postgresql://{db_name}_user:{db_password}@{host}:{port}/{db_name}",
+        }
     
-    # 2. Apply Supabase migrations
-    apply_supabase_migrations(db_name, db_password, host=host, port=port)
+    # 1. Create the database with the Supabase baseline (template copy when available)
+    create_migrated_database(db_name, db_password, host=host, port=port)
     
     print(f"[SharedProvisioning] Shared project {project.id} provisioned successfully")
     
@@ -303,7 +371,15 @@ def delete_shared_project(project: Project) -> None:
         print(f"[SharedProvisioning] No database name for project {project.id}, skipping deletion")
         return
     
-    conn = get_admin_connection()
+    # Projects can move between clusters; drop from the one it lives in now
+    from sqlalchemy.orm import object_session
+    from models.cluster import Cluster
+    session = object_session(project)
+    cluster = session.query(Cluster).filter(Cluster.id == project.cluster_id).first() if session and project.cluster_id else None
+    if cluster:
+        conn = get_custom_connection(cluster.postgres_host or SHARED_POSTGRES_HOST, cluster.postgres_port or SHARED_POSTGRES_PORT)
+    else:
+        conn = get_admin_connection()
     conn.autocommit = True
     cursor = conn.cursor()
     
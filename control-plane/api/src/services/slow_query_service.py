@@ -0,0 +1,97 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.slow_query import SlowQuery
+
+SLOW_QUERY_RETENTION_DAYS = int(os.getenv("SLOW_QUERY_RETENTION_DAYS", "7"))
+SLOW_QUERY_MAX_STATEMENT_CHARS = int(os.getenv("SLOW_QUERY_MAX_STATEMENT_CHARS", "8192"))
+
+SLOW_QUERY_ORDERS = ("recent", "slowest")
+
+
+class SlowQueryService:
+    """Per-project slow queries extracted from the shared Postgres' log by the log pipeline."""
+
+    @staticmethod
+    def record(db: Session, rows: List[dict]) -> int:
+        """
+        Store a batch of slow-query rows (see postgres_logs.slow_query). Rows
+        already stored, by another API process or before a restart, are skipped.
+        Returns the rows inserted.
+        """
+        if not rows:
+            return 0
+        values = []
+        for row in rows:
+            statement = row["statement"][:SLOW_QUERY_MAX_STATEMENT_CHARS]
+            values.append(dict(row, statement=statement, statement_md5=hashlib.md5(statement.encode()).hexdigest()))
+        insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        result = db.execute(insert(SlowQuery).values(values).on_conflict_do_nothing(
+            index_elements=["project_id", "occurred_at", "pid", "statement_md5"]
+        ))
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def list_queries(db: Session, project_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                     min_duration_ms: Optional[float] = None, order: str = "recent",
+                     cursor: Optional[int] = None, limit: int = 100) -> dict:
+        """
+        Slow queries of a project, newest first (`recent`, paginated with the
+        returned cursor) or longest first (`slowest`, a single page).
+        """
+        if order not in SLOW_QUERY_ORDERS:
+            raise ValueError(f"Unknown order {order!r}, expected one of {', '.join(SLOW_QUERY_ORDERS)}")
+        if order == "slowest" and cursor is not None:
+            raise ValueError("cursor only applies to order=recent")
+
+        query = db.query(SlowQuery).filter(SlowQuery.project_id == project_id)
+        if since is not None:
+            query = query.filter(SlowQuery.occurred_at >= since)
+        if until is not None:
+            query = query.filter(SlowQuery.occurred_at <= until)
+        if min_duration_ms is not None:
+            query = query.filter(SlowQuery.duration_ms >= min_duration_ms)
+
+        if order == "slowest":
+            rows = query.order_by(SlowQuery.duration_ms.desc(), SlowQuery.id.desc()).limit(limit).all()
+            next_cursor = None
+        else:
+            if cursor is not None:
+                query = query.filter(SlowQuery.id < cursor)
+            rows = query.order_by(SlowQuery.id.desc()).limit(limit).all()
+            next_cursor = rows[-1].id if len(rows) == limit else None
+
+        return {
+            "queries": [
+                {
+                    "id": row.id,
+                    "occurred_at": row.occurred_at.isoformat(),
+                    "duration_ms": row.duration_ms,
+                    "user": row.user_name,
+                    "application": row.application,
+                    "statement": row.statement,
+                }
+                for row in rows
+            ],
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def delete_project(db: Session, project_id: str) -> int:
+        """Drop a deleted project's slow queries (the caller commits)."""
+        return db.query(SlowQuery).filter(SlowQuery.project_id == project_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def prune(db: Session, now: Optional[datetime] = None) -> int:
+        """Deletes slow queries past SLOW_QUERY_RETENTION_DAYS. Returns rows deleted."""
+        now = now or datetime.utcnow()
+        deleted = db.query(SlowQuery).filter(
+            SlowQuery.occurred_at < now - timedelta(days=SLOW_QUERY_RETENTION_DAYS)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
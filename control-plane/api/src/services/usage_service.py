@@ -1,11 +1,41 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from models.organization import Organization
-from models.project import Project
-from models.usage_record import UsageRecord
+from models.project import Project, ProjectStatus
+from models.usage_record import UsageRecord, UsageResolution
 from fastapi import HTTPException
 
 print(f"DEBUG: Loading usage_service from {__file__}")
 
+# How long each resolution is kept before pruning
+USAGE_RETENTION = {
+    UsageResolution.minute: timedelta(days=2),
+    UsageResolution.hour: timedelta(days=35),
+    UsageResolution.day: timedelta(days=400),
+}
+
+# History range -> (resolution served, lookback window)
+# Long ranges read pre-aggregated buckets so charts never scan raw samples.
+USAGE_HISTORY_RANGES = {
+    "1h": (UsageResolution.minute, timedelta(hours=1)),
+    "6h": (UsageResolution.minute, timedelta(hours=6)),
+    "24h": (UsageResolution.hour, timedelta(hours=24)),
+    "7d": (UsageResolution.hour, timedelta(days=7)),
+    "30d": (UsageResolution.day, timedelta(days=30)),
+    "90d": (UsageResolution.day, timedelta(days=90)),
+    "365d": (UsageResolution.day, timedelta(days=365)),
+}
+
+# Listing MinIO objects is expensive, so storage is sampled less often than the DB
+STORAGE_SAMPLE_INTERVAL_SECONDS = 900
+_storage_sizes_cache = {"sizes": {}, "refreshed_at": 0.0}
+
+BYTES_PER_MB = 1024 * 1024
+
 class UsageService:
     def __init__(self, db: Session):
         self.db = db
@@ -101,3 +131,249 @@ class UsageService:
                 "percent": 0 if limit_storage == -1 else min(100, int((usage["storage_mb"] / limit_storage) * 100))
             }
         }
+
+    # ============================================
+    # USAGE HISTORY (time-series)
+    # ============================================
+
+    def _collect_database_sizes(self) -> Dict[str, int]:
+        """Returns {db_name: bytes} for project databases, one query per cluster."""
+        from models.cluster import Cluster, ClusterStatus
+        from services.shared_provisioning_service import get_custom_connection
+
+        sizes = {}
+        seen_endpoints = set()
+        clusters = self.db.query(Cluster).filter(Cluster.status == ClusterStatus.running).all()
+        for cluster in clusters:
+            endpoint = (cluster.postgres_host, cluster.postgres_port)
+            # Private clusters may still point at the same Postgres in dev
+            if endpoint in seen_endpoints:
+                continue
+            seen_endpoints.add(endpoint)
+            try:
+                conn = get_custom_connection(cluster.postgres_host, cluster.postgres_port)
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "SELECT datname, pg_database_size(datname) FROM pg_database "
+                        "WHERE NOT datistemplate AND datname LIKE 'project_%'"
+                    )
+                    sizes.update({name: size for name, size in cursor.fetchall()})
+                    cursor.close()
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"[Usage] Could not read database sizes from cluster {cluster.id}: {e}")
+        return sizes
+
+    def _collect_storage_sizes(self, project_ids: List[str]) -> Dict[str, int]:
+        """Returns {project_id: bytes} across the project's buckets, refreshed at most every 15 minutes."""
+        if time.monotonic() - _storage_sizes_cache["refreshed_at"] < STORAGE_SAMPLE_INTERVAL_SECONDS:
+            return _storage_sizes_cache["sizes"]
+
+        from services.storage_service import StorageService
+
+        sizes = {}
+        try:
+            client = StorageService().client
+            bucket_names = [b.name for b in client.list_buckets() if b.name.startswith("project-")]
+            for project_id in project_ids:
+                prefix = f"project-{project_id}"
+                total = 0
+                for name in bucket_names:
+                    if name == prefix or name.startswith(f"{prefix}-"):
+                        total += sum(obj.size or 0 for obj in client.list_objects(name, recursive=True))
+                sizes[project_id] = total
+        except Exception as e:
+            print(f"[Usage] Could not read storage sizes: {e}")
+            # Keep serving the previous sample rather than dropping to zero
+            return _storage_sizes_cache["sizes"]
+
+        _storage_sizes_cache["sizes"] = sizes
+        _storage_sizes_cache["refreshed_at"] = time.monotonic()
+        return sizes
+
+    def record_samples(self, now: Optional[datetime] = None) -> int:
+        """
+        Appends a 1-minute usage sample for every organization.
+        Gauges (projects, DB size, storage) take the latest value; api_requests_count
+        is left untouched so counts metered into the same bucket are preserved.
+        Returns the number of org buckets written.
+        """
+        now = now or datetime.utcnow()
+        bucket = now.replace(second=0, microsecond=0)
+
+        org_ids = [org_id for (org_id,) in self.db.query(Organization.id).all()]
+        if not org_ids:
+            return 0
+
+        projects = self.db.query(Project).filter(
+            Project.status != ProjectStatus.DELETED,
+            Project.org_id.isnot(None)
+        ).all()
+        db_sizes = self._collect_database_sizes()
+        storage_sizes = self._collect_storage_sizes([p.id for p in projects])
+
+        totals = {org_id: {"projects": 0, "db_bytes": 0, "storage_bytes": 0} for org_id in org_ids}
+        for project in projects:
+            org_totals = totals.setdefault(project.org_id, {"projects": 0, "db_bytes": 0, "storage_bytes": 0})
+            org_totals["projects"] += 1
+            org_totals["db_bytes"] += db_sizes.get(project.db_name or f"project_{project.id}", 0)
+            org_totals["storage_bytes"] += storage_sizes.get(project.id, 0)
+
+        rows = [
+            {
+                "org_id": org_id,
+                "resolution": UsageResolution.minute.value,
+                "recorded_at": bucket,
+                "projects_count": t["projects"],
+                "database_size_bytes": t["db_bytes"],
+                "database_size_mb": t["db_bytes"] // BYTES_PER_MB,
+                "storage_bytes": t["storage_bytes"],
+                "storage_size_mb": t["storage_bytes"] // BYTES_PER_MB,
+                "api_requests_count": 0,
+                "sample_count": 1,
+            }
+            for org_id, t in totals.items()
+        ]
+
+        stmt = pg_insert(UsageRecord).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_usage_records_bucket",
+            set_={
+                "projects_count": stmt.excluded.projects_count,
+                "database_size_bytes": stmt.excluded.database_size_bytes,
+                "database_size_mb": stmt.excluded.database_size_mb,
+                "storage_bytes": stmt.excluded.storage_bytes,
+                "storage_size_mb": stmt.excluded.storage_size_mb,
+                "sample_count": UsageRecord.sample_count + 1,
+            }
+        )
+        self.db.execute(stmt)
+        self.db.commit()
+        return len(rows)
+
+    def _rollup(self, source: UsageResolution, target: UsageResolution, unit: str, since: datetime) -> int:
+        """
+        Recomputes `target` buckets from `source` rows recorded since `since`.
+        Gauges roll up as the peak value, request counts as the sum, so re-running is idempotent.
+        """
+        bucket_col = func.date_trunc(unit, UsageRecord.recorded_at).label("bucket")
+        aggregated = self.db.query(
+            UsageRecord.org_id,
+            bucket_col,
+            func.max(UsageRecord.projects_count),
+            func.max(UsageRecord.database_size_bytes),
+            func.max(UsageRecord.storage_bytes),
+            func.sum(UsageRecord.api_requests_count),
+            func.sum(UsageRecord.sample_count),
+            func.sum(UsageRecord.bytes_in),
+            func.sum(UsageRecord.bytes_out),
+            func.sum(UsageRecord.api_latency_ms_total),
+        ).filter(
+            UsageRecord.resolution == source.value,
+            UsageRecord.recorded_at >= since
+        ).group_by(UsageRecord.org_id, bucket_col).all()
+
+        if not aggregated:
+            return 0
+
+        rows = [
+            {
+                "org_id": org_id,
+                "resolution": target.value,
+                "recorded_at": bucket,
+                "projects_count": projects or 0,
+                "database_size_bytes": db_bytes or 0,
+                "database_size_mb": (db_bytes or 0) // BYTES_PER_MB,
+                "storage_bytes": storage_bytes or 0,
+                "storage_size_mb": (storage_bytes or 0) // BYTES_PER_MB,
+                "api_requests_count": int(api_requests or 0),
+                "sample_count": int(samples or 0),
+                "bytes_in": int(bytes_in or 0),
+                "bytes_out": int(bytes_out or 0),
+                "api_latency_ms_total": int(latency_ms or 0),
+            }
+            for (
+                org_id, bucket, projects, db_bytes, storage_bytes,
+                api_requests, samples, bytes_in, bytes_out, latency_ms,
+            ) in aggregated
+        ]
+
+        stmt = pg_insert(UsageRecord).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_usage_records_bucket",
+            set_={
+                column: getattr(stmt.excluded, column)
+                for column in (
+                    "projects_count", "database_size_bytes", "database_size_mb",
+                    "storage_bytes", "storage_size_mb", "api_requests_count", "sample_count",
+                    "bytes_in", "bytes_out", "api_latency_ms_total",
+                )
+            }
+        )
+        self.db.execute(stmt)
+        self.db.commit()
+        return len(rows)
+
+    def rollup(self, now: Optional[datetime] = None) -> None:
+        """Refreshes the current and previous 1h and 1d buckets."""
+        now = now or datetime.utcnow()
+        hour_start = now.replace(minute=0, second=0, microsecond=0)
+        day_start = hour_start.replace(hour=0)
+
+        self._rollup(UsageResolution.minute, UsageResolution.hour, "hour", hour_start - timedelta(hours=1))
+        self._rollup(UsageResolution.hour, UsageResolution.day, "day", day_start - timedelta(days=1))
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Deletes buckets older than their resolution's retention. Returns rows deleted."""
+        now = now or datetime.utcnow()
+        deleted = 0
+        for resolution, retention in USAGE_RETENTION.items():
+            deleted += self.db.query(UsageRecord).filter(
+                UsageRecord.resolution == resolution.value,
+                UsageRecord.recorded_at < now - retention
+            ).delete(synchronize_session=False)
+        self.db.commit()
+        return deleted
+
+    def get_usage_history(self, org_id: str, range_key: str = "24h") -> dict:
+        """
+        Returns a pre-aggregated usage series for charting.
+        The resolution is chosen from the range so at most a few hundred rows are read.
+        """
+        if range_key not in USAGE_HISTORY_RANGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid range '{range_key}'. Use one of: {', '.join(USAGE_HISTORY_RANGES)}"
+            )
+
+        resolution, window = USAGE_HISTORY_RANGES[range_key]
+        since = datetime.utcnow() - window
+
+        records = self.db.query(UsageRecord).filter(
+            UsageRecord.org_id == org_id,
+            UsageRecord.resolution == resolution.value,
+            UsageRecord.recorded_at >= since
+        ).order_by(UsageRecord.recorded_at).all()
+
+        return {
+            "range": range_key,
+            "resolution": resolution.value,
+            "points": [
+                {
+                    "timestamp": r.recorded_at.isoformat(),
+                    "projects": r.projects_count or 0,
+                    "db_size_bytes": r.database_size_bytes or 0,
+                    "storage_bytes": r.storage_bytes or 0,
+                    "api_requests": r.api_requests_count or 0,
+                    "bytes_in": r.bytes_in or 0,
+                    "bytes_out": r.bytes_out or 0,
+                    "avg_latency_ms": (
+                        round((r.api_latency_ms_total or 0) / r.api_requests_count, 2)
+                        if r.api_requests_count else None
+                    ),
+                }
+                for r in records
+            ]
+        }
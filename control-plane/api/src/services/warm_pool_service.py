@@ -0,0 +1,211 @@
+"""
+Warm Pool Service
+
+Keeps a small pool of already-migrated databases in every running shared cluster
+so a new project only has to claim one, rename it and rotate its password
+instead of running CREATE DATABASE and the full Supabase schema on the request path.
+
+Pool databases are named supalove_pool_<hex> with a matching <db_name>_user role,
+created exactly like a project database (see create_migrated_database). Claiming renames both to the project's
+db_name / <db_name>_user; grants follow the role since they are stored by OID.
+"""
+import os
+import uuid
+import secrets as py_secrets
+from datetime import datetime, timedelta
+from typing import Tuple
+from psycopg2 import sql
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core import metrics
+from models.cluster import Cluster, ClusterStatus
+from models.warm_pool_database import WarmPoolDatabase, WarmPoolStatus
+
+WARM_POOL_SIZE = int(os.getenv("WARM_POOL_SIZE", "2"))
+# Databases created per cluster per filler run, to spread the DDL load
+WARM_POOL_FILL_BATCH = int(os.getenv("WARM_POOL_FILL_BATCH", "1"))
+# A pool entry stuck in `creating` this long is assumed abandoned
+WARM_POOL_STALE_SECONDS = int(os.getenv("WARM_POOL_STALE_SECONDS", "600"))
+WARM_POOL_DB_PREFIX = "supalove_pool_"
+
+# Control-plane advisory lock so only one replica fills the pool at a time
+_FILL_LOCK_KEY = 720_032
+
+
+def _cluster_endpoint(cluster: Cluster) -> Tuple[str, int]:
+    from services.shared_provisioning_service import SHARED_POSTGRES_HOST, SHARED_POSTGRES_PORT
+    return cluster.postgres_host or SHARED_POSTGRES_HOST, cluster.postgres_port or SHARED_POSTGRES_PORT
+
+
+def _database_exists(cursor, db_name: str) -> bool:
+    cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", [db_name])
+    return cursor.fetchone() is not None
+
+
+def _drop_pool_database(host: str, port: int, db_name: str):
+    from services.shared_provisioning_service import get_custom_connection
+
+    conn = get_custom_connection(host, port)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = %s AND pid <> pg_backend_pid()",
+            [db_name]
+        )
+        cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(db_name)))
+        cursor.execute(sql.SQL("DROP ROLE IF EXISTS {}").format(sql.Identifier(f"{db_name}_user")))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class WarmPoolService:
+    @staticmethod
+    def claim(db: Session, cluster: Cluster, project_id: str, db_name: str, db_password: str) -> bool:
+        """
+        Turn a ready pool database in `cluster` into `db_name`, owned by `<db_name>_user`
+        with `db_password`. Returns False if no entry could be used, in which case the
+        caller provisions from scratch.
+        """
+        from services.shared_provisioning_service import get_custom_connection
+
+        entry = db.query(WarmPoolDatabase).filter(
+            WarmPoolDatabase.cluster_id == cluster.id,
+            WarmPoolDatabase.status == WarmPoolStatus.ready
+        ).order_by(WarmPoolDatabase.ready_at).with_for_update(skip_locked=True).first()
+        if not entry:
+            db.rollback()
+            return False
+
+        entry.status = WarmPoolStatus.claimed
+        entry.project_id = project_id
+        entry.claimed_at = datetime.utcnow()
+        db.commit()
+
+        host, port = _cluster_endpoint(cluster)
+        conn = get_custom_connection(host, port)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            if _database_exists(cursor, db_name):
+                # Left over from an earlier attempt; let the normal path reuse it
+                raise RuntimeError(f"database {db_name} already exists")
+
+            # RENAME requires that nobody is connected to the pool database
+            cursor.execute(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = %s AND pid <> pg_backend_pid()",
+                [entry.db_name]
+            )
+            cursor.execute(sql.SQL("ALTER DATABASE {} RENAME TO {}").format(
+                sql.Identifier(entry.db_name), sql.Identifier(db_name)
+            ))
+            # Renaming a role clears its password, so rotating it is mandatory
+            cursor.execute(sql.SQL("ALTER ROLE {} RENAME TO {}").format(
+                sql.Identifier(f"{entry.db_name}_user"), sql.Identifier(f"{db_name}_user")
+            ))
+            cursor.execute(
+                sql.SQL("ALTER ROLE {} WITH LOGIN PASSWORD %s").format(sql.Identifier(f"{db_name}_user")),
+                [db_password]
+            )
+        except Exception as e:
+            print(f"[WarmPool] Could not claim {entry.db_name} for {db_name}: {e}")
+            entry.status = WarmPoolStatus.failed
+            entry.last_error = str(e)
+            db.commit()
+            return False
+        finally:
+            cursor.close()
+            conn.close()
+
+        print(f"[WarmPool] Claimed {entry.db_name} as {db_name} in cluster {cluster.id}")
+        return True
+
+    @staticmethod
+    def _create_entry(db: Session, cluster: Cluster):
+        from services.shared_provisioning_service import create_migrated_database
+
+        db_name = f"{WARM_POOL_DB_PREFIX}{uuid.uuid4().hex[:16]}"
+        entry = WarmPoolDatabase(cluster_id=cluster.id, db_name=db_name, status=WarmPoolStatus.creating)
+        db.add(entry)
+        db.commit()
+
+        host, port = _cluster_endpoint(cluster)
+        try:
+            # Placeholder password; replaced when the entry is claimed
+            placeholder_password = py_secrets.token_hex(16)
+            create_migrated_database(db_name, placeholder_password, host=host, port=port)
+        except Exception as e:
+            print(f"[WarmPool] Failed to create {db_name} in cluster {cluster.id}: {e}")
+            entry.status = WarmPoolStatus.failed
+            entry.last_error = str(e)
+            db.commit()
+            return
+
+        entry.status = WarmPoolStatus.ready
+        entry.ready_at = datetime.utcnow()
+        db.commit()
+        print(f"[WarmPool] {db_name} ready in cluster {cluster.id}")
+
+    @staticmethod
+    def _cleanup(db: Session, cluster: Cluster, now: datetime):
+        """Drop failed and abandoned entries, and forget claimed ones."""
+        stale_before = now - timedelta(seconds=WARM_POOL_STALE_SECONDS)
+        broken = db.query(WarmPoolDatabase).filter(
+            WarmPoolDatabase.cluster_id == cluster.id,
+            (WarmPoolDatabase.status == WarmPoolStatus.failed) | (
+                (WarmPoolDatabase.status == WarmPoolStatus.creating) &
+                (WarmPoolDatabase.created_at < stale_before)
+            )
+        ).all()
+
+        host, port = _cluster_endpoint(cluster)
+        for entry in broken:
+            try:
+                _drop_pool_database(host, port, entry.db_name)
+                db.delete(entry)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"[WarmPool] Could not drop {entry.db_name}: {e}")
+
+        db.query(WarmPoolDatabase).filter(
+            WarmPoolDatabase.cluster_id == cluster.id,
+            WarmPoolDatabase.status == WarmPoolStatus.claimed
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def fill(db: Session, now: datetime = None):
+        """Top up every running cluster's pool to WARM_POOL_SIZE ready databases."""
+        if WARM_POOL_SIZE <= 0:
+            return
+
+        now = now or datetime.utcnow()
+        # Session-level lock held on its own connection; the ORM session commits
+        # (and gives its connection back to the pool) many times below
+        lock_conn = db.get_bind().connect()
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _FILL_LOCK_KEY}).scalar():
+            lock_conn.close()
+            return  # Another replica is filling
+        try:
+            clusters = db.query(Cluster).filter(Cluster.status == ClusterStatus.running).all()
+            for cluster in clusters:
+                WarmPoolService._cleanup(db, cluster, now)
+
+                available = db.query(WarmPoolDatabase).filter(
+                    WarmPoolDatabase.cluster_id == cluster.id,
+                    WarmPoolDatabase.status.in_([WarmPoolStatus.ready, WarmPoolStatus.creating])
+                ).count()
+                for _ in range(min(WARM_POOL_SIZE - available, WARM_POOL_FILL_BATCH)):
+                    WarmPoolService._create_entry(db, cluster)
+
+                ready = db.query(WarmPoolDatabase).filter(
+                    WarmPoolDatabase.cluster_id == cluster.id,
+                    WarmPoolDatabase.status == WarmPoolStatus.ready
+                ).count()
+                metrics.supalove_warm_pool_ready.labels(cluster=cluster.id).set(ready)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _FILL_LOCK_KEY})
+            lock_conn.close()
@@ -88,3 +88,45 @@ async def test_dev_upgrade_invalid_plan(client, auth_headers, auth_org):
         headers=auth_headers
     )
     assert resp.status_code == 400
+
+@pytest.mark.asyncio
+async def test_usage_history_rollup(client, auth_headers, auth_org, db):
+    """1m samples roll up into the hourly series served by /usage/history"""
+    from datetime import datetime, timedelta
+    from models.usage_record import UsageRecord, UsageResolution
+    from services.usage_service import UsageService
+
+    hour_start = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    for minute, requests in [(1, 10), (2, 5)]:
+        db.add(UsageRecord(
+            org_id=auth_org.id,
+            resolution=UsageResolution.minute.value,
+            recorded_at=hour_start + timedelta(minutes=minute),
+            projects_count=minute,
+            api_requests_count=requests,
+            sample_count=1
+        ))
+    db.commit()
+
+    UsageService(db).rollup()
+
+    resp = await client.get(
+        f"/api/v1/billing/orgs/{auth_org.id}/usage/history",
+        params={"range": "24h"},
+        headers=auth_headers
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["resolution"] == "1h"
+    point = next(p for p in data["points"] if p["timestamp"] == hour_start.isoformat())
+    assert point["api_requests"] == 15
+    assert point["projects"] == 2
+
+@pytest.mark.asyncio
+async def test_usage_history_invalid_range(client, auth_headers, auth_org):
+    resp = await client.get(
+        f"/api/v1/billing/orgs/{auth_org.id}/usage/history",
+        params={"range": "5y"},
+        headers=auth_headers
+    )
+    assert resp.status_code == 400
@@ -64,10 +64,22 @@ async def test_project_lifecycle(mock_delete, mock_shared_provision, mock_provis
     payload = {"name": test_project_name, "org_id": org_id, "region": "us-east-1"}
     
     resp = await client.post("/api/v1/projects", json=payload, headers=auth_headers)
-    assert resp.status_code == 200, f"Project creation failed: {resp.text}"
+    assert resp.status_code == 202, f"Project creation failed: {resp.text}"
     data = resp.json()
     project_id = data["id"]
-    assert data["api_url"] == MOCK_PROVISION_OUTPUT["api_url"]
+    job_id = data["job_id"]
+
+    # Provisioning is queued; run it the way a worker would
+    from services.provisioning_job_service import ProvisioningJobService
+    job = ProvisioningJobService.claim(db, "test-worker")
+    assert job is not None and job.id == job_id
+    ProvisioningJobService.run(db, job)
+
+    resp = await client.get(f"/api/v1/projects/{project_id}/jobs/{job_id}", headers=auth_headers)
+    assert resp.status_code == 200
+    job_data = resp.json()
+    assert job_data["status"] == "succeeded"
+    assert job_data["result"]["api_url"] == MOCK_PROVISION_OUTPUT["api_url"]
 
     # 4. List Projects
     resp = await client.get(f"/api/v1/projects?org_id={org_id}", headers=auth_headers)
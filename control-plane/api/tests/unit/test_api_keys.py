@@ -0,0 +1,51 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from jose import jwt
+from jose.exceptions import JWTError
+from services.api_key_service import ApiKeyService, decode_project_token, key_hash
+from services.env_projection import env_projector
+from services.secrets_service import apply_secret_changes
+
+@pytest.fixture(autouse=True)
+def no_env_projection(monkeypatch):
+    monkeypatch.setattr(env_projector, "schedule", lambda project_id: None)
+
+def new_project(db):
+    project_id = uuid.uuid4().hex[:12]
+    apply_secret_changes(db, project_id, {"JWT_SECRET": "old-secret"})
+    return project_id
+
+def test_keys_issued_once_and_reused(db):
+    project_id = new_project(db)
+    keys = ApiKeyService.get_keys(db, project_id)
+    assert jwt.decode(keys["anon_key"], "old-secret", algorithms=["HS256"])["role"] == "anon"
+    assert ApiKeyService.get_keys(db, project_id) == keys
+
+def test_rotation_accepts_both_secrets_until_overlap_ends(db):
+    project_id = new_project(db)
+    old = ApiKeyService.get_keys(db, project_id)
+    now = datetime.utcnow()
+
+    rotated = ApiKeyService.rotate_jwt_secret(db, project_id, overlap_seconds=3600, now=now)
+    new = ApiKeyService.get_keys(db, project_id)
+    assert new["anon_key"] == rotated["anon_key"] != old["anon_key"]
+
+    old_token = jwt.encode({"sub": "u1"}, "old-secret", algorithm="HS256")
+    secrets = ApiKeyService.verification_secrets(db, project_id, now=now)
+    assert secrets == [new["jwt_secret"], "old-secret"]
+    assert decode_project_token(old_token, secrets)["sub"] == "u1"
+    assert key_hash(old["anon_key"]) in ApiKeyService.accepted_keys(db, project_id, now=now)["key_hashes"]
+
+    with pytest.raises(ValueError):
+        ApiKeyService.rotate_jwt_secret(db, project_id, now=now)
+
+    later = now + timedelta(hours=2)
+    with pytest.raises(JWTError):
+        decode_project_token(old_token, ApiKeyService.verification_secrets(db, project_id, now=later))
+    assert ApiKeyService.accepted_keys(db, project_id, now=later)["key_hashes"] == [
+        key_hash(new["anon_key"]), key_hash(new["service_role_key"])
+    ]
+
+    assert ApiKeyService.expire_previous(db, now=later) >= 1
+    assert ApiKeyService.verification_secrets(db, project_id) == [new["jwt_secret"]]
@@ -0,0 +1,60 @@
+import asyncio
+from services.container_registry import ContainerRegistry
+from services.docker_engine import DockerEngineError
+
+def listed(container_id, name, project, service, state="running", status="Up 1 minute"):
+    return {
+        "Id": container_id,
+        "Names": [f"/{name}"],
+        "State": state,
+        "Status": status,
+        "Labels": {"com.docker.compose.project": project, "com.docker.compose.service": service},
+    }
+
+class FakeEngine:
+    def __init__(self, listing, inspected=None):
+        self.listing = listing
+        self.inspected = inspected or {}
+
+    async def list_containers(self, labels):
+        return self.listing
+
+    async def inspect(self, container_id):
+        if container_id not in self.inspected:
+            raise DockerEngineError("No such container")
+        return self.inspected[container_id]
+
+def test_lookups_and_event_updates():
+    engine = FakeEngine([
+        listed("pg", "supalove_shared_postgres", "shared", "shared-postgres", status="Up 5 minutes (healthy)"),
+        listed("p1-db", "abc-postgres-1", "abc", "postgres"),
+        listed("p1-api", "abc-api-1", "abc", "api", state="exited", status="Exited (1)"),
+    ])
+    registry = ContainerRegistry()
+    changes = []
+    registry.on_change(lambda: changes.append(1))
+
+    async def run():
+        await registry._relist(engine)
+        assert registry.ready
+        assert [c["id"] for c in registry.find(name="supalove_shared_postgres")] == ["pg"]
+        assert registry.find(name="supalove_shared_postgres")[0]["health"] == "healthy"
+        assert {c["id"] for c in registry.project_containers("abc")} == {"p1-db", "p1-api"}
+        assert [c["id"] for c in registry.find(compose_project="abc")] == ["p1-db"]
+
+        engine.inspected["p1-api"] = {
+            "Id": "p1-api", "Name": "/abc-api-1",
+            "State": {"Status": "running"},
+            "Config": {"Labels": {"com.docker.compose.project": "abc", "com.docker.compose.service": "api"}},
+        }
+        await registry._apply_event(engine, {"id": "p1-api", "Action": "start"})
+        assert registry.get("p1-api")["state"] == "running"
+
+        await registry._apply_event(engine, {"id": "pg", "Action": "health_status: unhealthy"})
+        assert registry.get("pg")["health"] == "unhealthy"
+
+        await registry._apply_event(engine, {"id": "p1-db", "Action": "destroy"})
+        assert {c["id"] for c in registry.project_containers("abc")} == {"p1-api"}
+
+    asyncio.run(run())
+    assert len(changes) == 4
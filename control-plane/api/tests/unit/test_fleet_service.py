@@ -0,0 +1,84 @@
+import threading
+from services.fleet_service import FleetExecutor, SUCCEEDED, FAILED, TIMEOUT, SKIPPED
+
+class FakeCursor:
+    def execute(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self):
+        self.autocommit = False
+        self.committed = False
+        self.cancelled = threading.Event()
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        pass
+
+def targets(*names, cluster_id="c1"):
+    return [{"project_id": n, "org_id": "o1", "cluster_id": cluster_id, "db_name": n,
+             "host": "localhost", "port": 5432} for n in names]
+
+def test_report_collects_results_per_cluster():
+    def task(conn, target):
+        if target["db_name"] == "bad":
+            raise RuntimeError("boom")
+        return {"ok": target["db_name"]}
+
+    executor = FleetExecutor(task, task_id="t", connect=lambda target: FakeConnection())
+    report = executor.run(targets("a", "bad") + targets("b", cluster_id="c2"))
+
+    assert report["totals"] == {SUCCEEDED: 2, FAILED: 1, TIMEOUT: 0, SKIPPED: 0}
+    assert {r["db_name"] for r in report["clusters"]["c1"]} == {"a", "bad"}
+    failed = next(r for r in report["clusters"]["c1"] if r["db_name"] == "bad")
+    assert failed["error"] == "boom"
+
+def test_timeout_cancels_running_task():
+    def task(conn, target):
+        # Behaves like a query interrupted by pg_cancel
+        if not conn.cancelled.wait(5):
+            return None
+        raise RuntimeError("canceling statement due to user request")
+
+    executor = FleetExecutor(task, task_id="t", timeout_seconds=0.05,
+                             connect=lambda target: FakeConnection())
+    result = executor.run(targets("slow"))["clusters"]["c1"][0]
+    assert result["status"] == TIMEOUT
+
+def test_journal_resumes_after_successes(tmp_path):
+    journal = str(tmp_path / "run.jsonl")
+    calls = []
+
+    def task(conn, target):
+        calls.append(target["db_name"])
+        if target["db_name"] == "b" and len(calls) <= 2:
+            raise RuntimeError("transient")
+
+    executor = FleetExecutor(task, task_id="t", concurrency=1, journal_path=journal,
+                             connect=lambda target: FakeConnection())
+    first = executor.run(targets("a", "b"))
+    assert first["totals"][FAILED] == 1
+
+    second = executor.run(targets("a", "b"))
+    assert second["totals"][SKIPPED] == 1
+    assert second["totals"][SUCCEEDED] == 1
+    assert calls == ["a", "b", "b"]
+
+    # A different task does not reuse the journal entries
+    other = FleetExecutor(task, task_id="other", journal_path=journal,
+                          connect=lambda target: FakeConnection())
+    assert other.run(targets("a"))["totals"][SKIPPED] == 0
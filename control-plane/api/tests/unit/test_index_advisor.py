@@ -0,0 +1,76 @@
+from services.index_advisor_service import seq_scans, recommend
+
+PLAN = {
+    "Plan": {
+        "Node Type": "Sort",
+        "Plans": [{
+            "Node Type": "Seq Scan",
+            "Relation Name": "todos",
+            "Filter": "((user_id = 42) AND ((status)::text = 'open'::text) AND (created_at > '2026-01-01'::date))",
+            "Plan Rows": 12,
+            "Total Cost": 18334.0,
+        }],
+    }
+}
+
+def index(name, columns, idx_scan=10, constraint_backed=False, opclasses=None, bytes=8192):
+    return {
+        "table": "todos", "index": name, "idx_scan": idx_scan, "bytes": bytes,
+        "constraint_backed": constraint_backed, "method": "btree", "columns": columns,
+        "opclasses": opclasses or " ".join("3124" for _ in columns),
+        "expressions": None, "predicate": None, "definition": "",
+    }
+
+def test_seq_scan_filters_become_index_columns():
+    assert seq_scans(PLAN) == [{"table": "todos", "columns": ["user_id", "status", "created_at"], "rows": 12, "cost": 18334.0}]
+
+def test_recommendations():
+    tables = [
+        {"table": "todos", "seq_scan": 500, "seq_tup_read": 50_000_000, "idx_scan": 20, "n_live_tup": 100_000, "writes": 7000, "bytes": 1 << 26},
+        {"table": "events", "seq_scan": 300, "seq_tup_read": 90_000_000, "idx_scan": 1, "n_live_tup": 300_000, "writes": 100, "bytes": 1 << 27},
+        {"table": "tiny", "seq_scan": 9000, "seq_tup_read": 90_000, "idx_scan": 0, "n_live_tup": 10, "writes": 0, "bytes": 8192},
+    ]
+    indexes = [
+        index("todos_pkey", ["id"], constraint_backed=True),
+        index("todos_user_idx", ["user_id"], idx_scan=3),                     # Prefix of todos_user_created_idx
+        index("todos_user_created_idx", ["user_id", "created_at"], idx_scan=90),
+        index("todos_title_idx", ["title"], idx_scan=0, bytes=1 << 20),      # Unused
+        index("todos_id_copy_idx", ["id"], idx_scan=0, bytes=4096),          # Duplicates the primary key
+    ]
+    scans = seq_scans(PLAN)
+    scans = [dict(s, calls=40, total_ms=52000.0) for s in scans] + [
+        {"table": "todos", "columns": ["user_id"], "rows": 1, "cost": 1.0, "calls": 5, "total_ms": 900.0},  # Already indexed
+        {"table": "tiny", "columns": ["name"], "rows": 1, "cost": 1.0, "calls": 99, "total_ms": 9000.0},  # Too small to matter
+    ]
+
+    recommendations = recommend(tables, indexes, scans)
+    by_action = {}
+    for r in recommendations:
+        by_action.setdefault(r["action"], []).append(r)
+
+    [create] = by_action["create"]
+    assert create["columns"] == ["user_id", "status", "created_at"]
+    assert create["sql"] == 'CREATE INDEX CONCURRENTLY ON public."todos" ("user_id", "status", "created_at")'
+    assert create["estimated_benefit"]["slow_query_ms"] == 52000.0
+
+    assert [r["table"] for r in by_action["review"]] == ["events"]
+
+    drops = {r["index"]: r["reason"] for r in by_action["drop"]}
+    assert set(drops) == {"todos_user_idx", "todos_title_idx", "todos_id_copy_idx"}
+    assert "todos_user_created_idx" in drops["todos_user_idx"]
+    assert "todos_pkey" in drops["todos_id_copy_idx"]
+
+def test_parameterized_slow_queries_are_skipped_and_counted(db):
+    from datetime import datetime
+    from models.slow_query import SlowQuery
+    from services.index_advisor_service import IndexAdvisorService
+
+    project_id = "0123456789ab"
+    for pid, statement in enumerate(["SELECT * FROM todos WHERE user_id = 42", "SELECT * FROM todos WHERE user_id = $1",
+                      "SELECT * FROM todos WHERE user_id = $1", "WITH pgrst_source AS (SELECT * FROM todos WHERE id = $2) SELECT 1"]):
+        db.add(SlowQuery(project_id=project_id, occurred_at=datetime.utcnow(), pid=pid, duration_ms=1500.0, statement=statement))
+    db.flush()
+
+    statements, skipped = IndexAdvisorService._slow_statements(db, project_id)
+    assert [s["statement"] for s in statements] == ["SELECT * FROM todos WHERE user_id = 42"]
+    assert skipped == 2
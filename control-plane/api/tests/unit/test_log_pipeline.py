@@ -0,0 +1,132 @@
+import asyncio
+from services.docker_engine import demux_lines
+from services.log_pipeline import parse_line, postgres_entry, LogStore, LogSubscriptions, LogViewer
+from services.postgres_logs import PostgresLogAssembler, slow_query
+
+PROJECT = "0123456789ab"
+
+def test_parse_attributes_shared_lines_to_projects():
+    pg = parse_line(
+        f"2026-01-01T10:00:00.123456789Z 2026-01-01 10:00:00 UTC [42] project_{PROJECT}_user@project_{PROJECT} ERROR:  relation \"x\" does not exist",
+        "database", None, set()
+    )
+    assert pg["project_id"] == PROJECT
+    assert pg["level"] == "error"
+    assert pg["message"].startswith("2026-01-01 10:00:00 UTC")
+
+    gateway = parse_line(f'2026-01-01T10:00:01Z INFO: 10.0.0.1 - "GET /{PROJECT}/rest/v1/todos HTTP/1.1" 200', "api", None, {PROJECT})
+    assert gateway["project_id"] == PROJECT
+    assert gateway["level"] == "info"
+
+    other = parse_line('2026-01-01T10:00:02Z {"level":"warning","msg":"rate limited"}', "auth", None, {PROJECT})
+    assert other["project_id"] is None
+    assert other["level"] == "warning"
+
+def test_postgres_records_routed_by_database_and_slow_queries_extracted():
+    prefix = "2026-01-01 10:00:00.123 UTC [77] db=project_%s,user=project_%s_user,app=PostgREST " % (PROJECT, PROJECT)
+    assembler = PostgresLogAssembler(max_chars=1000)
+    records = []
+    for ts, line in [
+        (1.0, prefix + "LOG:  duration: 1532.904 ms  statement: SELECT *"),
+        (1.1, "\tFROM todos"),
+        (2.0, prefix + "ERROR:  division by zero"),
+        (2.0, prefix + "STATEMENT:  SELECT 1/0"),
+        (3.0, "2026-01-01 10:00:03.000 UTC [9] db=,user=,app= LOG:  checkpoint starting: time"),
+    ]:
+        records += assembler.feed(ts, line)
+    records += assembler.flush()
+    assert len(records) == 3
+
+    entries = [postgres_entry(r, "database", None, set()) for r in records]
+    assert [e["project_id"] for e in entries] == [PROJECT, PROJECT, None]
+    assert [e["level"] for e in entries] == ["info", "error", "info"]
+    assert entries[1]["message"].endswith("STATEMENT:  SELECT 1/0")
+
+    row = slow_query(records[0], PROJECT)
+    assert row["duration_ms"] == 1532.904 and row["pid"] == 77
+    assert row["statement"] == "SELECT *\nFROM todos"
+    assert row["user_name"] == f"project_{PROJECT}_user" and row["application"] == "PostgREST"
+    assert slow_query(records[1], PROJECT) is None
+
+def test_store_filters_and_paginates_newest_first():
+    store = LogStore(size=100)
+    for i in range(5):
+        store.append({"timestamp": 1000.0 + i, "project_id": PROJECT, "service": "database", "level": "info", "message": f"db {i}"})
+        store.append({"timestamp": 1000.5 + i, "project_id": PROJECT, "service": "auth", "level": "error" if i % 2 else "info", "message": f"auth {i}"})
+    store.append({"timestamp": 2000.0, "project_id": "other", "service": "database", "level": "info", "message": "not mine"})
+
+    page, cursor = store.query(PROJECT, limit=4)
+    assert [e["message"] for e in page] == ["auth 4", "db 4", "auth 3", "db 3"]
+    page, cursor = store.query(PROJECT, before=cursor, limit=4)
+    assert [e["message"] for e in page] == ["auth 2", "db 2", "auth 1", "db 1"]
+    page, cursor = store.query(PROJECT, before=cursor, limit=4)
+    assert [e["message"] for e in page] == ["auth 0", "db 0"] and cursor is None
+
+    errors, _ = store.query(PROJECT, min_level="error")
+    assert [e["message"] for e in errors] == ["auth 3", "auth 1"]
+    window, _ = store.query(PROJECT, service="database", since=1001.0, until=1003.0)
+    assert [e["message"] for e in window] == ["db 3", "db 2", "db 1"]
+
+def test_demux_splits_frames_into_lines():
+    def frame(stream, data):
+        return bytes([stream, 0, 0, 0]) + len(data).to_bytes(4, "big") + data
+
+    raw = frame(1, b"hello\nwor") + frame(2, b"oops\n") + frame(1, b"ld\n")
+
+    async def collect():
+        async def chunks():
+            for i in range(0, len(raw), 3):
+                yield raw[i:i + 3]
+        return [line async for line in demux_lines(chunks(), tty=False)]
+
+    assert asyncio.run(collect()) == ["hello", "oops", "world"]
+
+def test_viewers_share_entries_and_record_gaps_when_full():
+    subscriptions = LogSubscriptions()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        errors_only = subscriptions.subscribe(LogViewer(PROJECT, loop, min_level="error", queue_size=10))
+        slow = subscriptions.subscribe(LogViewer(PROJECT, loop, queue_size=2))
+
+        def publish():
+            for i in range(1, 6):
+                subscriptions.publish({"id": i, "timestamp": 0.0, "project_id": PROJECT, "service": "auth",
+                                       "level": "error" if i == 4 else "info", "message": f"line {i}"})
+        await asyncio.to_thread(publish)
+        await asyncio.sleep(0.05)
+
+        assert [errors_only.queue.get_nowait()["id"]] == [4] and errors_only.queue.empty()
+        assert [slow.queue.get_nowait()["id"], slow.queue.get_nowait()["id"]] == [1, 2]
+        assert slow.gaps_before(6) == [{"from_id": 3, "to_id": 5, "count": 3}]
+
+        subscriptions.unsubscribe(errors_only)
+        subscriptions.unsubscribe(slow)
+        assert subscriptions.viewer_count(PROJECT) == 0
+
+    asyncio.run(run())
+
+def test_stream_resumes_only_from_its_own_event_ids():
+    store = LogStore(size=10)
+    entry = {"timestamp": 1000.0, "project_id": PROJECT, "service": "database", "level": "info", "message": "x"}
+    store.append(entry)
+    assert store.resume_after(store.event_id(entry)) == entry["id"]
+
+    # Issued by another process or before a restart, or newer than anything stored
+    restarted = LogStore(size=10)
+    assert restarted.resume_after(store.event_id(entry)) is None
+    assert store.resume_after(f"{store.epoch}-{entry['id'] + 1}") is None
+    assert store.resume_after(str(entry["id"])) is None
+    assert store.resume_after(None) is None
+
+def test_slow_queries_seen_twice_are_stored_once(db):
+    from datetime import datetime
+    from models.slow_query import SlowQuery
+    from services.slow_query_service import SlowQueryService
+
+    row = {"project_id": PROJECT, "occurred_at": datetime(2026, 1, 1, 10), "duration_ms": 1532.9, "pid": 77,
+           "database": f"project_{PROJECT}", "user_name": None, "application": None, "statement": "SELECT *"}
+    # Another API process, or this one after a restart, reads the same record
+    assert SlowQueryService.record(db, [row]) == 1
+    assert SlowQueryService.record(db, [row, dict(row, pid=78)]) == 1
+    assert db.query(SlowQuery).filter(SlowQuery.project_id == PROJECT).count() == 2
@@ -0,0 +1,10 @@
+import pytest
+from fastapi import HTTPException
+import api.v1.metering as metering
+
+def test_non_ascii_token_is_rejected_not_an_error(monkeypatch):
+    monkeypatch.setattr(metering, "METERING_TOKEN", "secret")
+    with pytest.raises(HTTPException) as exc:
+        metering.verify_metering_token("sécret")
+    assert exc.value.status_code == 401
+    metering.verify_metering_token("secret")
@@ -0,0 +1,14 @@
+import pytest
+from prometheus_client import generate_latest
+
+@pytest.mark.asyncio
+async def test_metrics_use_route_template_labels(client):
+    await client.get("/api/v1/projects/some-project-id/tables")
+    await client.get("/this/path/does/not/exist")
+
+    body = generate_latest().decode()
+    # Raw IDs must never become label values
+    assert "some-project-id" not in body
+    assert 'endpoint="/api/v1/projects/{project_id}/tables"' in body
+    assert 'endpoint="<unmatched>"' in body
+    assert "http_requests_in_progress" in body
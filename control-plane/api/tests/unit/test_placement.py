@@ -0,0 +1,46 @@
+from services.placement_service import score_candidates
+
+def candidate(cluster_id, **overrides):
+    data = {
+        "cluster_id": cluster_id,
+        "db_count": 0,
+        "active_connections": 0,
+        "max_connections": 100,
+        "db_bytes": 0,
+        "cpu_percent": 0.0,
+        "max_databases": 100,
+        "org_counts": {},
+    }
+    data.update(overrides)
+    return data
+
+def test_least_loaded_cluster_wins():
+    ranked = score_candidates([
+        candidate("busy", db_count=80, active_connections=60, cpu_percent=50.0),
+        candidate("idle", db_count=10, active_connections=5, cpu_percent=5.0),
+    ], org_id="org-1")
+    assert ranked[0]["cluster_id"] == "idle"
+    assert ranked[0]["score"] < ranked[1]["score"]
+
+def test_capped_clusters_are_excluded():
+    ranked = score_candidates([
+        candidate("full", db_count=100),
+        candidate("saturated", active_connections=95),
+    ], org_id="org-1")
+    assert [r["excluded"] for r in ranked] == ["databases", "connections"]
+
+def test_org_projects_are_spread_across_clusters():
+    ranked = score_candidates([
+        candidate("a", db_count=10, org_counts={"org-1": 5}),
+        candidate("b", db_count=12, org_counts={"org-2": 12}),
+    ], org_id="org-1")
+    assert ranked[0]["cluster_id"] == "b"
+    assert ranked[1]["org_projects"] == 5
+
+def test_estimated_cpu_does_not_block_placement():
+    # cluster_usage.cpu_percent grows with the project count; it must not cap a cluster far below its database cap
+    ranked = score_candidates([
+        candidate("shared", db_count=300, max_databases=500, cpu_percent=170.0),
+    ], org_id="org-1")
+    assert "excluded" not in ranked[0]
+    assert ranked[0]["components"]["databases"] == 0.6
@@ -0,0 +1,28 @@
+import uuid
+from services.port_allocator import PortAllocator, PORT_RANGES
+
+NAMES = ["DB_PORT", "REST_PORT", "GATEWAY_PORT"]
+
+def test_allocates_distinct_ports_in_range(db):
+    first = PortAllocator.allocate(db, "project", uuid.uuid4().hex, NAMES)
+    second = PortAllocator.allocate(db, "project", uuid.uuid4().hex, NAMES)
+
+    low, high = PORT_RANGES["project"]
+    ports = list(first.values()) + list(second.values())
+    assert len(set(ports)) == len(ports)
+    assert all(low <= port <= high for port in ports)
+
+def test_allocation_is_idempotent_per_owner(db):
+    owner = uuid.uuid4().hex
+    first = PortAllocator.allocate(db, "cluster", owner, ["POSTGRES_PORT"])
+    again = PortAllocator.allocate(db, "cluster", owner, ["POSTGRES_PORT", "GATEWAY_PORT"])
+
+    assert again["POSTGRES_PORT"] == first["POSTGRES_PORT"]
+    assert again["GATEWAY_PORT"] != first["POSTGRES_PORT"]
+
+def test_release_frees_ports(db):
+    owner = uuid.uuid4().hex
+    PortAllocator.allocate(db, "project", owner, NAMES)
+
+    assert PortAllocator.release(db, "project", owner) == len(NAMES)
+    assert PortAllocator.get_ports(db, "project", owner) == {}
@@ -0,0 +1,82 @@
+import pytest
+from services.project_migration_service import (
+    load_migrations,
+    _pending,
+    migrate_connection,
+    MigrationError,
+    LEGACY_MIGRATIONS_TABLE,
+    MIGRATIONS_TABLE_SQL,
+    PROJECT_MIGRATIONS_DIR,
+)
+
+def test_shipped_migrations_are_valid():
+    migrations = load_migrations(PROJECT_MIGRATIONS_DIR)
+    assert migrations, "expected at least the baseline migration"
+    versions = [m["version"] for m in migrations]
+    assert versions == sorted(versions)
+    assert migrations[0]["name"] == "supabase_baseline"
+
+def test_pending_skips_applied_and_rejects_edited(tmp_path):
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "0002_second.sql").write_text("SELECT 2;")
+    migrations = load_migrations(tmp_path)
+
+    applied = {1: migrations[0]["checksum"]}
+    assert [m["version"] for m in _pending(migrations, applied)] == [2]
+
+    with pytest.raises(MigrationError):
+        _pending(migrations, {1: "edited"})
+
+def test_invalid_filename_rejected(tmp_path):
+    (tmp_path / "first.sql").write_text("SELECT 1;")
+    with pytest.raises(MigrationError):
+        load_migrations(tmp_path)
+
+class FakeCursor:
+    """Answers the runner's queries for a database whose records are still in public."""
+    def __init__(self, applied):
+        self.applied = applied
+        self.executed = []
+        self._result = None
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        if query.startswith("SELECT to_regclass"):
+            self._result = [(params[0] if params[0] == LEGACY_MIGRATIONS_TABLE else None,)]
+        elif query.startswith("SELECT version, checksum"):
+            self._result = list(self.applied.items())
+        elif "pg_try_advisory_lock" in query:
+            self._result = [(True,)]
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+def test_legacy_records_are_moved_out_of_public(tmp_path):
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    migrations = load_migrations(tmp_path)
+    cursor = FakeCursor({1: migrations[0]["checksum"]})
+
+    result = migrate_connection(FakeConnection(cursor), "project_x", migrations=migrations)
+    assert result["error"] is None and result["applied"] == []
+    # Nothing was pending, but the exposed table still gets moved
+    assert MIGRATIONS_TABLE_SQL in cursor.executed
+    assert "supalove.migrations" in MIGRATIONS_TABLE_SQL and "GRANT" not in MIGRATIONS_TABLE_SQL
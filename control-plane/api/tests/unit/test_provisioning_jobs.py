@@ -0,0 +1,24 @@
+import uuid
+from models.project import Project, ProjectStatus, ProjectPlan
+from models.provisioning_job import ProvisioningJobKind, ProvisioningJobStatus
+from services.provisioning_job_service import ProvisioningJobService
+from services.project_service import run_shared_provisioning
+
+def test_project_deleted_before_provisioning_is_not_recreated(db, monkeypatch):
+    project = Project(id=uuid.uuid4().hex[:12], name="gone", plan=ProjectPlan.shared, status=ProjectStatus.CREATING)
+    db.add(project)
+    db.flush()
+    job = ProvisioningJobService.enqueue(db, project.id, ProvisioningJobKind.provision_shared)
+
+    created = []
+    monkeypatch.setattr("services.project_service.provision_shared_project", lambda *args: created.append(args))
+    monkeypatch.setattr("services.shared_provisioning_service.delete_shared_project", lambda project: None)
+    from services.project_service import delete_project
+    delete_project(db, project.id)
+
+    assert job.status == ProvisioningJobStatus.failed
+    assert job.last_error == "Project deleted"
+    # A job a worker already claimed finds the project gone
+    assert run_shared_provisioning(db, project.id, {}) == {"status": "deleted"}
+    assert created == []
+    assert project.status == ProjectStatus.DELETED
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+import services.provisioning_local as provisioning_local
+from services.provisioning_local import LocalProvisioner, PROJECT_ROOT, compose_service_variables, write_env_file
+
+class FakeEngine:
+    def __init__(self, states):
+        self.states = states
+
+    async def inspect(self, container_id):
+        return self.states[container_id]
+
+def events(items):
+    async def iterate():
+        for item in items:
+            yield item
+        await asyncio.sleep(60)  # Stream stays open like the daemon's
+    return iterate()
+
+def wait(states, containers, items):
+    provisioner = LocalProvisioner()
+    return asyncio.run(asyncio.wait_for(
+        provisioner._wait_until_healthy(FakeEngine(states), containers, events(items)), 2
+    ))
+
+def test_waits_for_healthchecks_and_restarts():
+    states = {
+        "pg": {"Config": {"Healthcheck": {"Test": ["CMD", "pg_isready"]}}, "State": {"Running": True, "Health": {"Status": "starting"}}},
+        "api": {"Config": {}, "State": {"Running": False}},
+    }
+    wait(states, {"postgres": "pg", "api": "api"}, [
+        {"id": "api", "Action": "start"},
+        {"id": "api", "Action": "die"},
+        {"id": "pg", "Action": "health_status: healthy"},
+        {"id": "api", "Action": "start"},
+    ])
+
+def test_times_out_while_a_container_is_down():
+    states = {"api": {"Config": {}, "State": {"Running": False}}}
+    with pytest.raises(asyncio.TimeoutError):
+        wait(states, {"api": "api"}, [{"id": "api", "Action": "die"}])
+
+def test_returns_when_already_up():
+    states = {"gw": {"Config": {}, "State": {"Running": True}}}
+    wait(states, {"gateway": "gw"}, [])
+
+def test_env_file_rewritten_only_on_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(provisioning_local, "BASE_PROJECTS_DIR", tmp_path)
+    env_file = tmp_path / "p1" / ".env"
+
+    assert write_env_file("p1", {"DB_PORT": "5500", "CUSTOM": "a"}) == {"PROJECT_ID", "DB_PORT", "CUSTOM"}
+    written_at = env_file.stat().st_mtime_ns
+    assert write_env_file("p1", {"DB_PORT": "5500", "CUSTOM": "a"}) == set()
+    assert env_file.stat().st_mtime_ns == written_at
+
+    assert write_env_file("p1", {"DB_PORT": "5501"}) == {"DB_PORT", "CUSTOM"}
+    assert "DB_PORT=5501\n" in env_file.read_text()
+    assert [p.name for p in env_file.parent.iterdir()] == [".env"]  # No temp files left behind
+
+def test_compose_services_using_a_key():
+    variables = compose_service_variables(PROJECT_ROOT / "data-plane" / "project-template" / "docker-compose.yml")
+    assert "GATEWAY_PORT" in variables["gateway"]
+    assert "JWT_SECRET" not in variables["gateway"]
+    assert {s for s, keys in variables.items() if "SECRET_KEY_BASE" in keys} == {"realtime"}
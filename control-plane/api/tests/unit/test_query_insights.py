@@ -0,0 +1,84 @@
+import uuid
+from datetime import datetime, timedelta
+from models.query_stat import QueryStat
+from services.query_insights_service import QueryInsightsService, compute_deltas
+
+def test_deltas_between_snapshots():
+    previous = {
+        ("project_a", 10, 1, True): (100, 500.0, 100, 90, 10),
+        ("project_a", 10, 2, True): (5, 50.0, 5, 5, 0),
+        ("project_a", 10, 3, True): (40, 400.0, 40, 40, 0),
+    }
+    current = {
+        ("project_a", 10, 1, True): (130, 800.0, 130, 120, 10),  # Ran 30 more times
+        ("project_a", 10, 2, True): (5, 50.0, 5, 5, 0),          # Idle
+        ("project_a", 10, 3, True): (4, 20.0, 4, 4, 0),          # Evicted and re-added
+        ("project_a", 10, 4, True): (2, 8.0, 2, 1, 1),           # New
+    }
+    assert compute_deltas(previous, current) == {
+        ("project_a", 10, 1, True): (30, 300.0, 30, 30, 0),
+        ("project_a", 10, 3, True): (4, 20.0, 4, 4, 0),
+        ("project_a", 10, 4, True): (2, 8.0, 2, 1, 1),
+    }
+
+def test_top_queries_over_range(db):
+    project_id = uuid.uuid4().hex[:12]
+    now = datetime.utcnow()
+
+    def stat(queryid, calls, total_ms, rows, age):
+        db.add(QueryStat(project_id=project_id, cluster_id="c", bucket_at=now - age, queryid=queryid,
+                         query=f"SELECT {queryid}", calls=calls, total_time_ms=total_ms, rows=rows,
+                         shared_blks_hit=9, shared_blks_read=1))
+
+    stat(1, 1000, 2000.0, 1000, timedelta(minutes=5))   # Frequent and cheap
+    stat(1, 1000, 2000.0, 1000, timedelta(minutes=10))
+    stat(2, 2, 3000.0, 200000, timedelta(minutes=5))    # Rare and slow
+    stat(3, 50, 9000.0, 50, timedelta(days=2))          # Outside 24h
+    db.flush()
+
+    by_total = QueryInsightsService.top_queries(db, project_id, order_by="total_time", now=now)
+    assert [q["queryid"] for q in by_total["queries"]] == ["1", "2"]
+    assert by_total["totals"] == {"calls": 2002, "total_time_ms": 7000.0}
+    assert by_total["queries"][0]["calls"] == 2000 and by_total["queries"][0]["mean_time_ms"] == 2.0
+
+    by_mean = QueryInsightsService.top_queries(db, project_id, order_by="mean_time", now=now)
+    assert [q["queryid"] for q in by_mean["queries"]] == ["2", "1"]
+    assert by_mean["queries"][0]["cache_hit_ratio"] == 0.9
+
+    by_rows = QueryInsightsService.top_queries(db, project_id, range_key="7d", order_by="rows", now=now)
+    assert [q["queryid"] for q in by_rows["queries"]] == ["2", "1", "3"]
+
+def test_only_the_lock_holder_collects(monkeypatch):
+    class Result:
+        def scalar(self):
+            return False  # Another API process is the collector
+
+    class Connection:
+        closed = False
+        def execution_options(self, **options):
+            return self
+        def execute(self, statement):
+            return Result()
+        def close(self):
+            self.closed = True
+
+    class Engine:
+        class dialect:
+            name = "postgresql"
+        def __init__(self):
+            self.engine = self
+            self.connection = Connection()
+        def connect(self):
+            return self.connection
+
+    class Db:
+        engine = Engine()
+        def get_bind(self):
+            return self.engine
+        def query(self, *args):
+            raise AssertionError("collected without the lock")
+
+    monkeypatch.setattr("services.query_insights_service._collector_conn", None)
+    db = Db()
+    assert QueryInsightsService.collect(db) == 0
+    assert db.engine.connection.closed
@@ -0,0 +1,51 @@
+import pytest
+from services.query_plan import analyze_plan, split_single_statement
+
+EXPLAIN = [{
+    "Plan": {
+        "Node Type": "Hash Join", "Join Type": "Inner", "Hash Cond": "(t.user_id = u.id)",
+        "Plan Rows": 10, "Actual Rows": 4800, "Actual Loops": 1, "Actual Total Time": 95.0, "Actual Startup Time": 2.0,
+        "Shared Hit Blocks": 120, "Shared Read Blocks": 900,
+        "Plans": [
+            {
+                "Node Type": "Seq Scan", "Relation Name": "todos", "Alias": "t", "Parent Relationship": "Outer",
+                "Filter": "(done = false)", "Rows Removed by Filter": 95000,
+                "Plan Rows": 5000, "Actual Rows": 5000, "Actual Loops": 1, "Actual Total Time": 80.0,
+                "Shared Hit Blocks": 100, "Shared Read Blocks": 900,
+            },
+            {
+                "Node Type": "Hash", "Parent Relationship": "Inner", "Hash Batches": 1,
+                "Plan Rows": 50, "Actual Rows": 50, "Actual Loops": 1, "Actual Total Time": 1.0,
+                "Plans": [{
+                    "Node Type": "Index Scan", "Relation Name": "users", "Index Name": "users_pkey",
+                    "Plan Rows": 50, "Actual Rows": 50, "Actual Loops": 1, "Actual Total Time": 0.9,
+                }],
+            },
+        ],
+    },
+    "Planning Time": 0.4,
+    "Execution Time": 96.0,
+}]
+
+def test_plan_tree_timings_and_flags():
+    analysis = analyze_plan(EXPLAIN)
+    root = analysis["plan"]
+    scan, hash_node = root["children"]
+
+    assert [root["id"], scan["id"], hash_node["id"], hash_node["children"][0]["id"]] == [1, 2, 3, 4]
+    assert root["self_ms"] == 14.0 and scan["self_ms"] == 80.0
+    assert root["estimate_factor"] == 480.0 and scan["estimate_factor"] == 1.0
+    assert scan["buffers"]["shared_read"] == 900
+
+    kinds = {(f["node_id"], f["kind"]) for f in analysis["flags"]}
+    assert kinds == {(1, "bad_join_estimate"), (2, "seq_scan_large"), (2, "hotspot")}
+    assert analysis["top_nodes"][0]["node_id"] == 2
+    assert analysis["execution_ms"] == 96.0
+
+def test_single_statement_only():
+    assert split_single_statement("SELECT ';' -- ; \n;  ") == "SELECT ';' -- ;"
+    assert split_single_statement("select $$;$$, 'it''s;';") == "select $$;$$, 'it''s;'"
+    assert split_single_statement("SELECT $a$x;$a$ AS y$1") == "SELECT $a$x;$a$ AS y$1"
+    for sql in ["SELECT 1; COMMIT", "SELECT E'\\''; COMMIT; --'", "SELECT 1 AS x$a$; COMMIT; DROP TABLE t; SELECT 1 AS y$a$", "  ;  "]:
+        with pytest.raises(ValueError):
+            split_single_statement(sql)
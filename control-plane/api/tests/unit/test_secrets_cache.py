@@ -0,0 +1,46 @@
+import uuid
+from prometheus_client import REGISTRY
+from models.project_secret import ProjectSecret
+from services.secrets_cache import secrets_cache, secrets_changed
+
+def lookups(result):
+    return REGISTRY.get_sample_value("supalove_secrets_cache_requests_total", {"result": result}) or 0
+
+def test_second_lookup_is_a_hit(db):
+    project_id = uuid.uuid4().hex[:12]
+    db.add(ProjectSecret(project_id=project_id, key="DB_PORT", value="5435"))
+    db.flush()
+
+    hits, misses = lookups("hit"), lookups("miss")
+    assert secrets_cache.get(db, project_id)[1] == {"DB_PORT": "5435"}
+    assert secrets_cache.get(db, project_id)[1] == {"DB_PORT": "5435"}
+    assert (lookups("hit") - hits, lookups("miss") - misses) == (1, 1)
+
+def test_invalidation_bumps_version(db):
+    project_id = uuid.uuid4().hex[:12]
+    db.add(ProjectSecret(project_id=project_id, key="DB_PORT", value="5435"))
+    db.flush()
+    version, _ = secrets_cache.get(db, project_id)
+
+    db.query(ProjectSecret).filter(ProjectSecret.project_id == project_id).update({"value": "6000"})
+    db.flush()
+    secrets_cache.invalidate(project_id)
+
+    new_version, secrets = secrets_cache.get(db, project_id)
+    assert new_version > version
+    assert secrets == {"DB_PORT": "6000"}
+
+def test_uncommitted_changes_bypass_the_cache(db):
+    project_id = uuid.uuid4().hex[:12]
+    db.add(ProjectSecret(project_id=project_id, key="DB_PORT", value="5435"))
+    db.flush()
+    secrets_cache.get(db, project_id)
+
+    db.add(ProjectSecret(project_id=project_id, key="AUTH_PORT", value="9999"))
+    secrets_changed(db, project_id)
+    db.flush()
+    assert secrets_cache.get(db, project_id)[1] == {"DB_PORT": "5435", "AUTH_PORT": "9999"}
+
+    # Another session keeps seeing the committed secrets
+    db.info.clear()
+    assert secrets_cache.get(db, project_id)[1] == {"DB_PORT": "5435"}
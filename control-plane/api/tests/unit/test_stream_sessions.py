@@ -0,0 +1,20 @@
+from api.v1.deps import get_db
+
+def dependencies(route):
+    def walk(dependant):
+        for sub in dependant.dependencies:
+            yield sub.call
+            yield from walk(sub)
+    return list(walk(route.dependant))
+
+def stream_route(router, suffix):
+    return next(r for r in router.routes if r.path.endswith(suffix))
+
+def test_log_stream_holds_no_request_session():
+    # A get_db session would stay checked out for as long as the stream is open
+    from api.v1.logs import router
+    assert get_db not in dependencies(stream_route(router, "/stream"))
+
+def test_job_events_hold_no_request_session():
+    from api.v1.provisioning_jobs import router
+    assert get_db not in dependencies(stream_route(router, "/events"))
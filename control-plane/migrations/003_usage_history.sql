@@ -0,0 +1,25 @@
+-- Migration: Time-series usage history in usage_records
+-- Adds bucket resolution and byte-level gauges so the scheduler can
+-- upsert 1m samples and 1h/1d rollups.
+
+ALTER TABLE usage_records ADD COLUMN IF NOT EXISTS resolution VARCHAR NOT NULL DEFAULT '1m';
+ALTER TABLE usage_records ADD COLUMN IF NOT EXISTS database_size_bytes BIGINT DEFAULT 0;
+ALTER TABLE usage_records ADD COLUMN IF NOT EXISTS storage_bytes BIGINT DEFAULT 0;
+ALTER TABLE usage_records ADD COLUMN IF NOT EXISTS sample_count INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_usage_records_resolution ON usage_records (resolution);
+
+-- Collapse any pre-existing duplicate snapshots before adding the bucket constraint
+DELETE FROM usage_records a
+USING usage_records b
+WHERE a.org_id = b.org_id
+  AND a.resolution = b.resolution
+  AND a.recorded_at = b.recorded_at
+  AND a.id < b.id;
+
+DO $$ BEGIN
+    ALTER TABLE usage_records
+        ADD CONSTRAINT uq_usage_records_bucket UNIQUE (org_id, resolution, recorded_at);
+EXCEPTION
+    WHEN duplicate_object OR duplicate_table THEN null;
+END $$;
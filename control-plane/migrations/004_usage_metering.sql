@@ -0,0 +1,6 @@
+-- Migration: Request metering columns on usage_records
+-- Filled from batched deltas flushed by the shared routing proxy.
+
+ALTER TABLE usage_records ADD COLUMN IF NOT EXISTS bytes_in BIGINT DEFAULT 0;
+ALTER TABLE usage_records ADD COLUMN IF NOT EXISTS bytes_out BIGINT DEFAULT 0;
+ALTER TABLE usage_records ADD COLUMN IF NOT EXISTS api_latency_ms_total BIGINT DEFAULT 0;
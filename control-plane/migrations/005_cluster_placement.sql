@@ -0,0 +1,7 @@
+-- Migration: Load-aware cluster placement
+-- Real load figures for scoring clusters, and an optional per-cluster cap.
+-- placement_decisions is created by the API on startup (Base.metadata.create_all).
+
+ALTER TABLE cluster_usage ADD COLUMN IF NOT EXISTS db_bytes BIGINT DEFAULT 0;
+ALTER TABLE cluster_usage ADD COLUMN IF NOT EXISTS max_connections INTEGER;
+ALTER TABLE clusters ADD COLUMN IF NOT EXISTS max_databases INTEGER;
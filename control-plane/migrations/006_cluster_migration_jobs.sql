@@ -0,0 +1,3 @@
+-- Migration: Cluster-to-cluster project moves run as provisioning jobs
+
+ALTER TYPE provisioningjobkind ADD VALUE IF NOT EXISTS 'migrate_cluster';
@@ -0,0 +1,33 @@
+-- Migration: Host port reservations
+-- Replaces scanning `docker ps` for free ports. The unique constraint on port
+-- keeps two concurrent allocations from handing out the same port.
+
+CREATE TABLE IF NOT EXISTS port_reservations (
+    id VARCHAR PRIMARY KEY,
+    port INTEGER NOT NULL UNIQUE,
+    owner_type VARCHAR NOT NULL,
+    owner_id VARCHAR NOT NULL,
+    name VARCHAR NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_port_reservations_owner_name UNIQUE (owner_type, owner_id, name)
+);
+
+CREATE INDEX IF NOT EXISTS ix_port_reservations_owner ON port_reservations (owner_type, owner_id);
+
+-- Ports already held by existing dedicated projects
+INSERT INTO port_reservations (id, port, owner_type, owner_id, name)
+SELECT md5(random()::text), s.value::int, 'project', s.project_id, s.key
+FROM project_secrets s
+JOIN projects p ON p.id = s.project_id
+WHERE p.plan = 'dedicated'
+  AND p.status <> 'DELETED'
+  AND s.key IN ('DB_PORT', 'REST_PORT', 'REALTIME_PORT', 'STORAGE_PORT', 'AUTH_PORT', 'FUNCTIONS_PORT', 'GATEWAY_PORT')
+  AND s.value ~ '^[0-9]+$'
+ON CONFLICT DO NOTHING;
+
+-- Postgres ports of existing private clusters
+INSERT INTO port_reservations (id, port, owner_type, owner_id, name)
+SELECT md5(random()::text), c.postgres_port, 'cluster', c.id, 'POSTGRES_PORT'
+FROM clusters c
+WHERE c.type = 'private_shared' AND c.postgres_port IS NOT NULL
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,17 @@
+-- Migration: Slow queries
+-- Statements the shared Postgres logs for exceeding log_min_duration_statement,
+-- split out per project by the control plane's log pipeline.
+
+CREATE TABLE IF NOT EXISTS slow_queries (
+    id SERIAL PRIMARY KEY,
+    project_id VARCHAR NOT NULL,
+    occurred_at TIMESTAMP NOT NULL,
+    duration_ms DOUBLE PRECISION NOT NULL,
+    database VARCHAR,
+    user_name VARCHAR,
+    application VARCHAR,
+    statement TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_slow_queries_project_occurred ON slow_queries (project_id, occurred_at);
+CREATE INDEX IF NOT EXISTS ix_slow_queries_occurred_at ON slow_queries (occurred_at);
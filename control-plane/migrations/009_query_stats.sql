@@ -0,0 +1,20 @@
+-- Migration: Query insights
+-- Per-project deltas of each cluster's pg_stat_statements between snapshots.
+
+CREATE TABLE IF NOT EXISTS query_stats (
+    id SERIAL PRIMARY KEY,
+    project_id VARCHAR NOT NULL,
+    cluster_id VARCHAR NOT NULL,
+    bucket_at TIMESTAMP NOT NULL,
+    queryid BIGINT NOT NULL,
+    user_name VARCHAR,
+    query TEXT NOT NULL,
+    calls BIGINT NOT NULL,
+    total_time_ms DOUBLE PRECISION NOT NULL,
+    rows BIGINT NOT NULL,
+    shared_blks_hit BIGINT DEFAULT 0,
+    shared_blks_read BIGINT DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS ix_query_stats_project_bucket ON query_stats (project_id, bucket_at);
+CREATE INDEX IF NOT EXISTS ix_query_stats_bucket_at ON query_stats (bucket_at);
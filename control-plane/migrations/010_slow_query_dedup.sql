@@ -0,0 +1,20 @@
+-- Migration: Deduplicate slow queries
+-- Every API process (and every restart, re-reading LOG_BACKFILL_SECONDS) sees the
+-- same log records; a record is identified by when it was logged, the backend
+-- that logged it and its statement.
+
+ALTER TABLE slow_queries ADD COLUMN IF NOT EXISTS pid INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE slow_queries ADD COLUMN IF NOT EXISTS statement_md5 VARCHAR(32);
+UPDATE slow_queries SET statement_md5 = md5(statement) WHERE statement_md5 IS NULL;
+ALTER TABLE slow_queries ALTER COLUMN statement_md5 SET NOT NULL;
+
+-- Rows stored before pid was kept can't be told apart from one another beyond this
+DELETE FROM slow_queries a USING slow_queries b
+WHERE a.id > b.id
+  AND a.project_id = b.project_id
+  AND a.occurred_at = b.occurred_at
+  AND a.pid = b.pid
+  AND a.statement_md5 = b.statement_md5;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_slow_queries_record
+    ON slow_queries (project_id, occurred_at, pid, statement_md5);
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare shared project database provisioning paths on one cluster:
+
+  migrations  CREATE DATABASE + full Supabase DDL (the pre-template path)
+  template    CREATE DATABASE ... TEMPLATE supalove_template_vN + per-project grants
+
+Each iteration creates a throwaway supalove_bench_<hex> database and drops it afterwards.
+
+usage: python3 control-plane/scripts/benchmark_provisioning.py [--host H] [--port P] [-n 10]
+"""
+
+import sys
+import os
+import time
+import uuid
+import argparse
+import statistics
+
+# Add parent dirs to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api/src")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api")
+
+from psycopg2 import sql
+from services.shared_provisioning_service import (
+    create_project_database,
+    apply_supabase_migrations,
+    apply_project_grants,
+    build_cluster_template,
+    get_custom_connection,
+    SHARED_POSTGRES_HOST,
+    SHARED_POSTGRES_PORT,
+)
+
+def drop_bench_database(host, port, db_name):
+    conn = get_custom_connection(host, port)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(db_name)))
+        cursor.execute(sql.SQL("DROP ROLE IF EXISTS {}").format(sql.Identifier(f"{db_name}_user")))
+    finally:
+        cursor.close()
+        conn.close()
+
+def provision_with_migrations(host, port, db_name):
+    create_project_database(db_name, "bench", host=host, port=port)
+    apply_supabase_migrations(db_name, "bench", host=host, port=port)
+
+def provision_with_template(host, port, db_name, template):
+    create_project_database(db_name, "bench", host=host, port=port, template=template)
+    apply_project_grants(db_name, host=host, port=port)
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(round(len(timings) * 0.95)) - 1)]
+    print(
+        f"{label:<12} n={len(timings):<3} mean={statistics.mean(timings) * 1000:8.1f} ms  "
+        f"p50={statistics.median(timings) * 1000:8.1f} ms  p95={p95 * 1000:8.1f} ms"
+    )
+
+def run(host, port, iterations):
+    template = build_cluster_template(host, port)
+    results = {"migrations": [], "template": []}
+
+    for i in range(iterations):
+        # Alternate the order so cache warm-up doesn't favour one path
+        paths = ["migrations", "template"] if i % 2 == 0 else ["template", "migrations"]
+        for path in paths:
+            db_name = f"supalove_bench_{uuid.uuid4().hex[:12]}"
+            start = time.perf_counter()
+            try:
+                if path == "migrations":
+                    provision_with_migrations(host, port, db_name)
+                else:
+                    provision_with_template(host, port, db_name, template)
+                results[path].append(time.perf_counter() - start)
+            finally:
+                drop_bench_database(host, port, db_name)
+
+    print(f"\nShared DB provisioning on {host}:{port} ({iterations} iteration(s))")
+    for label, timings in results.items():
+        summarize(label, timings)
+    speedup = statistics.mean(results["migrations"]) / statistics.mean(results["template"])
+    print(f"template path is {speedup:.1f}x faster")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark template vs migration provisioning")
+    parser.add_argument("--host", default=SHARED_POSTGRES_HOST)
+    parser.add_argument("--port", type=int, default=SHARED_POSTGRES_PORT)
+    parser.add_argument("-n", "--iterations", type=int, default=10)
+    args = parser.parse_args()
+    run(args.host, args.port, args.iterations)
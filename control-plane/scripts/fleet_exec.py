@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Run a SQL file or a Python callback on every selected shared project database,
+in parallel per cluster.
+
+The callback is given as module:function and is called as function(conn, target)
+with an open psycopg2 connection and the target dict (project_id, org_id,
+cluster_id, db_name, host, port); its return value is stored in the report.
+
+Interrupted runs can be resumed by passing the same --journal again: databases
+that already succeeded for the same task are skipped.
+
+usage: python3 control-plane/scripts/fleet_exec.py (--sql file.sql | --callable module:function)
+           [--cluster <id>] [--org <id>] [--status running ...] [--concurrency 8]
+           [--timeout 300] [--autocommit] [--journal run.jsonl] [--report out.json] [--dry-run]
+"""
+
+import sys
+import os
+import json
+import argparse
+import importlib
+
+# Add parent dirs to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api/src")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api")
+
+from core.database import SessionLocal
+from services.fleet_service import (
+    FleetExecutor,
+    select_targets,
+    sql_task,
+    FLEET_CONCURRENCY_PER_CLUSTER,
+    FLEET_DB_TIMEOUT_SECONDS,
+    SUCCEEDED,
+    SKIPPED,
+)
+
+def load_callable(spec):
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Expected module:function, got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)
+
+def print_result(result):
+    if result["status"] == SUCCEEDED:
+        status = "✅"
+    elif result["status"] == SKIPPED:
+        status = "⏭️  already done"
+    else:
+        status = f"❌ {result['status']}: {result['error']}"
+    print(f"  [{result['cluster_id']}] {result['db_name']}: {status} ({result['duration_ms']} ms)")
+
+def run(task, targets, args):
+    executor = FleetExecutor(
+        task,
+        concurrency=args.concurrency,
+        timeout_seconds=args.timeout,
+        autocommit=args.autocommit,
+        journal_path=args.journal,
+        on_result=print_result,
+    )
+    print(f"Task {executor.task_id} on {len(targets)} database(s)")
+    report = executor.run(targets)
+
+    totals = report["totals"]
+    print(f"\n✨ Done in {report['duration_ms']} ms: "
+          + ", ".join(f"{count} {status}" for status, count in totals.items()))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+    return totals["failed"] + totals["timeout"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run SQL or a callback across project databases")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sql", help="SQL file to run in each database")
+    source.add_argument("--callable", help="Python callback as module:function")
+    parser.add_argument("--cluster", help="Only databases in this cluster")
+    parser.add_argument("--org", help="Only projects of this organization")
+    parser.add_argument("--status", action="append", help="Only projects in this status (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=FLEET_CONCURRENCY_PER_CLUSTER,
+                        help="Parallel databases per cluster")
+    parser.add_argument("--timeout", type=float, default=FLEET_DB_TIMEOUT_SECONDS,
+                        help="Seconds allowed per database")
+    parser.add_argument("--autocommit", action="store_true",
+                        help="Run without a transaction (e.g. CREATE INDEX CONCURRENTLY)")
+    parser.add_argument("--journal", help="JSONL journal; reuse it to resume an interrupted run")
+    parser.add_argument("--report", help="Write a JSON report to this path")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the selected databases")
+    args = parser.parse_args()
+
+    if args.sql:
+        with open(args.sql) as f:
+            task = sql_task(f.read())
+    else:
+        task = load_callable(args.callable)
+
+    db = SessionLocal()
+    try:
+        targets = select_targets(db, cluster_id=args.cluster, org_id=args.org, statuses=args.status)
+    finally:
+        db.close()
+
+    if args.dry_run:
+        for target in targets:
+            print(f"  [{target['cluster_id']}] {target['db_name']} (project {target['project_id']})")
+        print(f"{len(targets)} database(s) selected")
+        sys.exit(0)
+
+    sys.exit(1 if run(task, targets, args) else 0)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Apply pending project migrations (api/src/project_migrations) to every shared
+project database, cluster by cluster, in parallel.
+
+Safe to re-run: each database records applied versions in supalove.migrations,
+so an interrupted run simply continues with whatever is still pending.
+
+usage: python3 control-plane/scripts/migrate_project_databases.py
+           [--cluster <id>] [--db <db_name> ...] [--concurrency 8] [--dry-run] [--report out.json]
+"""
+
+import sys
+import os
+import json
+import argparse
+
+# Add parent dirs to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api/src")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api")
+
+from core.database import SessionLocal
+from models.cluster import Cluster, ClusterStatus
+from services.project_migration_service import (
+    load_migrations,
+    cluster_database_names,
+    migrate_cluster,
+    PROJECT_MIGRATION_CONCURRENCY,
+)
+from services.shared_provisioning_service import (
+    build_cluster_template,
+    SHARED_POSTGRES_HOST,
+    SHARED_POSTGRES_PORT,
+)
+
+def print_progress(done, total, result):
+    if result["error"]:
+        status = f"❌ {result['error']}"
+    elif result["applied"]:
+        status = f"✅ applied {result['applied']}"
+    elif result["pending"]:
+        status = f"⏳ pending {result['pending']}"
+    else:
+        status = "up to date"
+    print(f"  [{done}/{total}] {result['db_name']}: {status} ({result['duration_ms']} ms)")
+
+def run(cluster_id=None, db_names=None, concurrency=PROJECT_MIGRATION_CONCURRENCY, dry_run=False, report_path=None):
+    migrations = load_migrations()
+    print(f"{len(migrations)} migration(s), latest version {migrations[-1]['version'] if migrations else 0}"
+          + (" [dry run]" if dry_run else ""))
+
+    db = SessionLocal()
+    report = {"dry_run": dry_run, "clusters": {}}
+    failed = 0
+    try:
+        query = db.query(Cluster).filter(Cluster.status == ClusterStatus.running)
+        if cluster_id:
+            query = query.filter(Cluster.id == cluster_id)
+
+        for cluster in query.all():
+            host = cluster.postgres_host or SHARED_POSTGRES_HOST
+            port = cluster.postgres_port or SHARED_POSTGRES_PORT
+            targets = db_names or cluster_database_names(db, cluster)
+            print(f"\nCluster {cluster.id} ({host}:{port}): {len(targets)} database(s)")
+
+            results = migrate_cluster(host, port, targets, concurrency=concurrency,
+                                      dry_run=dry_run, on_progress=print_progress)
+            failed += sum(1 for r in results if r["error"])
+            report["clusters"][cluster.id] = results
+
+            if not dry_run:
+                # New projects should be cloned from a template at the latest version
+                try:
+                    build_cluster_template(host, port)
+                except Exception as e:
+                    print(f"  ⚠️  Template build failed: {e}")
+    finally:
+        db.close()
+
+    total = sum(len(r) for r in report["clusters"].values())
+    print(f"\n✨ Done: {total} database(s), {failed} failed")
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {report_path}")
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate shared project databases")
+    parser.add_argument("--cluster", help="Only this cluster id")
+    parser.add_argument("--db", action="append", dest="db_names", help="Only this database (repeatable; needs --cluster)")
+    parser.add_argument("--concurrency", type=int, default=PROJECT_MIGRATION_CONCURRENCY)
+    parser.add_argument("--dry-run", action="store_true", help="Report pending migrations without applying them")
+    parser.add_argument("--report", help="Write a JSON report to this path")
+    args = parser.parse_args()
+    if args.db_names and not args.cluster:
+        parser.error("--db requires --cluster")
+    sys.exit(1 if run(args.cluster, args.db_names, args.concurrency, args.dry_run, args.report) else 0)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Rebuild the supalove_template_vN database on shared clusters.
+
+A new template is built automatically the first time a project is provisioned after
+a migration is added to api/src/project_migrations; use this to build it ahead of
+time or to replace a damaged template. Existing project databases are not touched;
+roll migrations out to them with migrate_project_databases.py.
+
+usage: python3 control-plane/scripts/rebuild_db_template.py [--cluster <id>] [--flush-warm-pool]
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent dirs to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api/src")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api")
+
+from core.database import SessionLocal
+from models.cluster import Cluster, ClusterStatus
+from models.warm_pool_database import WarmPoolDatabase, WarmPoolStatus
+from services.shared_provisioning_service import (
+    build_cluster_template,
+    template_db_name,
+    SHARED_POSTGRES_HOST,
+    SHARED_POSTGRES_PORT,
+)
+
+def rebuild(cluster_id=None, flush_warm_pool=False):
+    db = SessionLocal()
+    try:
+        query = db.query(Cluster).filter(Cluster.status == ClusterStatus.running)
+        if cluster_id:
+            query = query.filter(Cluster.id == cluster_id)
+        clusters = query.all()
+
+        if not clusters:
+            print("No running clusters found")
+            return
+
+        print(f"Rebuilding {template_db_name()} on {len(clusters)} cluster(s)")
+        for cluster in clusters:
+            host = cluster.postgres_host or SHARED_POSTGRES_HOST
+            port = cluster.postgres_port or SHARED_POSTGRES_PORT
+            try:
+                build_cluster_template(host, port, rebuild=True)
+                print(f"✅ {cluster.id} ({host}:{port})")
+            except Exception as e:
+                print(f"❌ {cluster.id} ({host}:{port}): {e}")
+                continue
+
+            if flush_warm_pool:
+                # Pooled databases were copied from the old template; the filler drops and recreates them
+                flushed = db.query(WarmPoolDatabase).filter(
+                    WarmPoolDatabase.cluster_id == cluster.id,
+                    WarmPoolDatabase.status == WarmPoolStatus.ready
+                ).update({"status": WarmPoolStatus.failed, "last_error": "template rebuilt"}, synchronize_session=False)
+                db.commit()
+                print(f"   flushed {flushed} warm pool database(s)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild shared cluster template databases")
+    parser.add_argument("--cluster", help="Only rebuild this cluster id")
+    parser.add_argument("--flush-warm-pool", action="store_true", help="Recycle warm pool databases built from the old template")
+    args = parser.parse_args()
+    rebuild(args.cluster, args.flush_warm_pool)
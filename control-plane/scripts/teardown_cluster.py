@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tear down a private cluster: stop its Docker stack, delete its data and remove
+the cluster record. Refuses while projects still live on the cluster; move them
+first (POST /projects/{id}/migrate) or pass --force.
+
+usage: python3 control-plane/scripts/teardown_cluster.py <cluster_id> [--force]
+"""
+
+import sys
+import os
+import argparse
+
+# Add parent dirs to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api/src")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/api")
+
+from core.database import SessionLocal
+from services.cluster_service import ClusterService
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tear down a private cluster")
+    parser.add_argument("cluster_id")
+    parser.add_argument("--force", action="store_true", help="Tear down even if projects remain")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        ClusterService.teardown_cluster(db, args.cluster_id, force=args.force)
+        print(f"✅ Cluster {args.cluster_id} torn down")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        db.close()
@@ -1,3 +1,6 @@
+-- Statement statistics for every database (read by the control plane's query insights)
+CREATE EXTENSION IF NOT EXISTS pg_stat_statements;
+
 -- Create roles
 CREATE ROLE anon NOLOGIN;
 CREATE ROLE authenticated NOLOGIN;
@@ -8,11 +8,16 @@ This service handles multi-tenant routing for shared projects:
 4. Injects correct JWT secret for authentication
 """
 import os
+import hmac
+import hashlib
+import time
 import httpx
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException, Header, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
-from typing import Optional
+from starlette.requests import HTTPConnection
+from typing import Optional, Dict
 import psycopg2
 from psycopg2 import pool
 from functools import lru_cache
@@ -20,7 +25,18 @@ import asyncio
 import websockets
 from websockets.exceptions import ConnectionClosed
 
-app = FastAPI(title="Supalove Shared Routing Proxy")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    flush_task = asyncio.create_task(metering_flush_loop())
+    yield
+    flush_task.cancel()
+    # Don't lose the last partial window on shutdown
+    await flush_usage()
+    await metering_client.aclose()
+
+
+app = FastAPI(title="Supalove Shared Routing Proxy", lifespan=lifespan)
 
 # CORS Middleware
 app.add_middleware(
@@ -48,6 +64,30 @@ REALTIME_URL = os.getenv("REALTIME_URL", "http://shared-realtime:4000")
 project_cache = {}
 cache_ttl = 300  # 5 minutes
 
+# API key verification. Needs METERING_TOKEN, which the control plane also
+# accepts for the accepted-keys lookup.
+VERIFY_API_KEYS = os.getenv("VERIFY_API_KEYS", "false").lower() == "true"
+API_KEYS_RECHECK_SECONDS = 5  # An unknown key refetches the list at most this often (e.g. right after a rotation)
+
+# project_id -> {"hashes": set of SHA-256 hex digests, "fetched_at": ..., "expires_at": ...} (event loop time)
+api_key_cache: Dict[str, dict] = {}
+# Project IDs the control plane didn't know -> when to ask again (event loop time), so
+# requests for made-up IDs aren't each passed on to it
+missing_projects: Dict[str, float] = {}
+MISSING_PROJECTS_MAX = 10000
+
+# Request metering
+METERING_TOKEN = os.getenv("METERING_TOKEN", "")
+METERING_FLUSH_INTERVAL = float(os.getenv("METERING_FLUSH_INTERVAL", "15"))
+METERING_MAX_PROJECTS = 10000  # Cap on buffered projects if the control plane is down
+
+# project_id -> accumulated deltas since the last successful flush.
+# Only touched from the event loop, so no locking is needed.
+usage_deltas: Dict[str, Dict[str, int]] = {}
+
+# One pooled client for all metering flushes
+metering_client = httpx.AsyncClient(timeout=10.0)
+
 
 async def get_project_config(project_id: str) -> dict:
     """
@@ -77,6 +117,65 @@ async def get_project_config(project_id: str) -> dict:
             raise HTTPException(status_code=503, detail=f"Control plane unavailable: {str(e)}")
 
 
+async def fetch_accepted_keys(project_id: str) -> dict:
+    """Ask the control plane which API keys (as SHA-256 hashes) the project accepts right now."""
+    try:
+        response = await metering_client.get(
+            f"{CONTROL_PLANE_URL}/api/v1/metering/projects/{project_id}/api-keys",
+            headers={"X-Metering-Token": METERING_TOKEN},
+        )
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"Control plane unavailable: {str(e)}")
+    now = asyncio.get_event_loop().time()
+    if response.status_code == 404:
+        if len(missing_projects) >= MISSING_PROJECTS_MAX:
+            for expired in [p for p, until in missing_projects.items() if until <= now]:
+                del missing_projects[expired]
+        if len(missing_projects) < MISSING_PROJECTS_MAX:
+            missing_projects[project_id] = now + API_KEYS_RECHECK_SECONDS
+        raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
+    if response.status_code != 200:
+        raise HTTPException(status_code=503, detail="Could not verify API key")
+
+    accepted = response.json()
+    missing_projects.pop(project_id, None)
+    expires_at = now + cache_ttl
+    if accepted.get("valid_until"):
+        # Previous keys of a JWT secret rotation stop being accepted when its overlap window ends
+        expires_at = min(expires_at, now + max(accepted["valid_until"] - time.time(), 0))
+    entry = {"hashes": set(accepted["key_hashes"]), "fetched_at": now, "expires_at": expires_at}
+    api_key_cache[project_id] = entry
+    return entry
+
+
+async def verify_api_key(request: HTTPConnection, project_id: Optional[str]):
+    """
+    Reject requests (or websocket connections) without one of the project's API
+    keys. A hash lookup in a cached set, so accepting old and new keys during a
+    rotation costs nothing extra. Requests naming no project can't be checked and
+    are rejected too.
+    """
+    if not VERIFY_API_KEYS:
+        return
+    if not project_id:
+        raise HTTPException(status_code=401, detail="Project ID required")
+    key = request.headers.get("apikey") or request.query_params.get("apikey")
+    if not key:
+        raise HTTPException(status_code=401, detail="API key required")
+    digest = hashlib.sha256(key.encode()).hexdigest()
+
+    now = asyncio.get_event_loop().time()
+    if missing_projects.get(project_id, 0) > now:
+        raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
+    entry = api_key_cache.get(project_id)
+    if entry is None or now >= entry["expires_at"] or (
+        digest not in entry["hashes"] and now - entry["fetched_at"] >= API_KEYS_RECHECK_SECONDS
+    ):
+        entry = await fetch_accepted_keys(project_id)
+    if digest not in entry["hashes"]:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+
 def extract_project_id(request: Request, x_project_id: Optional[str] = None) -> str:
     """
     Extract project ID from:
@@ -108,6 +207,100 @@ def extract_project_id(request: Request, x_project_id: Optional[str] = None) ->
     )
 
 
+# ============================================
+# REQUEST METERING
+# ============================================
+
+def metered_project_id(request: Request) -> Optional[str]:
+    """
+    Project a request is metered to (path, then tenant headers/params). Only
+    projects the control plane confirmed (see get_project_config) are metered,
+    so made-up IDs never take one of the METERING_MAX_PROJECTS buffer slots.
+    """
+    path = request.url.path
+    project_id = None
+    if path.startswith("/projects/"):
+        parts = path.split("/")
+        if len(parts) >= 3 and parts[2]:
+            project_id = parts[2]
+    project_id = (
+        project_id
+        or request.headers.get("x-project-id")
+        or request.headers.get("x-tenant-id")
+        or request.query_params.get("tenant")
+    )
+    return project_id if project_id in project_cache else None
+
+
+def record_usage(project_id: str, bytes_in: int, bytes_out: int, latency_ms: int, requests: int = 1):
+    """Accumulate a request into the in-memory per-project deltas."""
+    deltas = usage_deltas.get(project_id)
+    if deltas is None:
+        if len(usage_deltas) >= METERING_MAX_PROJECTS:
+            return
+        deltas = usage_deltas[project_id] = {"requests": 0, "bytes_in": 0, "bytes_out": 0, "latency_ms_total": 0}
+    deltas["requests"] += requests
+    deltas["bytes_in"] += bytes_in
+    deltas["bytes_out"] += bytes_out
+    deltas["latency_ms_total"] += latency_ms
+
+
+async def flush_usage():
+    """Send accumulated deltas to the control plane in one batch; re-queue them on failure."""
+    global usage_deltas
+    if not usage_deltas or not METERING_TOKEN:
+        return
+
+    batch, usage_deltas = usage_deltas, {}
+    try:
+        response = await metering_client.post(
+            f"{CONTROL_PLANE_URL}/api/v1/metering/usage",
+            json={"projects": [{"project_id": pid, **d} for pid, d in batch.items()]},
+            headers={"X-Metering-Token": METERING_TOKEN},
+        )
+        response.raise_for_status()
+    except Exception as e:
+        print(f"Metering flush failed, keeping {len(batch)} project(s) for retry: {e}")
+        for project_id, d in batch.items():
+            record_usage(project_id, d["bytes_in"], d["bytes_out"], d["latency_ms_total"], requests=d["requests"])
+
+
+async def metering_flush_loop():
+    while True:
+        await asyncio.sleep(METERING_FLUSH_INTERVAL)
+        await flush_usage()
+
+
+@app.middleware("http")
+async def meter_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+
+    project_id = metered_project_id(request)
+    if project_id:
+        record_usage(
+            project_id,
+            bytes_in=int(request.headers.get("content-length") or 0),
+            bytes_out=int(response.headers.get("content-length") or 0),
+            latency_ms=int((time.perf_counter() - start) * 1000),
+        )
+    return response
+
+
+@app.post("/internal/projects/{project_id}/invalidate")
+async def invalidate_project(project_id: str, x_metering_token: Optional[str] = Header(None)):
+    """
+    Forget cached config for a project, e.g. after it moved to another cluster.
+    Called by the control plane with the same shared token used for metering.
+    """
+    if not METERING_TOKEN or not x_metering_token or not hmac.compare_digest(x_metering_token.encode(), METERING_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    project_cache.pop(project_id, None)
+    api_key_cache.pop(project_id, None)
+    missing_projects.pop(project_id, None)
+    return {"invalidated": project_id}
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -124,6 +317,7 @@ async def proxy_rest(
     """
     Proxy REST API requests to PostgREST with correct database context.
     """
+    await verify_api_key(request, project_id)
     config = await get_project_config(project_id)
     db_name = config.get("db_name", f"project_{project_id}")
     
@@ -163,6 +357,7 @@ async def proxy_auth(
     """
     Proxy Auth requests to GoTrue.
     """
+    await verify_api_key(request, project_id)
     config = await get_project_config(project_id)
     
     async with httpx.AsyncClient() as client:
@@ -196,6 +391,7 @@ async def proxy_storage(
     """
     Proxy Storage requests.
     """
+    await verify_api_key(request, project_id)
     config = await get_project_config(project_id)
     
     async with httpx.AsyncClient() as client:
@@ -238,6 +434,11 @@ async def handle_realtime_request(request: Request, path: str, project_id: Optio
          # Try query param? Realtime client might send it
          project_id = request.query_params.get("tenant")
          
+    await verify_api_key(request, project_id)
+    if project_id:
+        # Unknown tenants are turned away here rather than by Realtime (and aren't metered)
+        await get_project_config(project_id)
+
     if not project_id and path == "api/tenants":
         # Health check might not have tenant, just pass through if generic?
         # But Realtime requires tenant for most things.
@@ -290,6 +491,12 @@ async def proxy_realtime_generic(
 
 @app.websocket("/realtime/v1/websocket")
 async def websocket_proxy(websocket: WebSocket):
+    try:
+        await verify_api_key(websocket, websocket.query_params.get("tenant"))
+    except HTTPException as e:
+        # Refused during the handshake
+        await websocket.close(code=1008, reason=e.detail)
+        return
     await websocket.accept()
     
     # Realtime client usually sends params like ?vsn=1.0.0&token=...
@@ -48,7 +48,6 @@ def filter_sql(sql_content: str, target_user: str) -> str:
         r'^CREATE SCHEMA extensions',
         r'^ALTER SCHEMA .* OWNER TO supabase',
         r'^CREATE EXTENSION IF NOT EXISTS pg_graphql',
-        r'^CREATE EXTENSION IF NOT EXISTS pg_stat_statements',
         r'^CREATE EXTENSION IF NOT EXISTS pgjwt',
         r'^CREATE EXTENSION IF NOT EXISTS supabase_vault',
         r'^ALTER DEFAULT PRIVILEGES',